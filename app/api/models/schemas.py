@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 from enum import Enum
 
 # API Key schemas
@@ -21,9 +21,31 @@ class ApiKey(ApiKeyCreate):
     last_used: Optional[datetime] = None
     created_by: Optional[str] = None
 
+class ApiKeyUsage(BaseModel):
+    key_id: str
+    name: str
+    last_used: Optional[datetime] = None
+    requests: int = 0
+    llm_calls: int = 0
+    bytes_served: int = 0
+
 # Meme API schemas
+OutputFormatName = Literal["jpeg", "webp", "avif", "png"]
+QualityPreset = Literal["fast", "high", "balanced", "small"]
+
 class MemeRequest(BaseModel):
     query: str
+    output_format: Optional[OutputFormatName] = None  # server default if not set
+    quality_preset: Optional[QualityPreset] = None
+
+class BatchMemeItem(BaseModel):
+    query: str
+    template_id: Optional[str] = None  # pin a template, random otherwise
+
+class BatchMemeRequest(BaseModel):
+    items: List[BatchMemeItem] = Field(min_length=1)
+    output_format: Optional[OutputFormatName] = None
+    quality_preset: Optional[QualityPreset] = None
 
 class TextPosition(BaseModel):
     x: int
@@ -36,15 +58,41 @@ class MemeResponse(BaseModel):
     presigned_url: str
     expiry_date: str
 
+class BatchMemeResult(BaseModel):
+    index: int
+    template_id: Optional[str] = None
+    meme: Optional[MemeResponse] = None
+    error: Optional[str] = None
+
+class BatchMemeResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BatchMemeResult]
+
 class TextBox(BaseModel):
     x: int
     y: int
     width: int
     height: int
     text: str
-    font_size: int
-    color: str  # HEX color
-    style: str  # 'default', 'bold', 'comic', 'gradient'
+    font_size: int | Literal["auto"] = "auto"  # "auto" fits the box within the template's size range
+    font_name: str = "Impact.ttf"
+    text_color: List[int] = Field(default_factory=lambda: [255, 255, 255])  # RGB
+    outline_color: List[int] = Field(default_factory=lambda: [0, 0, 0])  # RGB
+    stroke_width: int = 2
+    padding: int = 10
+    style: str = "default"  # 'default', 'bold', 'comic' and/or effects 'gradient', 'shadow', 'glow', 'box', joined with '+'
+
+class RenderRequest(BaseModel):
+    template_id: str
+    annotations: List[TextBox]  # in template box order
+    output_format: Optional[OutputFormatName] = None
+    quality_preset: Optional[QualityPreset] = None
+
+class ProfilingConfig(BaseModel):
+    sample_rate: float = Field(0.0, ge=0.0, le=1.0)  # fraction of requests to profile
+    duration: int = Field(600, gt=0, le=86400)  # seconds until profiling disarms itself
+    header: bool = True  # also profile requests sending the returned token in X-Profile
 
 ## meme template schemas
 class Font(BaseModel):
@@ -70,12 +118,15 @@ class Source(BaseModel):
 class MemeTemplate(BaseModel):
     src: Source
     annotations: List[Annotation]
+    weight: Optional[float] = None  # relative selection weight for random memes, default 1, 0 never picks it
 
 class MemeTemplateResponse(BaseModel):
     id: str
     src: Source
     annotations: List[Annotation]
+    weight: Optional[float] = None
 
 class MemeTemplateUpdate(BaseModel):
     src: Optional[Source] = None
-    annotations: Optional[List[Annotation]] = None
\ No newline at end of file
+    annotations: Optional[List[Annotation]] = None
+    weight: Optional[float] = None
\ No newline at end of file
@@ -1,9 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
 from typing import List
-from ..models.schemas import ApiKeyCreate, ApiKey
+from ..models.schemas import ApiKeyCreate, ApiKey, ApiKeyUsage, ProfilingConfig
 from ...services.api_key_service import ApiKeyService
 from ...core.security import require_permissions
+from ...core.profiling import get_profiler
 from ...dependencies import MongoDB, get_database
+from ...utils.image_cache import get_template_cache, get_decoded_cache
+from ...utils.font_utils import font_cache_stats
+from ...services.render_service import get_render_service
+from ...services.template_registry import get_template_registry
+from ...services.api_key_cache import get_api_key_cache
+from ...services.usage_service import get_usage_recorder
+from ...services.annotation_cache import get_annotation_cache
+from ...services.render_cache import get_render_cache
+from ...services.storage_service import get_upload_index
+from ...services.upload_queue import get_upload_queue
+from ...services.expiry_sweeper import get_expiry_sweeper
 
 router = APIRouter()
 
@@ -48,4 +61,105 @@ async def revoke_api_key(
     api_key_service = ApiKeyService(db)
     if await api_key_service.revoke_api_key(key_id):
         return {"message": "API key revoked successfully"}
-    raise HTTPException(status_code=404, detail="API key not found")
\ No newline at end of file
+    raise HTTPException(status_code=404, detail="API key not found")
+
+@router.get("/api-keys/usage", response_model=List[ApiKeyUsage])
+async def list_api_key_usage(
+    skip: int = 0,
+    limit: int = 100,
+    current_key: ApiKey = Depends(require_permissions(["admin"])),
+    db: MongoDB = Depends(get_database)
+):
+    api_key_service = ApiKeyService(db)
+    return await api_key_service.get_usage(skip=skip, limit=limit)
+
+@router.get("/api-keys/{key_id}/usage", response_model=ApiKeyUsage)
+async def get_api_key_usage(
+    key_id: str,
+    current_key: ApiKey = Depends(require_permissions(["admin"])),
+    db: MongoDB = Depends(get_database)
+):
+    api_key_service = ApiKeyService(db)
+    usage = await api_key_service.get_usage(key_id=key_id, limit=1)
+    if usage:
+        return usage[0]
+    raise HTTPException(status_code=404, detail="API key not found")
+
+@router.get("/cache/stats")
+async def cache_stats(
+    current_key: ApiKey = Depends(require_permissions(["admin"])),
+):
+    return {
+        "template_images": get_template_cache().stats(),
+        "decoded_templates": get_decoded_cache().stats(),
+        "fonts": font_cache_stats(),
+        "templates": get_template_registry().stats(),
+        "api_keys": get_api_key_cache().stats(),
+        "usage": get_usage_recorder().stats(),
+        "annotations": get_annotation_cache().stats(),
+        "renders": get_render_cache().stats(),
+        "uploads": get_upload_index().stats(),
+    }
+
+
+@router.get("/render/stats")
+async def render_stats(
+    current_key: ApiKey = Depends(require_permissions(["admin"])),
+):
+    return get_render_service().stats()
+
+
+
+@router.get("/uploads/stats")
+async def upload_stats(
+    current_key: ApiKey = Depends(require_permissions(["admin"])),
+):
+    return {**get_upload_queue().stats(), "expiry": get_expiry_sweeper().stats()}
+
+
+@router.get("/profiling")
+async def profiling_status(
+    current_key: ApiKey = Depends(require_permissions(["admin"])),
+):
+    return get_profiler().stats()
+
+
+@router.post("/profiling")
+async def start_profiling(
+    config: ProfilingConfig,
+    current_key: ApiKey = Depends(require_permissions(["admin"])),
+):
+    """
+    Arm profiling on this worker for `duration` seconds. Sampled requests, and
+    requests sending the returned token in an X-Profile header, are profiled;
+    their responses carry an X-Profile-Id header.
+    """
+    return get_profiler().arm(config.sample_rate, config.duration, config.header)
+
+
+@router.delete("/profiling")
+async def stop_profiling(
+    current_key: ApiKey = Depends(require_permissions(["admin"])),
+):
+    get_profiler().disarm()
+    return get_profiler().stats()
+
+
+@router.get("/profiling/collapsed", response_class=PlainTextResponse)
+async def profiling_collapsed(
+    current_key: ApiKey = Depends(require_permissions(["admin"])),
+):
+    """All kept profiles merged, as collapsed stacks for flamegraph.pl or speedscope."""
+    return get_profiler().collapsed()
+
+
+@router.get("/profiling/{report_id}", response_class=PlainTextResponse)
+async def profiling_report(
+    report_id: str,
+    current_key: ApiKey = Depends(require_permissions(["admin"])),
+):
+    """One profile as collapsed stacks."""
+    report = get_profiler().get(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report.collapsed()
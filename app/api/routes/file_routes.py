@@ -0,0 +1,51 @@
+import os
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from ...config.settings import get_settings
+from ...services.storage import LocalStorage, get_storage
+
+router = APIRouter(prefix="/files", tags=["files"])
+
+
+def _stat_local(storage: LocalStorage, key: str):
+    """Path, stat and metadata of a servable file, or None."""
+    if not storage.is_public(key):
+        return None
+    try:
+        path = storage.path(key)
+        stat_result = os.stat(path)
+    except (ValueError, FileNotFoundError):
+        return None
+    meta = storage.metadata(key) or {}
+    if meta.get("expiry_date") and datetime.fromisoformat(meta["expiry_date"]) < datetime.now():
+        return None
+    return path, stat_result, meta
+
+
+@router.get("/{key:path}", response_class=FileResponse)
+async def get_file(key: str):
+    """
+    Serve a meme from the local storage backend. Other objects, such as cached renders
+    that GET /render/{id} gates behind an API key, are not served here.
+    Files stream straight from disk with Range, ETag and Last-Modified support; keys are
+    content hashes, so responses are cacheable for the object's whole lifetime. With
+    storage_accel_redirect set, nginx sends the file itself (sendfile) instead.
+    """
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    found = await run_in_threadpool(_stat_local, storage, key)
+    if found is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    path, stat_result, meta = found
+
+    headers = {"Cache-Control": meta.get("cache_control") or "public, max-age=172800, immutable"}
+    media_type = meta.get("content_type")
+    accel_redirect = get_settings().storage_accel_redirect
+    if accel_redirect:
+        headers["X-Accel-Redirect"] = f"{accel_redirect.rstrip('/')}/{key}"
+        return Response(media_type=media_type, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result)
@@ -1,31 +1,28 @@
-import os
-from fastapi import APIRouter, HTTPException, Depends
-from ..models.schemas import MemeRequest, MemeResponse, ApiKey
-from ...services import MemeService, OpenAIService, S3Service
+import io
+import asyncio
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Header, Path, Query, Response
+from ..models.schemas import (
+    MemeRequest, MemeResponse, ApiKey,
+    BatchMemeItem, BatchMemeRequest, BatchMemeResult, BatchMemeResponse,
+    RenderRequest,
+)
+from ...services import MemeService, OpenAIService, StorageService, get_render_service
+from ...services.usage_service import get_usage_recorder
+from ...services.annotation_cache import get_annotation_cache
+from ...services.render_cache import CachedRender, get_render_cache
 from ...utils import ImageProcessor, TextOverlay
 from ...utils.prompts import get_meme_system_prompt
+from ...utils.encoders import EXTENSIONS, OutputFormat, get_output_format
 from ...core.security import get_api_key, require_permissions
-from typing import Annotated
+from ...core.metrics import label, stage
+from typing import Annotated, Literal, Optional
+from ...config.settings import get_settings
 from ...dependencies import get_meme_service
 
 router = APIRouter(prefix="", tags=["meme"])
 
-@router.post("/generate-meme", response_model=MemeResponse)
-async def generate_meme(
-    request: MemeRequest,
-    api_key: ApiKey = Depends(require_permissions(["generate_meme"])),
-    meme_service: MemeService = Depends(get_meme_service),
-): 
-    
-    text_overlay = TextOverlay()
-
-    try: 
-        # Get random meme template
-        meme_template = await meme_service.get_random_meme()
-
-        image_bytes = ImageProcessor.download_image(meme_template['src']['url'])
-
-        user_prompt = f"""
+def build_user_prompt(meme_template: dict, query: str) -> str:
+    return f"""
 <Meme Template>
 {meme_template['src']['name']}:
 box_count:{meme_template['src']['box_count']} 
@@ -34,39 +31,311 @@ Annotations Guide for box:
 </Meme Template>
 
 Base on the template above give meme data in json for the following context:
-{request.query}
+{query}
         """
+
+
+async def analyze_template(
+    meme_template: dict,
+    query: str,
+    image_bytes,
+    api_key: ApiKey,
+    llm_limit: Optional[asyncio.Semaphore] = None,
+) -> dict:
+    """Ask the LLM for annotations for a template and query."""
+    with stage("prompt"):
+        user_prompt = build_user_prompt(meme_template, query)
         system_prompt = get_meme_system_prompt()
-        print("Calling ai")
-        # analysis = {'annotations': [{'x': 616, 'y': 19, 'width': 559, 'height': 538, 'text': 'When you see your crush...', 'font_size': 80, 'font_name': 'Impact.ttf', 'stroke_width': 2, 'text_color': [255, 255, 255], 'outline_color': [0, 0, 0], 'padding': 10}, {'x': 616, 'y': 609, 'width': 546, 'height': 574, 'text': "...but you remember you're awkward.", 'font_size': 80, 'font_name': 'Impact.ttf', 'stroke_width': 2, 'text_color': [255, 255, 255], 'outline_color': [0, 0, 0], 'padding': 10}]}
-        analysis = OpenAIService.analyze_image(system_prompt, user_prompt, image_bytes)
-    
-        # print(type(analysis))
-        # print(analysis)
-        # Add text to image
-        meme = text_overlay.add_multiple_texts(image_bytes, analysis['annotations'])
-        # print("Meme generated", meme)
-     
-        
-        # ================Test the image================
-        # test the image .. comment out later
-        # Ensure the /images directory exists
-        # os.makedirs("images", exist_ok=True)
+    # analysis = {'annotations': [{'x': 616, 'y': 19, 'width': 559, 'height': 538, 'text': 'When you see your crush...', 'font_size': 80, 'font_name': 'Impact.ttf', 'stroke_width': 2, 'text_color': [255, 255, 255], 'outline_color': [0, 0, 0], 'padding': 10}, {'x': 616, 'y': 609, 'width': 546, 'height': 574, 'text': "...but you remember you're awkward.", 'font_size': 80, 'font_name': 'Impact.ttf', 'stroke_width': 2, 'text_color': [255, 255, 255], 'outline_color': [0, 0, 0], 'padding': 10}]}
+    if llm_limit is None:
+        analysis = await OpenAIService.analyze_image(system_prompt, user_prompt, image_bytes)
+    else:
+        async with llm_limit:
+            analysis = await OpenAIService.analyze_image(system_prompt, user_prompt, image_bytes)
+    get_usage_recorder().record(api_key.key_id, llm_calls=1)
+    return analysis
+
+
+def valid_analysis(analysis) -> bool:
+    """Whether LLM output carries a non-empty list of annotation objects."""
+    annotations = analysis.get('annotations') if isinstance(analysis, dict) else None
+    return bool(annotations) and isinstance(annotations, list) and all(isinstance(a, dict) for a in annotations)
+
+
+async def render_meme(
+    db,
+    meme_template: dict,
+    query: str,
+    api_key: ApiKey,
+    llm_limit: Optional[asyncio.Semaphore] = None,
+    output_format: Optional[OutputFormat] = None,
+) -> io.BytesIO:
+    """
+    Run one meme through the pipeline up to the encoded image: template download, LLM annotations, render.
+    Annotations come from the annotation cache when the same template and query were seen before.
+    `llm_limit` bounds concurrent LLM calls when many memes are generated at once.
+    """
+    with stage("download"):
+        image_bytes = await ImageProcessor.get_template_image(meme_template['src']['url'])
+
+    annotation_cache = get_annotation_cache()
+    with stage("annotation_cache"):
+        cache_key = annotation_cache.make_key(meme_template, query)
+        analysis = await annotation_cache.get(cache_key, db.llm_cache)
+    # Entries cached before results were checked may be malformed, treat them as misses
+    if not valid_analysis(analysis):
+        analysis = await analyze_template(meme_template, query, image_bytes, api_key, llm_limit)
+        # Only well-formed output is cached, a bad completion is retried next time
+        if not valid_analysis(analysis):
+            raise HTTPException(status_code=502, detail="The LLM returned no usable annotations")
+        annotation_cache.put(cache_key, analysis, db.llm_cache)
+
+    annotations = TextOverlay.apply_size_ranges(analysis['annotations'], meme_template['annotations'])
+
+    # Add text to image. Rendering and encoding are CPU-bound, keep them off the event loop
+    meme = await get_render_service().render(image_bytes, annotations, output_format)
+    get_usage_recorder().record(api_key.key_id, bytes_served=meme.getbuffer().nbytes)
+
+    # ================Test the image================
+    # test the image .. comment out later
+    # Ensure the /images directory exists
+    # os.makedirs("images", exist_ok=True)
+
+    # Save the generated meme to the /images directory
+    # with open("images/generated_meme.jpg", "wb") as f:
+    #     f.write(meme.getbuffer())
+    # ================End test================
+
+    return meme
+
+
+async def create_meme(
+    db,
+    meme_template: dict,
+    query: str,
+    api_key: ApiKey,
+    llm_limit: Optional[asyncio.Semaphore] = None,
+    output_format: Optional[OutputFormat] = None,
+) -> dict:
+    """Render a meme and upload it to storage."""
+    output_format = output_format or get_output_format()
+    meme = await render_meme(db, meme_template, query, api_key, llm_limit, output_format)
+    with stage("upload"):
+        return await StorageService.upload_image_async(meme, output_format.content_type, output_format.extension)
+
+
+def resolve_output_format(output_format: Optional[str], quality_preset: Optional[str]) -> OutputFormat:
+    """Encoder settings for a request, falling back to the server defaults."""
+    settings = get_settings()
+    try:
+        resolved = get_output_format(output_format or settings.output_format, quality_preset or settings.output_preset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    label(format=resolved.name)
+    return resolved
+
+
+def wants_image_response(response_mode: Optional[str], accept: Optional[str]) -> bool:
+    """
+    Decide between the JSON (URL) response and the image itself.
+    An explicit ?response= wins; otherwise an Accept header asking for an image and not JSON selects the image.
+    """
+    if response_mode:
+        return response_mode == "image"
+    media_types = [part.split(";")[0].strip() for part in (accept or "").split(",")]
+    return any(m.startswith("image/") for m in media_types) and "application/json" not in media_types
+
+
+@router.post(
+    "/generate-meme",
+    response_model=MemeResponse,
+    responses={200: {
+        "content": {"image/jpeg": {}, "image/webp": {}, "image/avif": {}, "image/png": {}},
+        "description": "The meme, or the image itself with ?response=image",
+    }},
+)
+async def generate_meme(
+    request: MemeRequest,
+    background_tasks: BackgroundTasks,
+    response_mode: Optional[Literal["json", "image"]] = Query(None, alias="response"),
+    store: bool = False,
+    accept: Optional[str] = Header(None),
+    api_key: ApiKey = Depends(require_permissions(["generate_meme"])),
+    meme_service: MemeService = Depends(get_meme_service),
+): 
+    """
+    Generate a meme. By default it is uploaded and its URLs returned. With ?response=image
+    (or an Accept header asking for an image) the encoded image is returned directly; the
+    upload is then skipped, or done in the background with ?store=true.
+    """
+    output_format = resolve_output_format(request.output_format, request.quality_preset)
 
-        # Save the generated meme to the /images directory
-        # with open("images/generated_meme.jpg", "wb") as f:
-        #     f.write(meme.getbuffer())
-        # ================End test================
+    try: 
+        # Get random meme template
+        with stage("template_select"):
+            meme_template = await meme_service.get_random_meme()
+        label(template=meme_template.get('id', ''))
 
-        meme_data = S3Service.upload_image(meme)
+        if wants_image_response(response_mode, accept):
+            meme = await render_meme(meme_service.db, meme_template, request.query, api_key, output_format=output_format)
+            if store:
+                background_tasks.add_task(
+                    StorageService.upload_image_async, io.BytesIO(meme.getvalue()),
+                    output_format.content_type, output_format.extension,
+                )
+            return Response(
+                content=meme.getvalue(),
+                media_type=output_format.content_type,
+                headers={
+                    "Content-Disposition": f'inline; filename="meme.{output_format.extension}"',
+                    "Cache-Control": "no-store",
+                },
+            )
+
+        meme_data = await create_meme(meme_service.db, meme_template, request.query, api_key, output_format=output_format)
 
         # res = ({"url": "https://via.placeholder.com/512x512.png", "expiry_date": system_prompt, "presigned_url": "https://via.placeholder.com/512x512.png"})
         return MemeResponse(**meme_data)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error generating meme: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/generate-memes", response_model=BatchMemeResponse)
+async def generate_memes(
+    request: BatchMemeRequest,
+    api_key: ApiKey = Depends(require_permissions(["generate_meme"])),
+    meme_service: MemeService = Depends(get_meme_service),
+):
+    """
+    Generate many memes in one call. Items run concurrently with LLM calls bounded
+    by batch_llm_concurrency; while some items wait on the LLM others render and
+    upload. Each item succeeds or fails on its own.
+    """
+    settings = get_settings()
+    if len(request.items) > settings.batch_max_items:
+        raise HTTPException(status_code=400, detail=f"At most {settings.batch_max_items} items per batch")
+
+    output_format = resolve_output_format(request.output_format, request.quality_preset)
+    llm_limit = asyncio.Semaphore(settings.batch_llm_concurrency)
+    label(template="batch")
+
+    async def run_item(index: int, item: BatchMemeItem) -> BatchMemeResult:
+        try:
+            with stage("template_select"):
+                if item.template_id:
+                    meme_template = await meme_service.get_template(item.template_id)
+                else:
+                    meme_template = await meme_service.get_random_meme()
+            meme_data = await create_meme(meme_service.db, meme_template, item.query, api_key, llm_limit, output_format)
+            return BatchMemeResult(index=index, template_id=meme_template.get('id'), meme=MemeResponse(**meme_data))
+        except HTTPException as e:
+            return BatchMemeResult(index=index, template_id=item.template_id, error=str(e.detail))
+        except Exception as e:
+            print(f"Error generating meme {index}: {str(e)}")
+            return BatchMemeResult(index=index, template_id=item.template_id, error=str(e))
+
+    results = await asyncio.gather(*(run_item(i, item) for i, item in enumerate(request.items)))
+    succeeded = sum(1 for result in results if result.meme is not None)
+    return BatchMemeResponse(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+
+IMAGE_RESPONSES = {200: {"content": {"image/jpeg": {}, "image/webp": {}, "image/avif": {}, "image/png": {}}}}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str, wildcard: bool = False) -> bool:
+    """
+    Whether an If-None-Match header covers the given (strong) ETag.
+    "*" only counts with `wildcard`, for a GET of a representation known to exist.
+    """
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return (wildcard and "*" in candidates) or etag in candidates or f"W/{etag}" in candidates
+
+
+def render_response(render_id: str, entry: Optional[CachedRender], extension: str = "") -> Response:
+    """A cached render, or 304 when `entry` is None. Renders never change under their ID."""
+    headers = {
+        "ETag": f'"{render_id}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Content-Location": f"/api/v1/render/{render_id}",
+    }
+    if entry is None:
+        return Response(status_code=304, headers=headers)
+    headers["Content-Disposition"] = f'inline; filename="{render_id}.{extension}"'
+    return Response(content=entry.content, media_type=entry.content_type, headers=headers)
+
+
+@router.post("/render", response_class=Response, responses=IMAGE_RESPONSES)
+async def render_annotations(
+    request: RenderRequest,
+    if_none_match: Optional[str] = Header(None),
+    api_key: ApiKey = Depends(require_permissions(["generate_meme"])),
+    meme_service: MemeService = Depends(get_meme_service),
+):
+    """
+    Render caller-supplied captions onto a template, without the LLM.
+    The output depends only on the request, so it is cached by a hash of the
+    canonicalized inputs; the hash is the strong ETag and repeats can be
+    revalidated with If-None-Match or fetched from GET /render/{render_id}.
+    If-None-Match: * is ignored here, as it names no render.
+    """
+    output_format = resolve_output_format(request.output_format, request.quality_preset)
+    with stage("template_select"):
+        meme_template = await meme_service.get_template(request.template_id)
+    label(template=request.template_id)
+    if len(request.annotations) > len(meme_template['annotations']):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Template has {len(meme_template['annotations'])} text boxes, got {len(request.annotations)}",
+        )
+
+    annotations = TextOverlay.apply_size_ranges(
+        [box.model_dump() for box in request.annotations], meme_template['annotations']
+    )
+    render_cache = get_render_cache()
+    render_id = render_cache.make_key(meme_template, annotations, output_format)
+    if etag_matches(if_none_match, f'"{render_id}"'):
+        return render_response(render_id, None)
+
+    try:
+        with stage("render_cache"):
+            entry = await render_cache.get(render_id)
+        if entry is None:
+            with stage("download"):
+                image_bytes = await ImageProcessor.get_template_image(meme_template['src']['url'])
+            meme = await get_render_service().render(image_bytes, annotations, output_format)
+            entry = render_cache.put(render_id, meme.getvalue(), output_format.content_type)
+    except Exception as e:
+        print(f"Error rendering meme: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    get_usage_recorder().record(api_key.key_id, bytes_served=len(entry.content))
+    return render_response(render_id, entry, output_format.extension)
+
+
+@router.get("/render/{render_id}", response_class=Response, responses=IMAGE_RESPONSES)
+async def get_render(
+    render_id: str = Path(pattern="^[0-9a-f]{64}$"),
+    if_none_match: Optional[str] = Header(None),
+    api_key: ApiKey = Depends(require_permissions(["generate_meme"])),
+):
+    """Fetch a previous render by its ID (the ETag of POST /render)."""
+    etag = f'"{render_id}"'
+    if etag_matches(if_none_match, etag):
+        return render_response(render_id, None)
+    entry = await get_render_cache().get(render_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Render not found")
+    if etag_matches(if_none_match, etag, wildcard=True):
+        return render_response(render_id, None)
+    get_usage_recorder().record(api_key.key_id, bytes_served=len(entry.content))
+    return render_response(render_id, entry, EXTENSIONS.get(entry.content_type, "bin"))
+
+
 # @router.post("/image-to-meme", response_model=MemeResponse)
 # async def image_to_meme(
 #     request: MemeRequest,
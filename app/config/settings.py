@@ -14,6 +14,71 @@ class Settings(BaseSettings):
     rate_limit_calls: int = 100  # calls per window
     rate_limit_window: int = 3600
 
+    # API key validation cache
+    api_key_cache_ttl: int = 60  # seconds a valid key is trusted without a lookup
+    api_key_negative_cache_ttl: int = 30  # seconds an invalid key is rejected without a lookup
+    api_key_cache_size: int = 10000  # valid keys
+    api_key_negative_cache_size: int = 10000  # rejected keys and unknown key_ids, kept apart from valid keys
+    usage_flush_interval: int = 30  # seconds between API key usage flushes
+
+    # Template source image cache
+    template_cache_max_bytes: int = 64 * 1024 * 1024  # in-memory tier budget
+    template_cache_dir: str | None = ".cache/templates"  # on-disk tier, empty to disable
+    template_cache_ttl: int = 3600  # seconds before an entry is revalidated
+    decoded_cache_max_bytes: int = 256 * 1024 * 1024  # budget for decoded template rasters
+
+    template_registry_ttl: int = 300  # seconds between template reloads without a change stream
+
+    # LLM annotation cache
+    llm_cache_ttl: int = 86400  # seconds
+    llm_cache_max_entries: int = 10000  # in-memory tier
+    llm_cache_persistent: bool = True  # keep a Mongo-backed tier in llm_cache
+
+    # Batch generation
+    batch_max_items: int = 100
+    batch_llm_concurrency: int = 8  # concurrent LLM calls per batch request
+
+    # Rendering
+    output_format: str = "jpeg"  # jpeg, webp, avif or png
+    output_preset: str = "high"  # fast, high, balanced or small
+    render_workers: int = 0  # render processes, 0 renders in the threadpool
+    render_raster_budget: int = 512 * 1024 * 1024  # shared memory for template rasters
+
+    # Render-only endpoint cache, content-addressed by render inputs
+    render_cache_max_bytes: int = 128 * 1024 * 1024  # in-memory tier
+    render_cache_persistent: bool = True  # keep renders in S3 as well
+    render_cache_prefix: str = "renders/"
+
+    # Meme storage
+    storage_backend: str = "s3"  # s3, or local for single-node deployments
+    storage_dir: str = "storage"  # local backend root
+    storage_base_url: str = "/api/v1/files"  # local backend URL prefix, absolute if served elsewhere
+    storage_accel_redirect: str | None = None  # e.g. /protected-files/ to let nginx send local files
+
+    # S3 uploads
+    s3_endpoint_url: str | None = None  # local S3 stand-in, e.g. http://localhost:9000
+    s3_max_pool_connections: int = 50
+    s3_multipart_threshold: int = 8 * 1024 * 1024  # bytes
+    s3_multipart_chunksize: int = 8 * 1024 * 1024
+    upload_index_size: int = 100000  # meme objects remembered as already uploaded
+    upload_index_flush_interval: int = 10  # seconds between writes of new expiries to meme_objects
+    upload_queue_workers: int = 16  # background uploaders, 0 uploads inside the request
+    upload_queue_size: int = 256  # pending uploads before submitters wait
+    upload_drain_timeout: float = 30.0  # seconds to finish pending uploads on shutdown
+
+    # Expired meme cleanup
+    expiry_sweep_interval: int = 0  # seconds between sweeps in the app, 0 leaves it to scripts/sweep_expired.py
+    expiry_sweep_concurrency: int = 4  # delete_objects batches in flight
+    expiry_sweep_grace: int = 3600  # seconds past expiry before an object is deleted
+
+    # Instrumentation
+    metrics_enabled: bool = True  # per-stage timings, Server-Timing headers and /metrics
+    server_timing: bool = True  # send stage timings to clients in a Server-Timing header
+    metrics_token: str | None = None  # bearer token for scraping /metrics, unset requires an admin API key
+    profiling_interval: float = 0.005  # seconds between stack samples of a profiled request
+    profiling_max_reports: int = 20  # profiles kept in memory
+    profiling_max_duration: float = 30.0  # seconds a single profile samples at most
+
      # Add Coolify specific settings. For prod deployment
     source_commit: str | None = None
     coolify_url: str | None = None
@@ -0,0 +1,162 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Seconds. Stages run from well under a millisecond (auth) to seconds (the LLM)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class RequestTimings:
+    """
+    Time spent per pipeline stage during one request, plus the labels the
+    stages are reported under. Repeated stages accumulate, also from
+    threadpool threads working for the same request at once (/generate-memes).
+    """
+
+    __slots__ = ("started", "stages", "labels", "_lock")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.labels: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def merge(self, stages: Dict[str, float]):
+        with self._lock:
+            for name, seconds in stages.items():
+                self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        """The stages as a Server-Timing header value, in milliseconds."""
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        if total is not None:
+            entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def start_timings() -> RequestTimings:
+    """Start timing the current request (or worker task). Stages outside one are not timed."""
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+def label(**labels: str):
+    """Set the labels (template, format) the current request's stages are reported under."""
+    timings = _current.get()
+    if timings is not None:
+        timings.labels.update(labels)
+
+
+class stage:
+    """
+    Time a block as a pipeline stage of the current request:
+
+        with stage("llm"):
+            ...
+
+    Outside a timed request this does nothing beyond one context lookup. The
+    current request follows the code into run_in_threadpool.
+    """
+
+    __slots__ = ("name", "timings", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.timings = _current.get()
+        if self.timings is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            self.timings.add(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class Histogram:
+    """A Prometheus histogram with labels: cumulative bucket counts, sum and count per label set."""
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List] = {}  # labels -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @staticmethod
+    def _labels(pairs) -> str:
+        escape = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}"
+
+    def exposition(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for label_values, counts, total, count in sorted(series):
+            pairs = list(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{self._labels(pairs + [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(pairs)} {total}")
+            lines.append(f"{self.name}_count{self._labels(pairs)} {count}")
+        return lines
+
+
+class Metrics:
+    """Request and per-stage latency histograms, labelled by template and output format."""
+
+    def __init__(self):
+        self.requests = Histogram(
+            "memegen_request_duration_seconds", "Request latency.",
+            ("route", "method", "status", "template", "format"),
+        )
+        self.stages = Histogram(
+            "memegen_stage_duration_seconds", "Time per pipeline stage within a request.",
+            ("stage", "template", "format"),
+        )
+
+    def observe(self, timings: RequestTimings, route: str, method: str, status: int, total: float):
+        template = timings.labels.get("template", "")
+        output_format = timings.labels.get("format", "")
+        self.requests.observe(total, route, method, str(status), template, output_format)
+        for name, seconds in timings.stages.items():
+            self.stages.observe(seconds, name, template, output_format)
+
+    def exposition(self) -> str:
+        return "\n".join(self.requests.exposition() + self.stages.exposition()) + "\n"
+
+
+# Cache the metrics creation: one set per process
+@lru_cache()
+def get_metrics() -> Metrics:
+    return Metrics()
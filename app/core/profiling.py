@@ -0,0 +1,242 @@
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+from functools import lru_cache
+from typing import Deque, Optional
+
+from ..config.settings import get_settings
+
+PROFILE_HEADER = "x-profile"
+
+# Leaf frames of threads that are only waiting, left out of the stacks
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+}
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Statistical profiler: a thread that snapshots every other thread's stack
+    each `interval` seconds and counts identical stacks. The result is in the
+    collapsed format ("thread;outer;...;inner count") that flamegraph.pl,
+    speedscope and most flame graph viewers read.
+
+    It sees the whole process, so stacks of requests running alongside the
+    profiled one show up too.
+    """
+
+    def __init__(self, interval: float = 0.005, max_duration: float = 30.0):
+        self.interval = interval
+        self.max_duration = max_duration
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        deadline = time.monotonic() + self.max_duration
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+class ProfileReport:
+    def __init__(self, method: str, path: str, reason: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.reason = reason  # "sampled" or "header"
+        self.started_at = datetime.utcnow()
+        self.started = time.perf_counter()
+        self.status: Optional[int] = None
+        self.duration: Optional[float] = None
+        self.samples = 0
+        self.stacks: Counter = Counter()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "reason": self.reason,
+            "started_at": self.started_at.isoformat(),
+            "status": self.status,
+            "duration_ms": None if self.duration is None else round(self.duration * 1000, 1),
+            "samples": self.samples,
+            "stacks": len(self.stacks),
+        }
+
+
+class Profiler:
+    """
+    On-demand request profiling, off until an admin arms it.
+
+    While armed (for a limited window) it profiles a random `sample_rate`
+    fraction of requests, and any request sending the armed token in an
+    X-Profile header. One request is profiled at a time; the last
+    `max_reports` reports are kept in memory. Disarmed, a request costs one
+    comparison.
+    """
+
+    def __init__(self, interval: float = 0.005, max_reports: int = 20, max_duration: float = 30.0):
+        self.interval = interval
+        self.max_duration = max_duration
+        self.reports: Deque[ProfileReport] = deque(maxlen=max_reports)
+        self.sample_rate = 0.0
+        self.token: Optional[str] = None
+        self.armed_until = 0.0
+        self._active: Optional[ProfileReport] = None
+        self._sampler: Optional[StackSampler] = None
+        self._lock = threading.Lock()
+        self.skipped_busy = 0
+
+    @property
+    def armed(self) -> bool:
+        return self.armed_until > time.monotonic()
+
+    def arm(self, sample_rate: float, duration: float, header: bool) -> dict:
+        self.sample_rate = sample_rate
+        self.token = secrets.token_urlsafe(16) if header else None
+        self.armed_until = time.monotonic() + duration
+        return self.stats()
+
+    def disarm(self):
+        self.armed_until = 0.0
+        self.sample_rate = 0.0
+        self.token = None
+
+    def reason_to_profile(self, header_value: Optional[str]) -> Optional[str]:
+        if self.token and header_value and secrets.compare_digest(header_value, self.token):
+            return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    def start(self, method: str, path: str, reason: str) -> Optional[ProfileReport]:
+        with self._lock:
+            if self._active is not None:
+                self.skipped_busy += 1
+                return None
+            self._active = report = ProfileReport(method, path, reason)
+            self._sampler = StackSampler(self.interval, self.max_duration)
+        self._sampler.start()
+        return report
+
+    def finish(self, report: ProfileReport, status: Optional[int]):
+        self._sampler.stop()
+        report.duration = time.perf_counter() - report.started
+        report.status = status
+        report.samples = self._sampler.samples
+        report.stacks = self._sampler.stacks
+        with self._lock:
+            self.reports.append(report)
+            self._active = None
+            self._sampler = None
+
+    def get(self, report_id: str) -> Optional[ProfileReport]:
+        return next((r for r in self.reports if r.id == report_id), None)
+
+    def collapsed(self) -> str:
+        """All kept reports merged into one collapsed-stack profile."""
+        merged: Counter = Counter()
+        for report in self.reports:
+            merged.update(report.stacks)
+        return "".join(f"{stack} {count}\n" for stack, count in merged.most_common())
+
+    def stats(self) -> dict:
+        return {
+            "armed": self.armed,
+            "seconds_left": max(0, round(self.armed_until - time.monotonic())),
+            "sample_rate": self.sample_rate if self.armed else 0.0,
+            "header": PROFILE_HEADER if self.armed and self.token else None,
+            "token": self.token if self.armed else None,
+            "interval": self.interval,
+            "reports": [report.summary() for report in reversed(self.reports)],
+            "skipped_busy": self.skipped_busy,
+        }
+
+
+class ProfilingMiddleware:
+    """
+    Plain ASGI middleware so that, while profiling is disarmed, a request
+    passes straight through without a wrapper task or a header lookup.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        profiler = get_profiler()
+        if scope["type"] != "http" or not profiler.armed:
+            return await self.app(scope, receive, send)
+
+        header = dict(scope["headers"]).get(PROFILE_HEADER.encode())
+        reason = profiler.reason_to_profile(header.decode("latin-1") if header else None)
+        report = profiler.start(scope["method"], scope["path"], reason) if reason else None
+        if report is None:
+            return await self.app(scope, receive, send)
+
+        status = None
+
+        async def send_with_report_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", report.id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_report_id)
+        finally:
+            profiler.finish(report, status)
+
+
+# Cache the profiler creation: one per process
+@lru_cache()
+def get_profiler() -> Profiler:
+    settings = get_settings()
+    return Profiler(
+        interval=settings.profiling_interval,
+        max_reports=settings.profiling_max_reports,
+        max_duration=settings.profiling_max_duration,
+    )
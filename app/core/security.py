@@ -2,9 +2,11 @@ from fastapi import Security, HTTPException, status, Depends
 from fastapi.security.api_key import APIKeyHeader
 from typing import Optional, List
 from ..services.api_key_service import ApiKeyService
+from ..services.usage_service import get_usage_recorder
 from ..api.models.schemas import ApiKey, ApiKeyStatus
 from ..db.mongodb import MongoDB
 from ..dependencies import get_database
+from .metrics import stage
 
 API_KEY_NAME = "X-API-Key"
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
@@ -28,7 +30,8 @@ class ApiKeyAuth:
             )
 
         api_key_service = ApiKeyService(db)
-        api_key = await api_key_service.validate_api_key(api_key_header)
+        with stage("auth"):
+            api_key = await api_key_service.validate_api_key(api_key_header)
         if not api_key:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -42,6 +45,8 @@ class ApiKeyAuth:
                 detail="API key is not active",
             )
 
+        get_usage_recorder().record(api_key.key_id, requests=1)
+
          # Check if user has admin permission - bypass all other permission checks
         if "admin" in api_key.permissions:
             return api_key
@@ -11,6 +11,8 @@ class MongoDB:
         self.db = None
         self.meme_templates = None
         self.api_keys = None
+        self.llm_cache = None
+        self.meme_objects = None
 
     async def connect_to_database(self):
         try:
@@ -23,6 +25,8 @@ class MongoDB:
             self.db = self.client.memegen
             self.meme_templates = self.db.meme_templates
             self.api_keys = self.db.api_keys
+            self.llm_cache = self.db.llm_cache
+            self.meme_objects = self.db.meme_objects
         except Exception as e:
             print(f"Error connecting to database: {e}")
             raise e
@@ -33,4 +37,6 @@ class MongoDB:
             self.client = None
             self.db = None
             self.meme_templates = None
-            self.api_keys = None
\ No newline at end of file
+            self.api_keys = None
+            self.llm_cache = None
+            self.meme_objects = None
\ No newline at end of file
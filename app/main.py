@@ -1,12 +1,32 @@
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Security
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from app.api.routes import meme_routes, admin_routes, meme_template_routes
-from app.dependencies import db 
+from app.api.routes import meme_routes, admin_routes, meme_template_routes, file_routes
+from app.dependencies import db, get_database
+from app.utils.image_utils import close_http_client
+from app.utils.font_utils import preload_fonts
+from app.services.render_service import get_render_service
+from app.services.template_registry import get_template_registry
+from app.services.api_key_cache import get_api_key_cache
+from app.services.usage_service import get_usage_recorder
+from app.services.annotation_cache import get_annotation_cache
+from app.services.upload_queue import get_upload_queue
+from app.services.storage_service import get_upload_index
+from app.services.expiry_sweeper import get_expiry_sweeper
+from app.core.metrics import get_metrics, start_timings
+from app.core.profiling import ProfilingMiddleware
+from app.core.security import api_key_header, require_permissions
+from app.config.settings import get_settings
 from contextlib import asynccontextmanager
+from typing import Optional
+import asyncio
+import logging
+import secrets
+import time
 
 # Initialize Limiter
 limiter = Limiter(key_func=get_remote_address)
@@ -15,10 +35,43 @@ limiter = Limiter(key_func=get_remote_address)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    watchers = []
     try:
+        preload_fonts()
+        get_render_service().start()
+        if get_settings().upload_queue_workers > 0:
+            get_upload_queue().start()
         await db.connect_to_database()
+        try:
+            await get_template_registry().load(db.meme_templates)
+        except Exception as e:
+            logging.warning(f"Template registry will load on first use: {e}")
+        if get_annotation_cache().persistent:
+            try:
+                await get_annotation_cache().ensure_indexes(db.llm_cache)
+            except Exception as e:
+                logging.warning(f"Could not create annotation cache indexes: {e}")
+        watchers.append(asyncio.create_task(get_template_registry().watch(db.meme_templates)))
+        watchers.append(asyncio.create_task(get_api_key_cache().watch(db.api_keys)))
+        watchers.append(asyncio.create_task(get_usage_recorder().run(db.api_keys)))
+        watchers.append(asyncio.create_task(get_upload_index().run(db.meme_objects)))
+        if get_settings().expiry_sweep_interval > 0:
+            watchers.append(asyncio.create_task(
+                get_expiry_sweeper().run(db.meme_objects, get_settings().expiry_sweep_interval)
+            ))
         yield
     finally:
+        for watcher in watchers:
+            watcher.cancel()
+        # Let cancelled flushes put their batches back before the final flushes
+        await asyncio.gather(*watchers, return_exceptions=True)
+        if db.api_keys is not None:
+            await get_usage_recorder().flush(db.api_keys)
+        await get_upload_queue().drain(get_settings().upload_drain_timeout)
+        if db.meme_objects is not None:
+            await get_upload_index().flush(db.meme_objects)
+        get_render_service().shutdown()
+        await close_http_client()
         await db.close_database_connection()
 
 # Initialize FastAPI app
@@ -44,6 +97,9 @@ app.add_middleware(
     allowed_hosts=["*"]  # Note: Discussed below
 )
 
+# On-demand profiling, armed through /api/v1/admin/profiling
+app.add_middleware(ProfilingMiddleware)
+
 # Add Custom Security Headers Middleware
 @app.middleware("http")
 async def security_middleware(request: Request, call_next):
@@ -56,14 +112,56 @@ async def security_middleware(request: Request, call_next):
     response.headers.update(headers)
     return response
 
+# Per-stage timings: recorded by `stage` blocks along the request, reported in
+# a Server-Timing header and in the /metrics histograms
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    settings = get_settings()
+    if not settings.metrics_enabled:
+        return await call_next(request)
+
+    timings = start_timings()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        total = time.perf_counter() - timings.started
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        get_metrics().observe(timings, route, request.method, status_code, total)
+    if settings.server_timing:
+        response.headers["Server-Timing"] = timings.server_timing(total)
+    return response
+
 # Define Routes
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(
+    authorization: Optional[str] = Header(None),
+    api_key: Optional[str] = Security(api_key_header),
+    database=Depends(get_database),
+):
+    """
+    Latency histograms in the Prometheus text format.
+    Scrapers authenticate with the metrics token, or with an admin API key if no token is set.
+    """
+    settings = get_settings()
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.metrics_token:
+        if not secrets.compare_digest(authorization or "", f"Bearer {settings.metrics_token}"):
+            raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+    else:
+        await require_permissions(["admin"])(api_key, database)
+    return PlainTextResponse(get_metrics().exposition(), media_type="text/plain; version=0.0.4")
+
 app.include_router(meme_routes.router, prefix="/api/v1")
 app.include_router(admin_routes.router, prefix="/api/v1/admin")
 app.include_router(meme_template_routes.router, prefix="/api/v1")
+app.include_router(file_routes.router, prefix="/api/v1")
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,6 +1,7 @@
 from .api_key_service import ApiKeyService
 from .meme_service import MemeService
 from .openai_service import OpenAIService
-from .s3_service import S3Service
+from .storage_service import StorageService
+from .render_service import RenderService, get_render_service
 
-__all__ = ['ApiKeyService', 'MemeService', 'OpenAIService', 'S3Service']
\ No newline at end of file
+__all__ = ['ApiKeyService', 'MemeService', 'OpenAIService', 'StorageService', 'RenderService', 'get_render_service']
\ No newline at end of file
@@ -0,0 +1,145 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional, Set
+
+from ..config.settings import get_settings
+from ..utils.prompts import get_meme_prompt_version
+from .openai_service import MODEL, TEMPERATURE
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Reduce a query to the part that matters for the meme:
+    "Monday mornings!" and "  monday  MORNINGS" both become "monday mornings".
+    """
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = re.sub(r"[^\w\s]", " ", query)
+    return " ".join(query.split())
+
+
+class AnnotationCache:
+    """
+    Cache of LLM annotation results.
+
+    Keyed by template (ID plus a digest of its content, so edits invalidate),
+    normalized query, system prompt version, model and temperature. An
+    in-memory LRU with a TTL sits in front of a Mongo collection whose TTL
+    index expires documents after the same period.
+    """
+
+    def __init__(self, ttl: int = 86400, max_entries: int = 10000, persistent: bool = True):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._writes: Set[asyncio.Task] = set()
+
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(meme_template: dict, query: str) -> str:
+        template_content = json.dumps(
+            [meme_template.get("src"), meme_template.get("annotations")], sort_keys=True, default=str
+        )
+        parts = [
+            meme_template.get("id") or "",
+            hashlib.sha256(template_content.encode()).hexdigest(),
+            normalize_query(query),
+            get_meme_prompt_version(),
+            MODEL,
+            str(TEMPERATURE),
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+    def _store(self, key: str, analysis: dict, expires_at: float):
+        self._entries[key] = (analysis, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, key: str, collection=None) -> Optional[dict]:
+        """
+        Return a private copy of the cached analysis, or None on a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            analysis, expires_at = entry
+            if time.time() < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(analysis)
+            del self._entries[key]
+
+        if self.persistent and collection is not None:
+            try:
+                doc = await collection.find_one({"_id": key})
+            except Exception as e:
+                logger.warning(f"Annotation cache lookup failed: {e}")
+                doc = None
+            if doc is not None:
+                age = (datetime.utcnow() - doc["created_at"]).total_seconds()
+                if age < self.ttl:
+                    self.persistent_hits += 1
+                    self._store(key, doc["analysis"], time.time() + self.ttl - age)
+                    return copy.deepcopy(doc["analysis"])
+
+        self.misses += 1
+        return None
+
+    async def _persist(self, key: str, analysis: dict, collection):
+        try:
+            await collection.replace_one(
+                {"_id": key},
+                {"_id": key, "analysis": analysis, "created_at": datetime.utcnow()},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning(f"Annotation cache write failed: {e}")
+
+    def put(self, key: str, analysis: dict, collection=None):
+        """Cache an analysis; the persistent write happens in the background."""
+        analysis = copy.deepcopy(analysis)
+        self._store(key, analysis, time.time() + self.ttl)
+        if self.persistent and collection is not None:
+            task = asyncio.create_task(self._persist(key, analysis, collection))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    async def ensure_indexes(self, collection):
+        await collection.create_index("created_at", expireAfterSeconds=self.ttl)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Cache the cache creation: one per process
+@lru_cache()
+def get_annotation_cache() -> AnnotationCache:
+    settings = get_settings()
+    return AnnotationCache(
+        ttl=settings.llm_cache_ttl,
+        max_entries=settings.llm_cache_max_entries,
+        persistent=settings.llm_cache_persistent,
+    )
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Set, Tuple
+
+from ..config.settings import get_settings
+from ..api.models.schemas import ApiKey
+
+logger = logging.getLogger(__name__)
+
+# Changes to api_keys that affect authorization; last_used bumps are ignored
+AUTH_CHANGES_PIPELINE = [
+    {"$match": {"$or": [
+        {"operationType": {"$in": ["delete", "replace"]}},
+        {"updateDescription.updatedFields.status": {"$exists": True}},
+        {"updateDescription.updatedFields.permissions": {"$exists": True}},
+    ]}}
+]
+
+
+class ApiKeyCache:
+    """
+    Short-TTL cache of API key validation results.
+
+    Valid keys are cached by (key_id, hashed key) with their permissions for
+    `ttl` seconds. Rejections are cached for `negative_ttl` seconds in a
+    separate LRU: unknown key_ids (the non-secret half of a key) on their own,
+    so random keys under one made-up key_id cost one lookup, and known
+    key_ids by (key_id, hashed key). Both LRUs are bounded, and because they
+    are separate a flood of bad credentials can only evict other rejections,
+    never valid keys.
+
+    Revocation and deletion invalidate valid entries by key_id in this
+    process immediately; other processes are told through a change stream on
+    api_keys when available and otherwise catch up within `ttl`. Rejections
+    need no invalidation: new keys always get a fresh key_id.
+    """
+
+    def __init__(self, ttl: int = 60, negative_ttl: int = 30, max_entries: int = 10000,
+                 negative_max_entries: int = 10000):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.negative_max_entries = negative_max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[ApiKey, float]]" = OrderedDict()
+        # (key_id, hashed key) for a wrong or inactive key, (key_id, None) for an unknown key_id
+        self._negative: "OrderedDict[Tuple[str, Optional[str]], float]" = OrderedDict()
+        self._by_key_id: Dict[str, Set[Tuple[str, str]]] = {}
+        self._doc_ids: Dict[str, str] = {}  # Mongo _id -> key_id, for cached valid keys
+        self._key_doc_ids: Dict[str, str] = {}  # key_id -> Mongo _id
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.negative_evictions = 0
+        self.invalidations = 0
+
+    def _negative_hit(self, cache_key: Tuple[str, Optional[str]]) -> bool:
+        expires_at = self._negative.get(cache_key)
+        if expires_at is None:
+            return False
+        if time.monotonic() >= expires_at:
+            del self._negative[cache_key]
+            return False
+        self._negative.move_to_end(cache_key)
+        return True
+
+    def get(self, key_id: str, hashed_key: str) -> Tuple[bool, Optional[ApiKey]]:
+        """
+        Look up a validation result.
+
+        Returns:
+            tuple: (found, api_key); api_key is None for a cached invalid key
+        """
+        cache_key = (key_id, hashed_key)
+        entry = self._entries.get(cache_key)
+        if entry is not None:
+            api_key, expires_at = entry
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return True, api_key
+            self._remove(cache_key)
+
+        if self._negative_hit((key_id, None)) or self._negative_hit(cache_key):
+            self.negative_hits += 1
+            return True, None
+
+        self.misses += 1
+        return False, None
+
+    def put(self, key_id: str, hashed_key: str, api_key: ApiKey, doc_id: Optional[str] = None):
+        """Cache a valid key."""
+        cache_key = (key_id, hashed_key)
+        self._entries[cache_key] = (api_key, time.monotonic() + self.ttl)
+        self._entries.move_to_end(cache_key)
+        self._by_key_id.setdefault(key_id, set()).add(cache_key)
+        if doc_id is not None:
+            self._doc_ids[doc_id] = key_id
+            self._key_doc_ids[key_id] = doc_id
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def put_invalid(self, key_id: str, hashed_key: Optional[str] = None):
+        """Cache a rejection: of one key, or with no hashed key, of every key under an unknown key_id."""
+        cache_key = (key_id, hashed_key)
+        self._negative[cache_key] = time.monotonic() + self.negative_ttl
+        self._negative.move_to_end(cache_key)
+        while len(self._negative) > self.negative_max_entries:
+            self._negative.popitem(last=False)
+            self.negative_evictions += 1
+
+    def _remove(self, cache_key: Tuple[str, str]):
+        self._entries.pop(cache_key, None)
+        key_id = cache_key[0]
+        keys = self._by_key_id.get(key_id)
+        if keys is not None:
+            keys.discard(cache_key)
+            if not keys:
+                del self._by_key_id[key_id]
+                doc_id = self._key_doc_ids.pop(key_id, None)
+                if doc_id is not None:
+                    self._doc_ids.pop(doc_id, None)
+
+    def invalidate(self, key_id: str):
+        """Drop every cached valid result for a key_id."""
+        for cache_key in list(self._by_key_id.get(key_id, ())):
+            self._remove(cache_key)
+        self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._negative.clear()
+        self._by_key_id.clear()
+        self._doc_ids.clear()
+        self._key_doc_ids.clear()
+
+    async def watch(self, collection):
+        """
+        Invalidate entries changed by other processes, if the server supports change streams.
+        """
+        try:
+            async with collection.watch(AUTH_CHANGES_PIPELINE) as stream:
+                async for change in stream:
+                    doc_id = str(change["documentKey"]["_id"])
+                    key_id = self._doc_ids.get(doc_id)
+                    if key_id is not None:
+                        self.invalidate(key_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"API key change stream unavailable ({e}), relying on a {self.ttl}s TTL")
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "negative_entries": len(self._negative),
+            "negative_max_entries": self.negative_max_entries,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "negative_evictions": self.negative_evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# Cache the cache creation: one per process
+@lru_cache()
+def get_api_key_cache() -> ApiKeyCache:
+    settings = get_settings()
+    return ApiKeyCache(
+        ttl=settings.api_key_cache_ttl,
+        negative_ttl=settings.api_key_negative_cache_ttl,
+        max_entries=settings.api_key_cache_size,
+        negative_max_entries=settings.api_key_negative_cache_size,
+    )
@@ -5,11 +5,14 @@ from datetime import datetime
 from typing import Optional, List, Tuple
 from bson import ObjectId
 from ..db.mongodb import MongoDB
-from ..api.models.schemas import ApiKeyStatus, ApiKey, ApiKeyCreate
+from ..api.models.schemas import ApiKeyStatus, ApiKey, ApiKeyCreate, ApiKeyUsage
+from .api_key_cache import get_api_key_cache
+from .usage_service import get_usage_recorder, USAGE_COUNTERS
 
 class ApiKeyService:
     def __init__(self, db: MongoDB):
         self.db = db
+        self.cache = get_api_key_cache()
     
     def _generate_key(self, length: int = 32) -> str:
         """Generate a secure random API key"""
@@ -40,29 +43,34 @@ class ApiKeyService:
         return f"{key_doc['key_id']}.{raw_key}", ApiKey(**key_doc)
 
     async def validate_api_key(self, api_key: str) -> Optional[ApiKey]:
-        """Validate an API key and update last used timestamp"""
+        """
+        Validate an API key.
+        Results, valid or not, are cached briefly; a cache hit does not touch the database.
+        Unknown key_ids are cached as rejected whatever the secret half, so random keys
+        under one key_id cost a single lookup.
+        Usage (last_used and counters) is recorded write-behind by the UsageRecorder.
+        """
         try:
             key_id, raw_key = api_key.split(".", 1)
             hashed_key = self._hash_key(raw_key)
+
+            found, cached_key = self.cache.get(key_id, hashed_key)
+            if found:
+                return cached_key
             
-            current_time = datetime.utcnow()
-            
-            key_doc = await self.db.api_keys.find_one_and_update(
-                {
-                    "key_id": key_id,
-                    "hashed_key": hashed_key,
-                    "status": ApiKeyStatus.ACTIVE,
-                },
-                {
-                    "$set": {"last_used": current_time}
-                },
-                return_document=True
-            )
-            
+            # Look up by key_id alone so an unknown key_id is rejected for every key under it
+            key_doc = await self.db.api_keys.find_one({"key_id": key_id})
             if not key_doc:
+                self.cache.put_invalid(key_id)
                 return None
-                
-            return ApiKey(**key_doc)
+            if not secrets.compare_digest(key_doc.get("hashed_key", ""), hashed_key) \
+                    or key_doc.get("status") != ApiKeyStatus.ACTIVE:
+                self.cache.put_invalid(key_id, hashed_key)
+                return None
+
+            validated_key = ApiKey(**key_doc)
+            self.cache.put(key_id, hashed_key, validated_key, str(key_doc.get("_id")))
+            return validated_key
                 
         except Exception:
             return None
@@ -76,11 +84,13 @@ class ApiKeyService:
             },
             {"$set": {"status": ApiKeyStatus.REVOKED}}
         )
+        self.cache.invalidate(key_id)
         return result.modified_count > 0
 
     async def delete_api_key(self, key_id: str) -> bool:
         """Delete an API key"""
         result = await self.db.api_keys.delete_one({"key_id": key_id})
+        self.cache.invalidate(key_id)
         return result.deleted_count > 0
 
     async def list_api_keys(self, skip: int = 0, limit: int = 100) -> List[ApiKey]:
@@ -105,4 +115,27 @@ class ApiKeyService:
     async def count_api_keys(self, status: Optional[ApiKeyStatus] = None) -> int:
         """Count total API keys, optionally filtered by status"""
         filter_query = {"status": status} if status else {}
-        return await self.db.api_keys.count_documents(filter_query)
\ No newline at end of file
+        return await self.db.api_keys.count_documents(filter_query)
+
+    async def get_usage(self, key_id: Optional[str] = None, skip: int = 0, limit: int = 100) -> List[ApiKeyUsage]:
+        """Usage per API key: flushed totals plus whatever is still pending in this process"""
+        filter_query = {"key_id": key_id} if key_id else {}
+        cursor = self.db.api_keys.find(
+            filter_query, {"key_id": 1, "name": 1, "last_used": 1, "usage": 1}
+        ).skip(skip).limit(limit)
+
+        recorder = get_usage_recorder()
+        results = []
+        async for key_doc in cursor:
+            usage = key_doc.get("usage") or {}
+            totals = {counter: usage.get(counter, 0) for counter in USAGE_COUNTERS}
+            last_used = key_doc.get("last_used")
+
+            pending = recorder.pending(key_doc["key_id"])
+            if pending is not None:
+                for counter in USAGE_COUNTERS:
+                    totals[counter] += getattr(pending, counter)
+                last_used = max(filter(None, (last_used, pending.last_used)))
+
+            results.append(ApiKeyUsage(key_id=key_doc["key_id"], name=key_doc["name"], last_used=last_used, **totals))
+        return results
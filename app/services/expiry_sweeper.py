@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..config.settings import get_settings
+from .storage import MEME_TTL, get_storage
+from .storage_service import get_upload_index
+
+logger = logging.getLogger(__name__)
+
+MAX_DELETE_BATCH = 1000  # delete_objects limit
+
+
+class SweepReport:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.pages = 0
+        self.listed = 0
+        self.expired = 0
+        self.deleted = 0
+        self.errors = 0
+        self.unindexed = 0  # objects judged by LastModified, not the index
+        self.elapsed = 0.0
+
+    def as_dict(self) -> dict:
+        elapsed = self.elapsed or time.perf_counter() - self.started
+        return {
+            "pages": self.pages,
+            "listed": self.listed,
+            "expired": self.expired,
+            "deleted": self.deleted,
+            "errors": self.errors,
+            "unindexed": self.unindexed,
+            "elapsed_s": round(elapsed, 3),
+            "listed_per_s": round(self.listed / elapsed, 1) if elapsed else 0.0,
+            "deleted_per_s": round(self.deleted / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+class ExpirySweeper:
+    """
+    Deletes memes past their expiry date.
+
+    Pages through the storage listing and looks each page's keys up in the
+    meme_objects index written at upload time; objects missing from the index
+    (uploaded before it existed) expire MEME_TTL after LastModified. Expired
+    keys are deleted in delete_objects batches with at most `concurrency`
+    batches in flight, so memory and request rate stay flat however large
+    storage is.
+    """
+
+    def __init__(
+        self,
+        prefix: str = "meme_",
+        batch_size: int = MAX_DELETE_BATCH,
+        concurrency: int = 4,
+        grace: int = 3600,
+    ):
+        self.prefix = prefix
+        self.batch_size = min(batch_size, MAX_DELETE_BATCH)
+        self.concurrency = concurrency
+        self.grace = timedelta(seconds=grace)
+        self.last_report: Optional[dict] = None
+
+    async def _expiries(self, collection, keys: List[str]) -> Dict[str, datetime]:
+        if collection is None:
+            return {}
+        cursor = collection.find({"_id": {"$in": keys}}, {"expires_at": 1})
+        return {doc["_id"]: doc["expires_at"] for doc in await cursor.to_list(length=None)}
+
+    async def _delete_batch(self, collection, keys: List[str], report: SweepReport):
+        try:
+            deleted = await run_in_threadpool(get_storage().delete, keys)
+        except Exception as e:
+            report.errors += len(keys)
+            logger.warning(f"Failed to delete {len(keys)} expired memes: {e}")
+            return
+
+        report.errors += len(keys) - len(deleted)
+        report.deleted += len(deleted)
+        get_upload_index().forget(deleted)
+        if collection is not None and deleted:
+            try:
+                await collection.delete_many({"_id": {"$in": deleted}})
+            except Exception as e:
+                logger.warning(f"Failed to drop {len(deleted)} deleted memes from the index: {e}")
+
+    async def sweep(self, collection=None, now: Optional[datetime] = None, dry_run: bool = False) -> dict:
+        """
+        Run one pass over storage.
+
+        Args:
+            collection: The meme_objects collection, or None to go by LastModified only
+            now: Reference time, defaults to the current time
+            dry_run: Count expired objects without deleting them
+
+        Returns:
+            dict: Totals and throughput for the pass
+        """
+        cutoff = (now or datetime.now()) - self.grace
+        report = SweepReport()
+        limit = asyncio.Semaphore(self.concurrency)
+        deletes = set()
+        pending: List[str] = []
+
+        async def schedule(keys: List[str]):
+            await limit.acquire()
+
+            async def run():
+                try:
+                    await self._delete_batch(collection, keys, report)
+                finally:
+                    limit.release()
+
+            task = asyncio.create_task(run())
+            deletes.add(task)
+            task.add_done_callback(deletes.discard)
+
+        pages = get_storage().list_pages(self.prefix, MAX_DELETE_BATCH)
+        while True:
+            objects = await run_in_threadpool(next, pages, None)
+            if objects is None:
+                break
+            report.pages += 1
+            report.listed += len(objects)
+
+            expiries = await self._expiries(collection, [obj.key for obj in objects])
+            for obj in objects:
+                # LastModified is UTC; expiry dates are naive local times like the upload metadata
+                last_modified = obj.last_modified.astimezone().replace(tzinfo=None)
+                expires_at = expiries.get(obj.key)
+                if expires_at is None:
+                    report.unindexed += 1
+                    expires_at = last_modified + MEME_TTL
+                # A recent write means the object was just refreshed, whatever the index says
+                if expires_at < cutoff and last_modified < cutoff:
+                    report.expired += 1
+                    if dry_run:
+                        continue
+                    pending.append(obj.key)
+                    if len(pending) >= self.batch_size:
+                        await schedule(pending)
+                        pending = []
+
+        if pending:
+            await schedule(pending)
+        if deletes:
+            await asyncio.gather(*deletes)
+
+        report.elapsed = time.perf_counter() - report.started
+        self.last_report = report.as_dict()
+        return self.last_report
+
+    async def run(self, collection, interval: int):
+        """Sweep every `interval` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                # Expiries written since the last flush must be visible to the sweep
+                await get_upload_index().flush(collection)
+                report = await self.sweep(collection)
+                logger.info(f"Expiry sweep: {report}")
+            except Exception as e:
+                logger.warning(f"Expiry sweep failed: {e}")
+
+    def stats(self) -> dict:
+        return {"last_sweep": self.last_report}
+
+
+# Cache the sweeper creation: one per process
+@lru_cache()
+def get_expiry_sweeper() -> ExpirySweeper:
+    settings = get_settings()
+    return ExpirySweeper(
+        concurrency=settings.expiry_sweep_concurrency,
+        grace=settings.expiry_sweep_grace,
+    )
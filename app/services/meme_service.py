@@ -1,32 +1,35 @@
 from fastapi import HTTPException
 from bson import ObjectId
 from ..api.models.schemas import MemeTemplate, MemeTemplateUpdate
+from .template_registry import get_template_registry
 from typing import List
 
 class MemeService:
     def __init__(self, db):
         self.db = db
+        self.registry = get_template_registry()
+
+    async def _ensure_registry(self):
+        try:
+            await self.registry.ensure_loaded(self.db.meme_templates)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
     async def create_template(self, template: MemeTemplate) -> dict:
         result = await self.db.meme_templates.insert_one(template.model_dump())
+        self.registry.invalidate()
         return {"id": str(result.inserted_id), **template.model_dump()}
 
     async def get_template(self, template_id: str) -> dict:
-        try:
-            template = await self.db.meme_templates.find_one({"_id": ObjectId(template_id)})
-            if template:
-                return {"id": str(template["_id"]), **{k: v for k, v in template.items() if k != "_id"}}
+        await self._ensure_registry()
+        template = self.registry.get(template_id)
+        if template is None:
             raise HTTPException(status_code=404, detail="Template not found")
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=str(e))
+        return template
 
     async def get_all_templates(self) -> List[dict]:
-        templates = []
-        async for template in self.db.meme_templates.find():
-            templates.append(
-                {"id": str(template["_id"]), **{k: v for k, v in template.items() if k != "_id"}}
-            )
-        return templates
+        await self._ensure_registry()
+        return self.registry.all()
 
     async def update_template(self, template_id: str, template_update: MemeTemplateUpdate) -> dict:
         try:
@@ -38,6 +41,7 @@ class MemeService:
                 {"_id": ObjectId(template_id)},
                 {"$set": update_data}
             )
+            self.registry.invalidate()
             
             if result.modified_count == 0:
                 raise HTTPException(status_code=404, detail="Template not found")
@@ -49,6 +53,7 @@ class MemeService:
     async def delete_template(self, template_id: str) -> dict:
         try:
             result = await self.db.meme_templates.delete_one({"_id": ObjectId(template_id)})
+            self.registry.invalidate()
             if result.deleted_count == 0:
                 raise HTTPException(status_code=404, detail="Template not found")
             return {"message": "Template deleted successfully"}
@@ -56,11 +61,8 @@ class MemeService:
             raise HTTPException(status_code=400, detail=str(e))
 
     async def get_random_meme(self) -> dict:
-        try:
-            # Using MongoDB's aggregation pipeline to get a random document
-            pipeline = [{"$sample": {"size": 1}}]
-            async for template in self.db.meme_templates.aggregate(pipeline):
-                return {k: v for k, v in template.items() if k != "_id"}
+        await self._ensure_registry()
+        template = self.registry.random()
+        if template is None:
             raise HTTPException(status_code=404, detail="No templates found")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        return template
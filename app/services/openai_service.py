@@ -1,15 +1,20 @@
-from openai import AzureOpenAI
+from openai import AsyncAzureOpenAI
 import json
 from functools import lru_cache
 from ..config.settings import get_settings
+from ..core.metrics import stage
 from ..utils.image_utils import ImageProcessor
 
 settings = get_settings()
 
+# Completion settings, also part of the annotation cache key
+MODEL = "gpt-4o-mini"
+TEMPERATURE = 0.3
+
 # Cache the client creation
 @lru_cache()
 def get_openai_client():
-    return AzureOpenAI(
+    return AsyncAzureOpenAI(
         api_key=settings.azure_openai_api_key,
         api_version=settings.azure_openai_api_version,
         azure_endpoint=settings.azure_openai_api_endpoint
@@ -17,31 +22,34 @@ def get_openai_client():
 
 class OpenAIService:
     @staticmethod
-    def analyze_image(system_prompt: str, user_prompt: str, image_bytes: bytes) -> dict:
+    async def analyze_image(system_prompt: str, user_prompt: str, image_bytes: bytes) -> dict:
         client = get_openai_client()
         img_processor = ImageProcessor()
-        base64_image = img_processor.encode_image(image_bytes)
+        with stage("prompt"):
+            base64_image = img_processor.encode_image(image_bytes)
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            temperature=0.3,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": user_prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}",
-                                "detail": "low"
+        with stage("llm"):
+            response = await client.chat.completions.create(
+                model=MODEL,
+                temperature=TEMPERATURE,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": user_prompt},
+                            {
+                                "type": "image_url",
+                                "image_url": {
+                                    "url": f"data:image/jpeg;base64,{base64_image}",
+                                    "detail": "low"
+                                },
                             },
-                        },
-                    ],
-                }
-            ],
-            response_format={"type": "json_object"}
-        )
+                        ],
+                    }
+                ],
+                response_format={"type": "json_object"}
+            )
         
-        return json.loads(response.choices[0].message.content)
\ No newline at end of file
+        with stage("parse"):
+            return json.loads(response.choices[0].message.content)
\ No newline at end of file
@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..config.settings import get_settings
+from ..utils.encoders import OutputFormat
+from .storage_service import StorageService
+
+logger = logging.getLogger(__name__)
+
+# Bump when a rendering change alters the output for the same inputs
+RENDER_VERSION = "3"
+
+
+class CachedRender(NamedTuple):
+    content: bytes
+    content_type: str
+
+
+class RenderCache:
+    """
+    Content-addressed cache of encoded renders.
+
+    A render depends only on the template, the annotations and the output
+    settings, so the key is a hash of those, canonicalized. Entries never go
+    stale: a byte-bounded in-memory LRU sits in front of objects in storage
+    under `prefix` in storage, and the key doubles as a strong ETag.
+    """
+
+    def __init__(self, max_bytes: int, prefix: str = "renders/", persistent: bool = True):
+        self.max_bytes = max_bytes
+        self.prefix = prefix
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, CachedRender]" = OrderedDict()
+        self._size = 0
+        self._writes: Set[asyncio.Task] = set()
+
+        self.hits = 0
+        self.storage_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(meme_template: dict, annotations: list, output_format: OutputFormat) -> str:
+        inputs = {
+            "template": [meme_template.get("id"), meme_template.get("src"), meme_template.get("annotations")],
+            "annotations": annotations,
+            "output": [output_format.name, output_format.preset, output_format.options],
+            "version": RENDER_VERSION,
+        }
+        canonical = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def _storage_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _store(self, key: str, entry: CachedRender):
+        if len(entry.content) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous.content)
+        self._entries[key] = entry
+        self._size += len(entry.content)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted.content)
+            self.evictions += 1
+
+    async def get(self, key: str) -> Optional[CachedRender]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        if self.persistent:
+            try:
+                stored = await run_in_threadpool(StorageService.get_object, self._storage_key(key))
+            except Exception as e:
+                logger.warning(f"Render cache lookup failed: {e}")
+                stored = None
+            if stored is not None:
+                self.storage_hits += 1
+                entry = CachedRender(*stored)
+                self._store(key, entry)
+                return entry
+
+        self.misses += 1
+        return None
+
+    async def _persist(self, key: str, entry: CachedRender):
+        try:
+            await run_in_threadpool(StorageService.put_object, self._storage_key(key), entry.content, entry.content_type)
+        except Exception as e:
+            logger.warning(f"Render cache write failed: {e}")
+
+    def put(self, key: str, content: bytes, content_type: str) -> CachedRender:
+        """Cache an encoded render; the storage write happens in the background."""
+        entry = CachedRender(content, content_type)
+        self._store(key, entry)
+        if self.persistent:
+            task = asyncio.create_task(self._persist(key, entry))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+        return entry
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "storage_hits": self.storage_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Cache the cache creation: one per process
+@lru_cache()
+def get_render_cache() -> RenderCache:
+    settings = get_settings()
+    return RenderCache(
+        max_bytes=settings.render_cache_max_bytes,
+        prefix=settings.render_cache_prefix,
+        persistent=settings.render_cache_persistent,
+    )
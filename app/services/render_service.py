@@ -0,0 +1,334 @@
+import asyncio
+import hashlib
+import io
+import logging
+import multiprocessing
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image
+
+from ..config.settings import get_settings
+from ..core.metrics import current_timings, start_timings
+from ..utils.font_utils import preload_fonts
+from ..utils.image_cache import get_decoded_cache
+from ..utils.encoders import OutputFormat
+from ..utils.text_overlay import TextOverlay
+
+logger = logging.getLogger(__name__)
+
+# Headroom on top of the raw raster size for encoder output segments
+OUTPUT_MARGIN = 64 * 1024
+# Shared memory segments a worker keeps attached
+WORKER_ATTACH_CACHE_SIZE = 32
+# Names of the most recently unlinked rasters sent with each render, so workers close their mappings
+RETIRED_NAMES_SENT = 64
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+_attached: "OrderedDict[str, SharedMemory]" = OrderedDict()
+_retired_seen = 0
+
+
+def _attach(name: str) -> SharedMemory:
+    """Attach to a segment owned by the parent, keeping recent attachments open."""
+    shm = _attached.get(name)
+    if shm is not None:
+        _attached.move_to_end(name)
+        return shm
+    # Workers share the parent's resource tracker, so attaching does not take ownership
+    shm = SharedMemory(name=name)
+    _attached[name] = shm
+    while len(_attached) > WORKER_ATTACH_CACHE_SIZE:
+        _, old = _attached.popitem(last=False)
+        old.close()
+    return shm
+
+
+def _close_retired(retired_count: int, retired_names: Tuple[str, ...]):
+    """
+    Close attachments to rasters the parent has unlinked, so a worker never
+    pins memory the parent has already given up. `retired_count` counts every
+    raster unlinked so far and `retired_names` are the latest of them; if the
+    worker missed more than that, it closes all its attachments.
+    """
+    global _retired_seen
+    missed = retired_count - _retired_seen
+    if missed > len(retired_names):
+        while _attached:
+            _, shm = _attached.popitem(last=False)
+            shm.close()
+    elif missed > 0:
+        for name in retired_names[-missed:]:
+            shm = _attached.pop(name, None)
+            if shm is not None:
+                shm.close()
+    _retired_seen = retired_count
+
+
+def _init_worker():
+    preload_fonts()
+
+
+def _render_in_worker(
+    raster_name: str,
+    size: Tuple[int, int],
+    mode: str,
+    annotations: List[dict],
+    output_name: str,
+    output_capacity: int,
+    output_format: Optional[OutputFormat] = None,
+    retired: Tuple[int, Tuple[str, ...]] = (0, ()),
+) -> Tuple[int | bytes, Dict[str, float]]:
+    """
+    Render annotations onto a template raster living in shared memory.
+
+    The encoded image is written into the output segment and only its length
+    travels back through the pipe. Returns the bytes themselves if they do
+    not fit the segment, along with the stage timings of the render.
+    """
+    _close_retired(*retired)
+    timings = start_timings()
+    raster = _attach(raster_name)
+    template = Image.frombuffer(mode, size, raster.buf, "raw", mode, 0, 1)
+    image = template.copy()
+    del template  # release the export of the shared buffer
+
+    encoded = TextOverlay().add_multiple_texts(image, annotations, output_format)
+    length = encoded.getbuffer().nbytes
+    if length > output_capacity:
+        return encoded.getvalue(), timings.stages
+
+    output = _attach(output_name)
+    output.buf[:length] = encoded.getbuffer()
+    return length, timings.stages
+
+
+# ---------------------------------------------------------------------------
+# Parent side
+# ---------------------------------------------------------------------------
+
+class SharedRaster:
+    def __init__(self, shm: SharedMemory, size: Tuple[int, int], mode: str):
+        self.shm = shm
+        self.size = size
+        self.mode = mode
+        self.in_use = 0
+
+
+class RenderService:
+    """
+    Renders memes on a pool of worker processes so composition and encoding
+    are not serialized behind one interpreter's GIL.
+
+    Decoded template rasters are published once into shared memory and
+    reused across renders; workers map them instead of receiving pickled
+    bytes. Rasters evicted past `raster_budget` are unlinked, and each render
+    tells its worker which ones so the worker closes its mappings too and
+    the memory is actually freed. Each render gets an output segment (pooled
+    and reused) that the worker encodes into, so only a length crosses the
+    process boundary.
+
+    With `workers=0` renders run in the threadpool of the current process.
+    If a worker dies (OOM kill, crash in a codec) the pool is replaced and
+    the render retried once.
+    """
+
+    def __init__(self, workers: int = 0, raster_budget: int = 512 * 1024 * 1024):
+        self.workers = workers
+        self.raster_budget = raster_budget
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._rasters: "OrderedDict[bytes, SharedRaster]" = OrderedDict()
+        self._raster_bytes = 0
+        self._retired: "deque[str]" = deque(maxlen=RETIRED_NAMES_SENT)  # latest unlinked raster names
+        self._retired_count = 0
+        self._outputs: Dict[int, List[SharedMemory]] = {}
+        self._lock = threading.Lock()
+
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+
+    def start(self):
+        if self.workers > 0 and self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+
+    def _replace_broken_pool(self, broken: ProcessPoolExecutor):
+        """Drop a pool whose worker died and start a fresh one, unless another render already did."""
+        if self._executor is not broken:
+            return
+        self._executor = None
+        self.restarts += 1
+        logger.warning("Render worker died, restarting the process pool")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.start()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        with self._lock:
+            for raster in self._rasters.values():
+                raster.shm.close()
+                raster.shm.unlink()
+            self._rasters.clear()
+            self._raster_bytes = 0
+            for segments in self._outputs.values():
+                for shm in segments:
+                    shm.close()
+                    shm.unlink()
+            self._outputs.clear()
+
+    def _publish_raster(self, key: bytes, image_bytes: io.BytesIO) -> SharedRaster:
+        """Get the shared raster for a template, decoding and publishing it on first use."""
+        with self._lock:
+            raster = self._rasters.get(key)
+            if raster is not None:
+                self._rasters.move_to_end(key)
+                raster.in_use += 1
+                return raster
+
+        image = get_decoded_cache().get(image_bytes, 'RGB')
+        data = image.tobytes()
+        shm = SharedMemory(create=True, size=len(data))
+        shm.buf[:len(data)] = data
+
+        with self._lock:
+            existing = self._rasters.get(key)
+            if existing is not None:
+                # Another render published it meanwhile
+                shm.close()
+                shm.unlink()
+                existing.in_use += 1
+                return existing
+            raster = SharedRaster(shm, image.size, image.mode)
+            raster.in_use += 1
+            self._rasters[key] = raster
+            self._raster_bytes += shm.size
+            self._evict_rasters()
+            return raster
+
+    def _evict_rasters(self):
+        for key in list(self._rasters):
+            if self._raster_bytes <= self.raster_budget:
+                break
+            raster = self._rasters[key]
+            if raster.in_use:
+                continue
+            del self._rasters[key]
+            self._raster_bytes -= raster.shm.size
+            self._retired.append(raster.shm.name)
+            self._retired_count += 1
+            raster.shm.close()
+            raster.shm.unlink()
+
+    def _release_raster(self, raster: SharedRaster):
+        with self._lock:
+            raster.in_use -= 1
+            self._evict_rasters()
+
+    def _acquire_output(self, capacity: int) -> SharedMemory:
+        # Round up to 1 MiB so segments are reusable across similar template sizes
+        capacity = -(-capacity // (1 << 20)) << 20
+        with self._lock:
+            segments = self._outputs.get(capacity)
+            if segments:
+                return segments.pop()
+        return SharedMemory(create=True, size=capacity)
+
+    def _release_output(self, shm: SharedMemory):
+        with self._lock:
+            self._outputs.setdefault(shm.size, []).append(shm)
+
+    def _prepare(self, image_bytes: io.BytesIO):
+        key = hashlib.blake2b(image_bytes.getvalue(), digest_size=16).digest()
+        raster = self._publish_raster(key, image_bytes)
+        width, height = raster.size
+        output = self._acquire_output(width * height * len(raster.mode) + OUTPUT_MARGIN)
+        with self._lock:
+            retired = (self._retired_count, tuple(self._retired))
+        return raster, output, retired
+
+    async def render(
+        self,
+        image_bytes: io.BytesIO,
+        annotations: list,
+        output_format: Optional[OutputFormat] = None,
+    ) -> io.BytesIO:
+        """
+        Render annotations onto a template and return the encoded image.
+        """
+        if self.workers <= 0:
+            return await run_in_threadpool(TextOverlay().add_multiple_texts, image_bytes, annotations, output_format)
+
+        self.start()
+        self.in_flight += 1
+        try:
+            raster, output, retired = await run_in_threadpool(self._prepare, image_bytes)
+            try:
+                for attempt in range(2):
+                    executor = self._executor
+                    try:
+                        result, stages = await asyncio.get_running_loop().run_in_executor(
+                            executor, _render_in_worker,
+                            raster.shm.name, raster.size, raster.mode, annotations, output.name, output.size,
+                            output_format, retired,
+                        )
+                        break
+                    except BrokenProcessPool:
+                        self._replace_broken_pool(executor)
+                        if attempt:
+                            raise
+                timings = current_timings()
+                if timings is not None:
+                    timings.merge(stages)
+                if isinstance(result, bytes):
+                    meme = io.BytesIO(result)
+                else:
+                    meme = io.BytesIO(output.buf[:result])
+            finally:
+                self._release_output(output)
+                self._release_raster(raster)
+            self.completed += 1
+            return meme
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "in_flight": self.in_flight,
+                "queue_depth": max(0, self.in_flight - self.workers),
+                "completed": self.completed,
+                "failed": self.failed,
+                "restarts": self.restarts,
+                "shared_rasters": len(self._rasters),
+                "shared_raster_bytes": self._raster_bytes,
+                "retired_rasters": self._retired_count,
+                "output_segments": sum(len(s) for s in self._outputs.values()),
+            }
+
+
+# Cache the service creation: one pool per process
+@lru_cache()
+def get_render_service() -> RenderService:
+    settings = get_settings()
+    return RenderService(workers=settings.render_workers, raster_budget=settings.render_raster_budget)
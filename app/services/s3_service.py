@@ -1,10 +1,13 @@
 import boto3
-from datetime import datetime, timedelta
+import io
+from datetime import datetime
 from functools import lru_cache
 from ..config.settings import get_settings
+from botocore.config import Config as BotoConfig
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
-import logging
-from typing import Dict, Optional
+from typing import Iterator, List, Optional, Tuple
+from .storage import Storage, ListedObject, MEME_CACHE_CONTROL, PRESIGNED_URL_TTL
 
 settings = get_settings()
 
@@ -15,88 +18,116 @@ def get_s3_client():
         's3',
         aws_access_key_id=settings.aws_access_key,
         aws_secret_access_key=settings.aws_secret_key,
-        region_name=settings.aws_region 
+        region_name=settings.aws_region,
+        # Set for a local S3 stand-in (MinIO, scripts/fake_s3.py)
+        endpoint_url=settings.s3_endpoint_url,
+        config=BotoConfig(
+            # One pooled connection per concurrent upload, plus headroom for reads
+            max_pool_connections=settings.s3_max_pool_connections,
+            connect_timeout=5,
+            read_timeout=30,
+            retries={'max_attempts': 3, 'mode': 'standard'},
+            s3={'addressing_style': 'path' if settings.s3_endpoint_url else 'auto'},
+        ),
     )
 
-class S3Service:
-    @staticmethod
-    def upload_image(image_bytes: bytes) -> Dict:
-        s3_client = get_s3_client()
-        bucket_name = settings.s3_bucket_name
-        
-        try:
-            filename = f"meme_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{datetime.now().timestamp()}.jpg"
-            expiry_date = datetime.now() + timedelta(days=2)
-            
-            s3_client.upload_fileobj(
-                image_bytes,
-                bucket_name,
-                filename,
-                ExtraArgs={
-                    'ContentType': 'image/jpeg',
-                    'Metadata': {
-                        'expiry-date': expiry_date.isoformat(),
-                        'content-type': 'meme-image'
-                    },
-                    'CacheControl': 'max-age=172800'  # 2 days in seconds
-                }
-            )
-
-            url = s3_client.generate_presigned_url(
-                'get_object',
-                Params={
-                    'Bucket': bucket_name,
-                    'Key': filename
-                },
-                ExpiresIn=86400  # 1 day in seconds
-            )
-
-            return {
-                'url': f"https://{bucket_name}.s3.amazonaws.com/{filename}",
-                'presigned_url': url,
-                'expiry_date': expiry_date.isoformat()
-            }
+# Large outputs (4K PNGs) go up as parallel multipart uploads
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=settings.s3_multipart_threshold,
+    multipart_chunksize=settings.s3_multipart_chunksize,
+    max_concurrency=4,
+)
+
+
+def _is_missing(error: ClientError) -> bool:
+    return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
 
-        except ClientError as e:
-            logging.error(f"Error uploading to S3: {str(e)}")
-            raise Exception("Failed to upload image to S3")
+
+class S3Storage(Storage):
+    """Objects in an S3 bucket, with the expiry date in the object metadata."""
+
+    name = "s3"
+
+    def __init__(self, bucket_name: str):
+        self.bucket_name = bucket_name
 
     @staticmethod
-    def delete_image(filename: str) -> bool:
-        s3_client = get_s3_client()
-        bucket_name = settings.s3_bucket_name
-        
+    def _metadata(expiry_date: Optional[datetime]) -> dict:
+        metadata = {'content-type': 'meme-image'}
+        if expiry_date is not None:
+            metadata['expiry-date'] = expiry_date.isoformat()
+        return metadata
+
+    def url(self, key: str) -> str:
+        if settings.s3_endpoint_url:
+            return f"{settings.s3_endpoint_url.rstrip('/')}/{self.bucket_name}/{key}"
+        return f"https://{self.bucket_name}.s3.amazonaws.com/{key}"
+
+    def presign(self, key: str, expiry: int = PRESIGNED_URL_TTL) -> str:
+        # Signing is local, so the object need not exist yet
+        return get_s3_client().generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket_name, 'Key': key},
+            ExpiresIn=expiry,
+        )
+
+    def head(self, key: str) -> Optional[datetime]:
         try:
-            s3_client.delete_object(
-                Bucket=bucket_name,
-                Key=filename
-            )
-            return True
+            head = get_s3_client().head_object(Bucket=self.bucket_name, Key=key)
         except ClientError as e:
-            logging.error(f"Error deleting from S3: {str(e)}")
-            return False
+            if _is_missing(e):
+                return None
+            raise
+        try:
+            return datetime.fromisoformat(head.get('Metadata', {})['expiry-date'])
+        except (KeyError, ValueError):
+            return None
 
-    @staticmethod
-    def get_image_url(filename: str, expiry: int = 3600) -> Optional[str]:
-        """
-        Generate a presigned URL for an existing image
-        Args:
-            filename: The key of the file in S3
-            expiry: URL expiration time in seconds (default 1 hour)
-        """
-        s3_client = get_s3_client()
-        bucket_name = settings.s3_bucket_name
-        
+    def put(self, key: str, content: bytes, content_type: str,
+            expiry_date: Optional[datetime] = None, cache_control: str = MEME_CACHE_CONTROL):
+        get_s3_client().upload_fileobj(
+            io.BytesIO(content),
+            self.bucket_name,
+            key,
+            ExtraArgs={
+                'ContentType': content_type,
+                'Metadata': self._metadata(expiry_date),
+                'CacheControl': cache_control,
+            },
+            Config=TRANSFER_CONFIG,
+        )
+
+    def refresh(self, key: str, content_type: str, expiry_date: datetime):
+        # Server-side copy onto itself: new metadata, no bytes uploaded
+        get_s3_client().copy_object(
+            Bucket=self.bucket_name,
+            Key=key,
+            CopySource={'Bucket': self.bucket_name, 'Key': key},
+            MetadataDirective='REPLACE',
+            ContentType=content_type,
+            Metadata=self._metadata(expiry_date),
+            CacheControl=MEME_CACHE_CONTROL,
+        )
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
         try:
-            url = s3_client.generate_presigned_url(
-                'get_object',
-                Params={
-                    'Bucket': bucket_name,
-                    'Key': filename
-                },
-                ExpiresIn=expiry
-            )
-            return url
+            response = get_s3_client().get_object(Bucket=self.bucket_name, Key=key)
         except ClientError as e:
-            logging.error(f"Error generating presigned URL: {str(e)}")
-            return None
\ No newline at end of file
+            if _is_missing(e):
+                return None
+            raise
+        return response['Body'].read(), response.get('ContentType', 'application/octet-stream')
+
+    def delete(self, keys: List[str]) -> List[str]:
+        response = get_s3_client().delete_objects(
+            Bucket=self.bucket_name,
+            Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True},
+        )
+        failed = {error['Key'] for error in response.get('Errors', [])}
+        return [key for key in keys if key not in failed]
+
+    def list_pages(self, prefix: str = "", page_size: int = 1000) -> Iterator[List[ListedObject]]:
+        paginator = get_s3_client().get_paginator('list_objects_v2')
+        pages = paginator.paginate(Bucket=self.bucket_name, Prefix=prefix, PaginationConfig={'PageSize': page_size})
+        for page in pages:
+            yield [ListedObject(obj['Key'], obj['LastModified']) for obj in page.get('Contents', [])]
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from ..config.settings import get_settings
+
+MEME_TTL = timedelta(days=2)
+PRESIGNED_URL_TTL = 86400  # 1 day in seconds
+MEME_CACHE_CONTROL = 'public, max-age=172800, immutable'  # keys are content hashes, 2 days
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Memes are public objects; everything else (cached renders) is served only through authenticated routes
+PUBLIC_KEY_PREFIX = "meme_"
+
+
+def content_key(content: bytes, extension: str) -> str:
+    """Object key derived from the encoded bytes: identical memes share one object."""
+    return f"{PUBLIC_KEY_PREFIX}{hashlib.sha256(content).hexdigest()}.{extension}"
+
+
+class ListedObject(NamedTuple):
+    key: str
+    last_modified: datetime  # UTC
+
+
+class Storage(ABC):
+    """
+    Where encoded memes and renders are kept.
+
+    Implementations are synchronous and called from the threadpool. Objects are
+    written once under content-derived keys; only their expiry date changes.
+    A backend missing one of the methods below fails when it is constructed.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Permanent URL of an object."""
+
+    @abstractmethod
+    def presign(self, key: str, expiry: int = PRESIGNED_URL_TTL) -> str:
+        """Time-limited URL of an object. Must not need the object to exist yet."""
+
+    @abstractmethod
+    def head(self, key: str) -> Optional[datetime]:
+        """Expiry date of a stored object, or None if it is missing (or has none)."""
+
+    @abstractmethod
+    def put(self, key: str, content: bytes, content_type: str,
+            expiry_date: Optional[datetime] = None, cache_control: str = MEME_CACHE_CONTROL):
+        """Write an object with its content type, expiry date and cache control."""
+
+    @abstractmethod
+    def refresh(self, key: str, content_type: str, expiry_date: datetime):
+        """Move an existing object's expiry date without rewriting its content."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Content and content type of an object, or None if it is missing."""
+
+    @abstractmethod
+    def delete(self, keys: List[str]) -> List[str]:
+        """Delete up to 1000 objects. Returns the keys that were deleted."""
+
+    @abstractmethod
+    def list_pages(self, prefix: str = "", page_size: int = 1000) -> Iterator[List[ListedObject]]:
+        """Objects under `prefix`, in key order, a page at a time."""
+
+
+class LocalStorage(Storage):
+    """
+    Objects as files under `root`, each with a small JSON sidecar holding its
+    content type, expiry date and cache control. Writes go to a temporary file
+    in the same directory followed by os.replace, so readers never see a
+    partial file. Memes (top-level `meme_` keys) are served by GET /files/{key}.
+    """
+
+    name = "local"
+    META_SUFFIX = ".meta"
+
+    def __init__(self, root: str, base_url: str = "/api/v1/files"):
+        self.root = Path(root).resolve()
+        self.base_url = base_url.rstrip("/")
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def is_public(self, key: str) -> bool:
+        """Whether a key is a meme at the top of the root, the only objects GET /files serves."""
+        try:
+            path = self.path(key)
+        except ValueError:
+            return False
+        return path.parent == self.root and path.name.startswith(PUBLIC_KEY_PREFIX)
+
+    def path(self, key: str) -> Path:
+        """Filesystem path of a key. Raises ValueError for keys escaping the root."""
+        path = (self.root / key).resolve()
+        if self.root not in path.parents or path.name.endswith(self.META_SUFFIX) or path.name.startswith("."):
+            raise ValueError(f"Invalid storage key '{key}'")
+        return path
+
+    def _meta_path(self, path: Path) -> Path:
+        return path.with_name(path.name + self.META_SUFFIX)
+
+    @staticmethod
+    def _write_atomic(path: Path, content: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def metadata(self, key: str) -> Optional[dict]:
+        path = self.path(key)
+        try:
+            return json.loads(self._meta_path(path).read_bytes())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_metadata(self, path: Path, content_type: str, expiry_date: Optional[datetime], cache_control: str):
+        meta = {
+            "content_type": content_type,
+            "expiry_date": expiry_date.isoformat() if expiry_date else None,
+            "cache_control": cache_control,
+        }
+        self._write_atomic(self._meta_path(path), json.dumps(meta).encode())
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    def presign(self, key: str, expiry: int = PRESIGNED_URL_TTL) -> str:
+        # Meme keys are unguessable content hashes and memes are public, like the bucket URL
+        return self.url(key)
+
+    def head(self, key: str) -> Optional[datetime]:
+        meta = self.metadata(key)
+        if meta is None or not meta.get("expiry_date") or not self.path(key).exists():
+            return None
+        return datetime.fromisoformat(meta["expiry_date"])
+
+    def put(self, key: str, content: bytes, content_type: str,
+            expiry_date: Optional[datetime] = None, cache_control: str = MEME_CACHE_CONTROL):
+        path = self.path(key)
+        # Content first: a file without its sidecar reads as missing and is simply written again
+        self._write_atomic(path, content)
+        self._write_metadata(path, content_type, expiry_date, cache_control)
+
+    def refresh(self, key: str, content_type: str, expiry_date: datetime):
+        meta = self.metadata(key) or {}
+        self._write_metadata(self.path(key), content_type, expiry_date,
+                             meta.get("cache_control", MEME_CACHE_CONTROL))
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        meta = self.metadata(key)
+        try:
+            content = self.path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+        return content, (meta or {}).get("content_type", "application/octet-stream")
+
+    def delete(self, keys: List[str]) -> List[str]:
+        # Like S3, a key that is already gone counts as deleted; one that can't be deleted
+        # (invalid, or the unlink fails) is left out rather than failing the whole batch
+        deleted = []
+        for key in keys:
+            try:
+                path = self.path(key)
+                path.unlink(missing_ok=True)
+                self._meta_path(path).unlink(missing_ok=True)
+            except (ValueError, OSError):
+                continue
+            deleted.append(key)
+        return deleted
+
+    def _walk(self, directory: Path, relative: str, prefix: str) -> Iterator[ListedObject]:
+        """Objects under a directory in key order, reading one directory at a time."""
+        try:
+            with os.scandir(directory) as entries:
+                # A directory sorts as "name/", so its objects fall where their full keys would
+                children = sorted(
+                    (entry.name + "/" if entry.is_dir() and not entry.is_symlink() else entry.name, entry)
+                    for entry in entries
+                )
+        except FileNotFoundError:
+            return
+        for name, entry in children:
+            key = relative + name
+            if name.endswith("/"):
+                if key.startswith(prefix) or prefix.startswith(key):
+                    yield from self._walk(Path(entry.path), key, prefix)
+                continue
+            if name.endswith(self.META_SUFFIX) or name.startswith(".") or not key.startswith(prefix):
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            yield ListedObject(key, datetime.fromtimestamp(mtime, timezone.utc))
+
+    def list_pages(self, prefix: str = "", page_size: int = 1000) -> Iterator[List[ListedObject]]:
+        page = []
+        for listed in self._walk(self.root, "", prefix):
+            page.append(listed)
+            if len(page) == page_size:
+                yield page
+                page = []
+        if page:
+            yield page
+
+
+# Cache the backend creation: one per process
+@lru_cache()
+def get_storage() -> Storage:
+    settings = get_settings()
+    if settings.storage_backend == "local":
+        return LocalStorage(settings.storage_dir, settings.storage_base_url)
+    if settings.storage_backend == "s3":
+        from .s3_service import S3Storage
+        return S3Storage(settings.s3_bucket_name)
+    raise ValueError(f"Unknown storage backend '{settings.storage_backend}'")
@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from ..config.settings import get_settings
+from .storage import (
+    IMMUTABLE_CACHE_CONTROL, MEME_TTL, PRESIGNED_URL_TTL, content_key, get_storage,
+)
+
+settings = get_settings()
+
+
+class UploadIndex:
+    """
+    In-process record of objects known to exist in storage, with their expiry.
+    Bounded LRU; anything it has forgotten is checked with a HEAD request.
+
+    New expiries are also written behind to Mongo (meme_objects), which is the
+    index the expiry sweeper reads instead of sending a HEAD per object.
+    """
+
+    def __init__(self, max_entries: int = 100000, flush_interval: int = 10):
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self._objects: "OrderedDict[str, datetime]" = OrderedDict()
+        self._unflushed: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+
+        self.index_hits = 0
+        self.head_hits = 0
+        self.uploads = 0
+        self.failed_flushes = 0
+
+    def get(self, key: str) -> Optional[datetime]:
+        with self._lock:
+            expiry_date = self._objects.get(key)
+            if expiry_date is not None:
+                self._objects.move_to_end(key)
+            return expiry_date
+
+    def add(self, key: str, expiry_date: datetime):
+        with self._lock:
+            self._objects[key] = expiry_date
+            self._objects.move_to_end(key)
+            while len(self._objects) > self.max_entries:
+                self._objects.popitem(last=False)
+            self._unflushed[key] = max(expiry_date, self._unflushed.get(key, expiry_date))
+
+    def forget(self, keys: List[str]):
+        """Drop deleted objects so they are uploaded again when next needed."""
+        with self._lock:
+            for key in keys:
+                self._objects.pop(key, None)
+                self._unflushed.pop(key, None)
+
+    async def flush(self, collection) -> int:
+        """Upsert new expiries in one bulk_write. Returns the number of objects written."""
+        with self._lock:
+            if not self._unflushed:
+                return 0
+            batch, self._unflushed = self._unflushed, {}
+
+        keys = list(batch)
+        operations = [
+            UpdateOne({"_id": key}, {"$max": {"expires_at": expiry_date}}, upsert=True)
+            for key, expiry_date in batch.items()
+        ]
+        try:
+            await collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: only the operations with a write error still need writing
+            failed = [keys[error["index"]] for error in e.details.get("writeErrors", [])]
+            self.failed_flushes += 1
+            self._requeue({key: batch[key] for key in failed})
+            logging.warning(f"Failed to flush {len(failed)} of {len(batch)} object expiries: {e}")
+            return len(operations) - len(failed)
+        except BaseException as e:
+            # Also on cancellation, so a shutdown mid-write keeps the batch for the final flush
+            self.failed_flushes += 1
+            self._requeue(batch)
+            if not isinstance(e, Exception):
+                raise
+            logging.warning(f"Failed to flush {len(batch)} object expiries: {e}")
+            return 0
+        return len(operations)
+
+    def _requeue(self, batch: Dict[str, datetime]):
+        with self._lock:
+            for key, expiry_date in batch.items():
+                self._unflushed[key] = max(expiry_date, self._unflushed.get(key, expiry_date))
+
+    async def run(self, collection):
+        """Flush every `flush_interval` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush(collection)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._objects),
+            "unflushed": len(self._unflushed),
+            "index_hits": self.index_hits,
+            "head_hits": self.head_hits,
+            "uploads": self.uploads,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+@lru_cache()
+def get_upload_index() -> UploadIndex:
+    return UploadIndex(max_entries=settings.upload_index_size, flush_interval=settings.upload_index_flush_interval)
+
+
+class StorageService:
+    """Meme storage on the configured backend (S3 or local disk, see get_storage)."""
+
+    @staticmethod
+    def object_url(key: str) -> str:
+        return get_storage().url(key)
+
+    @staticmethod
+    def presign(key: str, expiry: int = PRESIGNED_URL_TTL) -> str:
+        """Presigned GET URL. Signing is local, so the object need not exist yet."""
+        return get_storage().presign(key, expiry)
+
+    @staticmethod
+    def _existing_expiry(key: str) -> Optional[datetime]:
+        """Expiry of an object already stored, from the index or a HEAD request."""
+        index = get_upload_index()
+        expiry_date = index.get(key)
+        if expiry_date is not None:
+            index.index_hits += 1
+            return expiry_date
+
+        expiry_date = get_storage().head(key)
+        if expiry_date is not None:
+            index.head_hits += 1
+            index.add(key, expiry_date)
+        return expiry_date
+
+    @staticmethod
+    def _put(content: bytes, key: str, content_type: str, expiry_date: datetime):
+        get_storage().put(key, content, content_type, expiry_date)
+        get_upload_index().uploads += 1
+        get_upload_index().add(key, expiry_date)
+
+    @staticmethod
+    def upload_image(image_bytes: bytes, content_type: str = 'image/jpeg', extension: str = 'jpg') -> Dict:
+        """
+        Upload an encoded meme under a key derived from its content.
+        If the same bytes are already stored and will outlive the presigned URL, the upload is skipped,
+        so retries and repeat renders cost no PUT.
+        """
+        content = image_bytes.getvalue() if hasattr(image_bytes, 'getvalue') else bytes(image_bytes)
+
+        try:
+            filename = content_key(content, extension)
+            expiry_date = StorageService._existing_expiry(filename)
+
+            if expiry_date is None or expiry_date < datetime.now() + timedelta(seconds=PRESIGNED_URL_TTL):
+                expiry_date = datetime.now() + MEME_TTL
+                StorageService._put(content, filename, content_type, expiry_date)
+
+            return {
+                'url': StorageService.object_url(filename),
+                'presigned_url': StorageService.presign(filename),
+                'expiry_date': expiry_date.isoformat()
+            }
+
+        except Exception as e:
+            logging.error(f"Error uploading to {get_storage().name}: {str(e)}")
+            raise Exception("Failed to upload image to storage")
+
+    @staticmethod
+    def store_image(content: bytes, key: str, content_type: str, expiry_date: datetime) -> bool:
+        """
+        Make sure `key` holds `content` until at least `expiry_date`; used by the upload queue,
+        which has already handed out the URL. An existing object expiring too early only gets
+        its expiry moved (a server-side copy on S3) instead of a new PUT.
+
+        Returns:
+            bool: Whether anything was written
+        """
+        existing = StorageService._existing_expiry(key)
+        if existing is not None and existing >= expiry_date:
+            return False
+
+        if existing is None:
+            StorageService._put(content, key, content_type, expiry_date)
+            return True
+
+        get_storage().refresh(key, content_type, expiry_date)
+        get_upload_index().add(key, expiry_date)
+        return True
+
+    @staticmethod
+    async def upload_image_async(image_bytes: bytes, content_type: str = 'image/jpeg', extension: str = 'jpg') -> Dict:
+        """
+        Upload an image without blocking the event loop.
+        With the upload queue enabled the URLs are returned right away and the upload
+        happens in the background; otherwise the backend runs in the threadpool.
+        """
+        if settings.upload_queue_workers > 0:
+            from .upload_queue import get_upload_queue
+            return await get_upload_queue().submit(image_bytes, content_type, extension)
+        return await run_in_threadpool(StorageService.upload_image, image_bytes, content_type, extension)
+
+    @staticmethod
+    def get_object(key: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Fetch an object's content and content type.
+        Returns None if the object does not exist.
+        """
+        return get_storage().get(key)
+
+    @staticmethod
+    def put_object(key: str, content: bytes, content_type: str, cache_control: str = IMMUTABLE_CACHE_CONTROL):
+        """Store an object whose content never changes under its key."""
+        get_storage().put(key, content, content_type, cache_control=cache_control)
+
+    @staticmethod
+    def delete_image(filename: str) -> bool:
+        try:
+            get_storage().delete([filename])
+            get_upload_index().forget([filename])
+            return True
+        except Exception as e:
+            logging.error(f"Error deleting from {get_storage().name}: {str(e)}")
+            return False
+
+    @staticmethod
+    def get_image_url(filename: str, expiry: int = 3600) -> Optional[str]:
+        """
+        Generate a presigned URL for an existing image
+        Args:
+            filename: The key of the file in storage
+            expiry: URL expiration time in seconds (default 1 hour)
+        """
+        try:
+            return get_storage().presign(filename, expiry)
+        except Exception as e:
+            logging.error(f"Error generating presigned URL: {str(e)}")
+            return None
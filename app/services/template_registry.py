@@ -0,0 +1,164 @@
+import asyncio
+import copy
+import logging
+import random
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from ..config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def _build_alias_table(weights: List[float]) -> Tuple[List[float], List[int]]:
+    """
+    Vose's alias method: O(n) setup for O(1) weighted sampling.
+    """
+    n = len(weights)
+    total = sum(weights)
+    probability = [w * n / total for w in weights]
+    alias = list(range(n))
+    small = [i for i, p in enumerate(probability) if p < 1.0]
+    large = [i for i, p in enumerate(probability) if p >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        alias[less] = more
+        probability[more] -= 1.0 - probability[less]
+        (small if probability[more] < 1.0 else large).append(more)
+    for i in small + large:
+        probability[i] = 1.0
+    return probability, alias
+
+
+class TemplateRegistry:
+    """
+    In-process copy of the meme_templates collection.
+
+    Templates are loaded in one query into a list plus an id -> index map,
+    giving O(1) lookup by ID and O(1) random selection, uniform or weighted
+    by an optional `weight` field (alias method). Templates with weight 0
+    are served by ID but never picked at random. The copy is refreshed by a
+    change stream when the deployment supports one, otherwise by a TTL, and
+    writes through MemeService invalidate it immediately. Callers get deep
+    copies, so mutating a returned template never changes the registry.
+    """
+
+    def __init__(self, ttl: int = 300):
+        self.ttl = ttl
+        self._templates: List[dict] = []
+        self._index: Dict[str, int] = {}
+        self._eligible: List[int] = []  # indices of templates random() may pick
+        self._alias: Optional[Tuple[List[float], List[int]]] = None
+        self._loaded_at: Optional[float] = None
+        self._generation = 0  # bumped by invalidate()
+        self._applied_generation = 0  # generation the current contents were read at
+        self._lock = asyncio.Lock()
+        self.watching = False
+        self.loads = 0
+
+    @property
+    def is_stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        return not self.watching and time.monotonic() - self._loaded_at > self.ttl
+
+    async def load(self, collection):
+        """
+        Replace the registry contents with the current collection.
+        A load that overlaps an invalidate() may have read the collection before the
+        write, so it leaves the registry stale and the next access loads again.
+        """
+        generation = self._generation
+        templates = []
+        async for template in collection.find():
+            templates.append({"id": str(template["_id"]), **{k: v for k, v in template.items() if k != "_id"}})
+
+        weights = [max(1.0 if t.get("weight") is None else float(t["weight"]), 0.0) for t in templates]
+        eligible = [i for i, weight in enumerate(weights) if weight > 0]
+        eligible_weights = [weights[i] for i in eligible]
+        weighted = len(set(eligible_weights)) > 1
+        if templates and not eligible:
+            logger.warning("Every template has weight 0, random memes are disabled")
+
+        if generation < self._applied_generation:
+            return  # a load started after ours has already swapped in newer contents
+        # Swap in the new structures together so readers never see a mix
+        self._templates = templates
+        self._index = {t["id"]: i for i, t in enumerate(templates)}
+        self._eligible = eligible
+        self._alias = _build_alias_table(eligible_weights) if weighted else None
+        self._applied_generation = generation
+        if generation == self._generation:
+            self._loaded_at = time.monotonic()
+        self.loads += 1
+
+    async def ensure_loaded(self, collection):
+        if not self.is_stale:
+            return
+        async with self._lock:
+            if self.is_stale:
+                await self.load(collection)
+
+    def invalidate(self):
+        """Force a reload on next access, including if a load is in progress."""
+        self._generation += 1
+        self._loaded_at = None
+
+    def get(self, template_id: str) -> Optional[dict]:
+        index = self._index.get(template_id)
+        return copy.deepcopy(self._templates[index]) if index is not None else None
+
+    def random(self) -> Optional[dict]:
+        templates, eligible, alias_table = self._templates, self._eligible, self._alias
+        if not eligible:
+            return None
+        slot = random.randrange(len(eligible))
+        if alias_table is not None:
+            probability, alias = alias_table
+            if random.random() >= probability[slot]:
+                slot = alias[slot]
+        return copy.deepcopy(templates[eligible[slot]])
+
+    def all(self) -> List[dict]:
+        return copy.deepcopy(self._templates)
+
+    async def watch(self, collection):
+        """
+        Keep the registry fresh in the background.
+        Uses a change stream if the server supports it, otherwise reloads every `ttl` seconds.
+        """
+        try:
+            async with collection.watch() as stream:
+                self.watching = True
+                await self.load(collection)
+                async for _ in stream:
+                    await self.load(collection)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"Template change stream unavailable ({e}), polling every {self.ttl}s")
+        finally:
+            self.watching = False
+
+        while True:
+            await asyncio.sleep(self.ttl)
+            try:
+                await self.load(collection)
+            except Exception as e:
+                logger.warning(f"Failed to refresh template registry: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "templates": len(self._templates),
+            "weighted": self._alias is not None,
+            "watching": self.watching,
+            "loads": self.loads,
+            "age_seconds": None if self._loaded_at is None else round(time.monotonic() - self._loaded_at, 1),
+        }
+
+
+# Cache the registry creation: one per process
+@lru_cache()
+def get_template_registry() -> TemplateRegistry:
+    return TemplateRegistry(ttl=get_settings().template_registry_ttl)
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..config.settings import get_settings
+from .storage import MEME_TTL, PRESIGNED_URL_TTL, content_key
+from .storage_service import StorageService, get_upload_index
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAYS = (0.5, 2.0, 5.0)  # seconds before each retry of a failed upload
+
+
+class UploadJob(NamedTuple):
+    key: str
+    content: bytes
+    content_type: str
+    expiry_date: datetime
+    queued_at: float
+
+
+class UploadQueue:
+    """
+    Bounded queue of storage uploads worked off by a fixed set of async workers.
+
+    The object key comes from the content and presigning is local, so `submit`
+    can return the URLs immediately; the bytes follow in the background. When
+    the queue is full, `submit` waits, which pushes back on request handlers
+    instead of buffering without limit. `drain` finishes what is queued.
+    """
+
+    def __init__(self, workers: int = 16, max_size: int = 256):
+        self.workers = workers
+        self.max_size = max_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._pending: Dict[str, UploadJob] = {}
+        self.in_flight = 0
+
+        self.submitted = 0
+        self.deduplicated = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self._latencies = deque(maxlen=1000)  # seconds from submit to stored
+        self._upload_times = deque(maxlen=1000)  # seconds spent in storage calls
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, image_bytes, content_type: str = 'image/jpeg', extension: str = 'jpg') -> dict:
+        """
+        Queue an upload and return its URLs and expiry date.
+
+        The presigned URL works as soon as the upload completes, normally well
+        before a client gets to it.
+        """
+        self.start()
+        content = image_bytes.getvalue() if hasattr(image_bytes, 'getvalue') else bytes(image_bytes)
+        key = content_key(content, extension)
+        self.submitted += 1
+
+        pending = self._pending.get(key)
+        known_expiry = get_upload_index().get(key)
+        if pending is not None:
+            self.deduplicated += 1
+            expiry_date = pending.expiry_date
+        elif known_expiry is not None and known_expiry >= datetime.now() + timedelta(seconds=PRESIGNED_URL_TTL):
+            self.deduplicated += 1
+            expiry_date = known_expiry
+        else:
+            expiry_date = datetime.now() + MEME_TTL
+            job = UploadJob(key, content, content_type, expiry_date, time.perf_counter())
+            self._pending[key] = job
+            await self._queue.put(job)
+
+        return {
+            'url': StorageService.object_url(key),
+            'presigned_url': StorageService.presign(key),
+            'expiry_date': expiry_date.isoformat(),
+        }
+
+    async def _store(self, job: UploadJob):
+        for attempt, delay in enumerate((0.0,) + RETRY_DELAYS):
+            if delay:
+                self.retries += 1
+                await asyncio.sleep(delay)
+            started = time.perf_counter()
+            try:
+                await run_in_threadpool(StorageService.store_image, job.content, job.key, job.content_type, job.expiry_date)
+            except Exception as e:
+                logger.warning(f"Upload of {job.key} failed (attempt {attempt + 1}): {e}")
+                continue
+            self._upload_times.append(time.perf_counter() - started)
+            return True
+        return False
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            self.in_flight += 1
+            try:
+                if await self._store(job):
+                    self.completed += 1
+                    self._latencies.append(time.perf_counter() - job.queued_at)
+                else:
+                    self.failed += 1
+                    logger.error(f"Giving up on upload of {job.key}")
+            finally:
+                self.in_flight -= 1
+                self._pending.pop(job.key, None)
+                self._queue.task_done()
+
+    async def drain(self, timeout: float = 30.0) -> bool:
+        """
+        Wait for queued uploads to finish, then stop the workers.
+        Returns False if uploads were still pending at the timeout.
+        """
+        if not self._tasks:
+            return True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+            drained = True
+        except asyncio.TimeoutError:
+            logger.error(f"Shutting down with {self._queue.qsize() + self.in_flight} uploads unfinished")
+            drained = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        return drained
+
+    @staticmethod
+    def _summary(samples) -> dict:
+        if not samples:
+            return {"count": 0}
+        ordered = sorted(samples)
+        pick = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+        return {
+            "count": len(ordered),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+            "p50_ms": round(pick(0.5) * 1000, 1),
+            "p95_ms": round(pick(0.95) * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_size": self.max_size,
+            "in_flight": self.in_flight,
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "latency": self._summary(self._latencies),
+            "upload_time": self._summary(self._upload_times),
+        }
+
+
+# Cache the queue creation: one per process
+@lru_cache()
+def get_upload_queue() -> UploadQueue:
+    settings = get_settings()
+    return UploadQueue(workers=settings.upload_queue_workers, max_size=settings.upload_queue_size)
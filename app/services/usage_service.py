@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from ..config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+USAGE_COUNTERS = ("requests", "llm_calls", "bytes_served")
+
+
+class KeyUsage:
+    __slots__ = ("last_used", "requests", "llm_calls", "bytes_served")
+
+    def __init__(self):
+        self.last_used = None
+        self.requests = 0
+        self.llm_calls = 0
+        self.bytes_served = 0
+
+
+class UsageRecorder:
+    """
+    Write-behind usage accounting for API keys.
+
+    Requests only touch an in-memory dict; `flush` rolls everything up into a
+    single unordered bulk_write of $max (last_used) and $inc (usage counters)
+    updates. Counters that fail to flush are merged back for the next attempt:
+    all of them if the write failed or was cancelled, only the failed
+    operations' if the server applied the rest.
+    """
+
+    def __init__(self, interval: int = 30):
+        self.interval = interval
+        self._pending: Dict[str, KeyUsage] = {}
+        self.flushes = 0
+        self.flushed_updates = 0
+        self.failed_flushes = 0
+
+    def record(self, key_id: str, requests: int = 0, llm_calls: int = 0, bytes_served: int = 0):
+        usage = self._pending.get(key_id)
+        if usage is None:
+            usage = self._pending[key_id] = KeyUsage()
+        usage.last_used = datetime.utcnow()
+        usage.requests += requests
+        usage.llm_calls += llm_calls
+        usage.bytes_served += bytes_served
+
+    def pending(self, key_id: str) -> KeyUsage | None:
+        return self._pending.get(key_id)
+
+    def _merge_back(self, batch: Dict[str, KeyUsage]):
+        for key_id, usage in batch.items():
+            current = self._pending.get(key_id)
+            if current is None:
+                self._pending[key_id] = usage
+                continue
+            current.last_used = max(current.last_used, usage.last_used)
+            for counter in USAGE_COUNTERS:
+                setattr(current, counter, getattr(current, counter) + getattr(usage, counter))
+
+    async def flush(self, collection) -> int:
+        """Write all pending usage in one bulk_write. Returns the number of keys flushed."""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+
+        key_ids = list(batch)
+        operations = []
+        for key_id, usage in batch.items():
+            update = {"$max": {"last_used": usage.last_used}}
+            increments = {f"usage.{c}": getattr(usage, c) for c in USAGE_COUNTERS if getattr(usage, c)}
+            if increments:
+                update["$inc"] = increments
+            operations.append(UpdateOne({"key_id": key_id}, update))
+
+        try:
+            await collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: every operation without a write error was applied, requeueing it would count it twice
+            failed = {key_ids[error["index"]] for error in e.details.get("writeErrors", [])}
+            self.failed_flushes += 1
+            self._merge_back({key_id: batch[key_id] for key_id in failed})
+            logger.warning(f"Failed to flush API key usage for {len(failed)} of {len(batch)} keys: {e}")
+            self.flushed_updates += len(operations) - len(failed)
+            return len(operations) - len(failed)
+        except BaseException as e:
+            # Also on cancellation, so a shutdown mid-write keeps the batch for the final flush
+            self.failed_flushes += 1
+            self._merge_back(batch)
+            if not isinstance(e, Exception):
+                raise
+            logger.warning(f"Failed to flush API key usage for {len(batch)} keys: {e}")
+            return 0
+
+        self.flushes += 1
+        self.flushed_updates += len(operations)
+        return len(operations)
+
+    async def run(self, collection):
+        """Flush every `interval` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush(collection)
+
+    def stats(self) -> dict:
+        return {
+            "pending_keys": len(self._pending),
+            "flushes": self.flushes,
+            "flushed_updates": self.flushed_updates,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+# Cache the recorder creation: one per process
+@lru_cache()
+def get_usage_recorder() -> UsageRecorder:
+    return UsageRecorder(interval=get_settings().usage_flush_interval)
@@ -0,0 +1,16 @@
+import os
+
+# Settings are read at import time by some modules; give the required ones
+# placeholder values so the units under test import without a .env file.
+for name, value in {
+    "AZURE_OPENAI_API_KEY": "test",
+    "AZURE_OPENAI_API_VERSION": "test",
+    "AZURE_OPENAI_API_ENDPOINT": "http://localhost",
+    "AZURE_OPENAI_API_DEPLOYMENT_NAME": "test",
+    "AWS_ACCESS_KEY": "test",
+    "AWS_SECRET_KEY": "test",
+    "AWS_REGION": "us-east-1",
+    "S3_BUCKET_NAME": "test",
+    "MONGO_URI": "mongodb://localhost:27017",
+}.items():
+    os.environ.setdefault(name, value)
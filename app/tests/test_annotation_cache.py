@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.api.routes.meme_routes import valid_analysis
+from app.services import annotation_cache
+from app.services.annotation_cache import AnnotationCache, normalize_query
+
+TEMPLATE = {"id": "t1", "src": {"url": "http://t/t1.jpg", "width": 500}, "annotations": [{"name": "top"}]}
+ANALYSIS = {"annotations": [{"text": "MONDAY", "x": 10, "y": 20}]}
+
+
+@pytest.mark.parametrize("query", ["Monday mornings!", "  monday  MORNINGS", "Monday, mornings...", "ＭＯＮＤＡＹ mornings"])
+def test_queries_normalize_to_the_same_key(query):
+    assert normalize_query(query) == "monday mornings"
+    assert AnnotationCache.make_key(TEMPLATE, query) == AnnotationCache.make_key(TEMPLATE, "monday mornings")
+
+
+def test_different_queries_get_different_keys():
+    assert AnnotationCache.make_key(TEMPLATE, "monday mornings") != AnnotationCache.make_key(TEMPLATE, "friday evenings")
+
+
+@pytest.mark.parametrize("edit", [
+    lambda t: t.update(id="t2"),
+    lambda t: t["src"].update(url="http://t/t1-v2.jpg"),
+    lambda t: t["annotations"][0].update(name="bottom"),
+])
+def test_template_edits_change_the_key(edit):
+    edited = {"id": "t1", "src": dict(TEMPLATE["src"]), "annotations": [dict(TEMPLATE["annotations"][0])]}
+    edit(edited)
+    assert AnnotationCache.make_key(edited, "q") != AnnotationCache.make_key(TEMPLATE, "q")
+
+
+def test_template_fields_outside_the_content_do_not_change_the_key():
+    renamed = dict(TEMPLATE, name="Drake", weight=3)
+    assert AnnotationCache.make_key(renamed, "q") == AnnotationCache.make_key(TEMPLATE, "q")
+
+
+@pytest.mark.parametrize("name, value", [("get_meme_prompt_version", lambda: "other"), ("MODEL", "other-model"), ("TEMPERATURE", 0.1)])
+def test_prompt_model_and_temperature_version_the_key(monkeypatch, name, value):
+    before = AnnotationCache.make_key(TEMPLATE, "q")
+    monkeypatch.setattr(annotation_cache, name, value)
+    assert AnnotationCache.make_key(TEMPLATE, "q") != before
+
+
+class LlmCache:
+    def __init__(self, docs=()):
+        self.docs = {doc["_id"]: doc for doc in docs}
+
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = doc
+
+
+def test_hits_are_private_copies():
+    cache = AnnotationCache(persistent=False)
+    cache.put("k", ANALYSIS)
+
+    hit = asyncio.run(cache.get("k"))
+    hit["annotations"][0]["text"] = "changed"
+
+    assert asyncio.run(cache.get("k")) == ANALYSIS
+    assert cache.stats()["hits"] == 2
+
+
+def test_persistent_entries_expire_with_their_age():
+    fresh = {"_id": "fresh", "analysis": ANALYSIS, "created_at": datetime.utcnow() - timedelta(seconds=10)}
+    stale = {"_id": "stale", "analysis": ANALYSIS, "created_at": datetime.utcnow() - timedelta(seconds=120)}
+    cache = AnnotationCache(ttl=60)
+    collection = LlmCache([fresh, stale])
+
+    assert asyncio.run(cache.get("fresh", collection)) == ANALYSIS
+    assert asyncio.run(cache.get("stale", collection)) is None
+    stats = cache.stats()
+    assert stats["persistent_hits"] == 1 and stats["misses"] == 1 and stats["entries"] == 1
+
+
+@pytest.mark.parametrize("analysis, valid", [
+    (ANALYSIS, True),
+    ({"annotations": []}, False),
+    ({"annotations": ["text"]}, False),
+    ({"annotations": {"text": "x"}}, False),
+    ({}, False),
+    (["annotations"], False),
+])
+def test_only_valid_analyses_are_cacheable(analysis, valid):
+    assert valid_analysis(analysis) is valid
@@ -0,0 +1,115 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.api.models.schemas import ApiKey, ApiKeyCreate, ApiKeyStatus
+from app.services import api_key_service
+from app.services.api_key_cache import ApiKeyCache
+from app.services.api_key_service import ApiKeyService
+
+
+def api_key(key_id: str) -> ApiKey:
+    return ApiKey(key_id=key_id, name=key_id, hashed_key="h", status=ApiKeyStatus.ACTIVE,
+                  created_at=datetime(2026, 1, 1), permissions=["generate"])
+
+
+class UpdateResult:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+
+class ApiKeys:
+    """The parts of the api_keys collection key validation and revocation use."""
+
+    def __init__(self):
+        self.docs = {}
+        self.finds = 0
+
+    async def insert_one(self, doc):
+        self.docs[doc["key_id"]] = dict(doc, _id=f"doc-{doc['key_id']}")
+
+    async def find_one(self, query):
+        self.finds += 1
+        doc = self.docs.get(query["key_id"])
+        if doc is None or any(doc.get(field) != value for field, value in query.items()):
+            return None
+        return dict(doc)
+
+    async def update_one(self, query, update):
+        doc = await self.find_one(query)
+        if doc is None:
+            return UpdateResult(0)
+        self.docs[doc["key_id"]].update(update["$set"])
+        return UpdateResult(1)
+
+
+class Db:
+    def __init__(self):
+        self.api_keys = ApiKeys()
+
+
+@pytest.fixture
+def service(monkeypatch):
+    cache = ApiKeyCache(ttl=60, negative_ttl=60, max_entries=10, negative_max_entries=10)
+    monkeypatch.setattr(api_key_service, "get_api_key_cache", lambda: cache)
+    return ApiKeyService(Db())
+
+
+def test_rejections_never_evict_valid_keys():
+    cache = ApiKeyCache(max_entries=2, negative_max_entries=2)
+    cache.put("a", "ha", api_key("a"), "doc-a")
+    for i in range(100):
+        cache.put_invalid(f"bogus{i}")
+
+    assert cache.get("a", "ha") == (True, api_key("a"))
+    assert cache.stats()["negative_entries"] == 2
+    assert cache.stats()["negative_evictions"] == 98
+    assert cache.stats()["evictions"] == 0
+
+
+def test_unknown_key_id_is_rejected_for_any_secret():
+    cache = ApiKeyCache()
+    cache.put_invalid("unknown")
+
+    assert cache.get("unknown", "h1") == (True, None)
+    assert cache.get("unknown", "h2") == (True, None)
+    assert cache.get("other", "h1") == (False, None)
+
+
+def test_evicted_keys_are_pruned_from_the_doc_id_index():
+    cache = ApiKeyCache(max_entries=2)
+    for key_id in "abc":
+        cache.put(key_id, "h", api_key(key_id), f"doc-{key_id}")
+
+    assert set(cache._doc_ids) == {"doc-b", "doc-c"}
+    cache.invalidate("b")
+    assert set(cache._doc_ids) == {"doc-c"}
+
+
+def test_unknown_key_id_costs_one_lookup(service):
+    assert asyncio.run(service.validate_api_key("nope.secret1")) is None
+    assert asyncio.run(service.validate_api_key("nope.secret2")) is None
+    assert service.db.api_keys.finds == 1
+
+
+def test_wrong_secret_is_cached_without_rejecting_the_right_one(service):
+    full_key, _ = asyncio.run(service.create_api_key(ApiKeyCreate(name="x", permissions=["generate"])))
+    key_id = full_key.split(".", 1)[0]
+
+    assert asyncio.run(service.validate_api_key(f"{key_id}.wrong")) is None
+    assert asyncio.run(service.validate_api_key(f"{key_id}.wrong")) is None
+    assert asyncio.run(service.validate_api_key(full_key)).key_id == key_id
+    assert asyncio.run(service.validate_api_key(full_key)).key_id == key_id
+    assert service.db.api_keys.finds == 2
+
+
+def test_revoked_key_is_rejected_immediately(service):
+    full_key, _ = asyncio.run(service.create_api_key(ApiKeyCreate(name="x", permissions=["generate"])))
+    key_id = full_key.split(".", 1)[0]
+    assert asyncio.run(service.validate_api_key(full_key)) is not None
+
+    assert asyncio.run(service.revoke_api_key(key_id))
+
+    assert asyncio.run(service.validate_api_key(full_key)) is None
+    assert service.cache.stats()["invalidations"] == 1
@@ -0,0 +1,63 @@
+import io
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+from app.api.routes.meme_routes import resolve_output_format
+from app.utils import encoders
+from app.utils.encoders import EXTENSIONS, FORMATS, PRESETS, encode_image, get_output_format, is_format_supported
+
+SUPPORTED = [(name, preset) for name in FORMATS if is_format_supported(name) for preset in PRESETS[name]]
+
+
+def test_every_format_has_every_preset():
+    assert set(PRESETS) == set(FORMATS)
+    for presets in PRESETS.values():
+        assert set(presets) == {"fast", "high", "balanced", "small"}
+
+
+@pytest.mark.parametrize("name, preset", SUPPORTED)
+def test_presets_encode_decodable_images(name, preset):
+    output = get_output_format(name, preset)
+    image = Image.new("RGBA", (64, 48), (200, 30, 30, 255))
+
+    encoded = encode_image(image, output)
+
+    with Image.open(encoded) as decoded:
+        assert decoded.format == output.pil_format
+        assert decoded.size == (64, 48)
+    assert EXTENSIONS[output.content_type] == output.extension
+
+
+def test_names_are_case_insensitive_and_default():
+    assert get_output_format("WebP", "Small") == get_output_format("webp", "small")
+    default = get_output_format(None, None)
+    assert (default.name, default.preset) == (encoders.DEFAULT_FORMAT, encoders.DEFAULT_PRESET)
+
+
+def test_jpeg_drops_alpha():
+    encoded = encode_image(Image.new("RGBA", (8, 8), (0, 0, 0, 0)), get_output_format("jpeg"))
+    assert Image.open(encoded).mode == "RGB"
+
+
+@pytest.mark.parametrize("name, preset, message", [
+    ("gif", "high", "Unknown output format 'gif'"),
+    ("jpeg", "lossless", "Unknown preset 'lossless'"),
+])
+def test_unknown_names_are_rejected(name, preset, message):
+    with pytest.raises(ValueError, match=message):
+        get_output_format(name, preset)
+
+
+def test_formats_this_build_cannot_write_are_rejected(monkeypatch):
+    monkeypatch.setattr(encoders, "is_format_supported", lambda name: name != "webp")
+    with pytest.raises(ValueError, match="not supported by this server"):
+        get_output_format("webp")
+
+
+def test_requests_with_bad_formats_get_a_400():
+    with pytest.raises(HTTPException) as raised:
+        resolve_output_format("gif", None)
+    assert raised.value.status_code == 400
+    assert resolve_output_format("png", "fast").options == {"compress_level": 1}
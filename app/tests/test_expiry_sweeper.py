@@ -0,0 +1,128 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import expiry_sweeper
+from app.services.expiry_sweeper import ExpirySweeper
+from app.services.storage import MEME_TTL, LocalStorage
+
+NOW = datetime(2026, 10, 17, 12, 0, 0)  # naive local time, like the index
+GRACE = 3600
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+
+class MemeObjects:
+    """The parts of the meme_objects collection the sweeper uses."""
+
+    def __init__(self, expiries):
+        self.expiries = dict(expiries)
+
+    def find(self, query, projection=None):
+        keys = query["_id"]["$in"]
+        return Cursor([{"_id": key, "expires_at": self.expiries[key]} for key in keys if key in self.expiries])
+
+    async def delete_many(self, query):
+        for key in query["_id"]["$in"]:
+            self.expiries.pop(key, None)
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    storage = LocalStorage(str(tmp_path))
+    monkeypatch.setattr(expiry_sweeper, "get_storage", lambda: storage)
+    return storage
+
+
+def put(storage: LocalStorage, key: str, modified: datetime):
+    storage.put(key, b"meme", "image/jpeg")
+    timestamp = modified.timestamp()
+    os.utime(storage.path(key), (timestamp, timestamp))
+
+
+def remaining(storage: LocalStorage):
+    return sorted(obj.key for page in storage.list_pages("meme_") for obj in page)
+
+
+def sweep(collection=None, dry_run=False):
+    return asyncio.run(ExpirySweeper(grace=GRACE).sweep(collection, now=NOW, dry_run=dry_run))
+
+
+def test_indexed_objects_follow_the_index(storage):
+    old = NOW - timedelta(days=10)
+    put(storage, "meme_expired.jpg", old)
+    put(storage, "meme_live.jpg", old)
+    put(storage, "meme_within_grace.jpg", old)
+    collection = MemeObjects({
+        "meme_expired.jpg": NOW - timedelta(days=1),
+        "meme_live.jpg": NOW + timedelta(days=1),
+        "meme_within_grace.jpg": NOW - timedelta(seconds=GRACE // 2),
+    })
+
+    report = sweep(collection)
+
+    assert remaining(storage) == ["meme_live.jpg", "meme_within_grace.jpg"]
+    assert report["expired"] == report["deleted"] == 1
+    assert report["unindexed"] == 0
+    assert "meme_expired.jpg" not in collection.expiries
+
+
+def test_recently_refreshed_object_is_kept_despite_a_stale_index(storage):
+    # Re-uploaded or refreshed after the index entry was written but before its flush
+    put(storage, "meme_refreshed.jpg", NOW - timedelta(minutes=5))
+    collection = MemeObjects({"meme_refreshed.jpg": NOW - timedelta(days=1)})
+
+    report = sweep(collection)
+
+    assert remaining(storage) == ["meme_refreshed.jpg"]
+    assert report["expired"] == 0
+
+
+def test_unindexed_objects_expire_ttl_after_last_modified(storage):
+    put(storage, "meme_old.jpg", NOW - MEME_TTL - timedelta(seconds=GRACE * 2))
+    put(storage, "meme_young.jpg", NOW - MEME_TTL + timedelta(hours=1))
+    put(storage, "meme_in_grace.jpg", NOW - MEME_TTL - timedelta(seconds=GRACE // 2))
+
+    report = sweep(MemeObjects({}))
+
+    assert remaining(storage) == ["meme_in_grace.jpg", "meme_young.jpg"]
+    assert report["unindexed"] == 3
+    assert report["deleted"] == 1
+
+
+def test_without_an_index_every_object_goes_by_last_modified(storage):
+    put(storage, "meme_old.jpg", NOW - timedelta(days=10))
+    put(storage, "meme_new.jpg", NOW - timedelta(hours=1))
+
+    report = sweep(None)
+
+    assert remaining(storage) == ["meme_new.jpg"]
+    assert report["unindexed"] == 2
+
+
+def test_only_the_prefix_is_swept(storage):
+    put(storage, "meme_old.jpg", NOW - timedelta(days=10))
+    put(storage, "renders/old", NOW - timedelta(days=10))
+
+    sweep(None)
+
+    assert storage.get("renders/old") is not None
+    assert storage.get("meme_old.jpg") is None
+
+
+def test_dry_run_counts_without_deleting(storage):
+    put(storage, "meme_old.jpg", NOW - timedelta(days=10))
+
+    report = sweep(MemeObjects({"meme_old.jpg": NOW - timedelta(days=8)}), dry_run=True)
+
+    assert remaining(storage) == ["meme_old.jpg"]
+    assert report["expired"] == 1
+    assert report["deleted"] == 0
@@ -0,0 +1,112 @@
+import asyncio
+import io
+
+import httpx
+from PIL import Image
+
+from app.utils.image_cache import CachedImage, DecodedImageCache, TemplateImageCache
+
+
+def template_bytes(width: int, height: int, color=(200, 30, 30)) -> io.BytesIO:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, format="PNG")
+    buffer.seek(0)
+    return buffer
+
+
+def serve(images: dict):
+    """An httpx client answering GET <url> with the given bytes, counting requests."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(str(request.url))
+        return httpx.Response(200, content=images[str(request.url)])
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler)), requests
+
+
+def test_template_cache_evicts_least_recently_used_within_budget():
+    images = {f"http://t/{name}": bytes(4) for name in "abc"}
+    cache = TemplateImageCache(max_bytes=8)
+
+    async def run():
+        client, requests = serve(images)
+        async with client:
+            await cache.get("http://t/a", client)
+            await cache.get("http://t/b", client)
+            await cache.get("http://t/a", client)  # a is now the most recent
+            await cache.get("http://t/c", client)  # evicts b
+            await cache.get("http://t/a", client)
+        return requests
+
+    requests = asyncio.run(run())
+    assert requests == ["http://t/a", "http://t/b", "http://t/c"]
+    stats = cache.stats()
+    assert stats["bytes"] == 8 and stats["entries"] == 2
+    assert stats["evictions"] == 1 and stats["hits"] == 2 and stats["misses"] == 3
+
+
+def test_template_cache_accounts_replaced_and_oversized_entries():
+    cache = TemplateImageCache(max_bytes=10)
+    cache._store("a", CachedImage(bytes(4)))
+    cache._store("a", CachedImage(bytes(6)))
+    assert cache.stats()["bytes"] == 6
+
+    cache._store("huge", CachedImage(bytes(11)))
+    assert cache.stats()["entries"] == 1 and cache.stats()["bytes"] == 6
+
+    cache.clear()
+    assert cache.stats()["bytes"] == 0
+
+
+def test_decoded_cache_counts_raster_bytes_per_mode():
+    cache = DecodedImageCache(max_bytes=10_000)
+    image = template_bytes(10, 10)
+
+    cache.get(image, "RGB")  # padded to 4 bytes per pixel in memory
+    cache.get(image, "RGBA")
+    cache.get(image, "L")
+
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["bytes"] == 10 * 10 * 4 + 10 * 10 * 4 + 10 * 10
+
+
+def test_decoded_cache_evicts_least_recently_used_within_budget():
+    cache = DecodedImageCache(max_bytes=2 * 10 * 10 * 4)
+    first, second, third = (template_bytes(10, 10, (i, i, i)) for i in (1, 2, 3))
+
+    cache.get(first)
+    cache.get(second)
+    cache.get(first)  # first is now the most recent
+    cache.get(third)  # evicts second
+    cache.get(first)
+
+    stats = cache.stats()
+    assert stats["bytes"] == 2 * 10 * 10 * 4
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 3
+
+
+def test_budget_sized_rgb_rasters_evict():
+    # Two 10x10 RGB rasters would fit a 3-bytes-per-pixel count of 600 bytes, but hold 800
+    cache = DecodedImageCache(max_bytes=10 * 10 * 3 * 2)
+
+    cache.get(template_bytes(10, 10, (1, 1, 1)))
+    cache.get(template_bytes(10, 10, (2, 2, 2)))
+
+    stats = cache.stats()
+    assert stats["entries"] == 1 and stats["evictions"] == 1
+    assert stats["bytes"] == 10 * 10 * 4 <= cache.max_bytes
+
+
+def test_decoded_cache_skips_rasters_over_budget_and_hands_out_copies():
+    cache = DecodedImageCache(max_bytes=100)
+    large = cache.get(template_bytes(10, 10))
+    assert cache.stats()["entries"] == 0 and large.size == (10, 10)
+
+    cache = DecodedImageCache(max_bytes=10_000)
+    image = template_bytes(10, 10)
+    copy = cache.get(image)
+    copy.putpixel((0, 0), (0, 0, 0))
+    assert cache.get(image).getpixel((0, 0)) == (200, 30, 30)
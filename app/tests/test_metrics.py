@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import threading
+from datetime import datetime
+
+import httpx
+import pytest
+
+from app.config.settings import get_settings
+from app.core.metrics import Histogram, RequestTimings
+from app.dependencies import get_database
+from app.main import app
+from app.services import api_key_service
+from app.services.api_key_cache import ApiKeyCache
+
+
+def test_histogram_exposition_is_cumulative_per_label_set():
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/b")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5.0, "/a")
+
+    assert histogram.exposition() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 0',
+        'latency_seconds_bucket{route="/a",le="1.0"} 1',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 2',
+        'latency_seconds_sum{route="/a"} 5.5',
+        'latency_seconds_count{route="/a"} 2',
+        'latency_seconds_bucket{route="/b",le="0.1"} 1',
+        'latency_seconds_bucket{route="/b",le="1.0"} 1',
+        'latency_seconds_bucket{route="/b",le="+Inf"} 1',
+        'latency_seconds_sum{route="/b"} 0.05',
+        'latency_seconds_count{route="/b"} 1',
+    ]
+
+
+def test_bucket_upper_bounds_are_inclusive():
+    histogram = Histogram("h", "H.", (), buckets=(0.1, 1.0))
+    for value in (0.1, 1.0, 1.0000001):
+        histogram.observe(value)
+
+    assert histogram.exposition()[2:5] == ['h_bucket{le="0.1"} 1', 'h_bucket{le="1.0"} 2', 'h_bucket{le="+Inf"} 3']
+
+
+def test_label_values_are_escaped():
+    histogram = Histogram("h", "H.", ("template",), buckets=(1.0,))
+    histogram.observe(0.5, 'say "hi"\\\n')
+
+    assert 'h_count{template="say \\"hi\\"\\\\\\n"} 1' in histogram.exposition()
+
+
+def test_stage_time_from_concurrent_threads_all_adds_up():
+    timings = RequestTimings()
+
+    def render():
+        for _ in range(10000):
+            timings.add("render", 1.0)
+        timings.merge({"encode": 1.0})
+
+    threads = [threading.Thread(target=render) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert timings.stages == {"render": 80000.0, "encode": 8.0}
+
+
+class ApiKeys:
+    def __init__(self, docs):
+        self.docs = {doc["key_id"]: doc for doc in docs}
+
+    async def find_one(self, query):
+        return self.docs.get(query["key_id"])
+
+
+class Db:
+    def __init__(self, *docs):
+        self.api_keys = ApiKeys(docs)
+
+
+def key_doc(key_id, raw_key, permissions):
+    return {"_id": key_id, "key_id": key_id, "name": key_id, "hashed_key": hashlib.sha256(raw_key.encode()).hexdigest(),
+            "status": "active", "created_at": datetime(2026, 1, 1), "permissions": permissions}
+
+
+@pytest.fixture
+def scrape(monkeypatch):
+    monkeypatch.setattr(api_key_service, "get_api_key_cache", lambda: ApiKeyCache())
+    database = Db(key_doc("admin", "secret", ["admin"]), key_doc("user", "secret", ["generate"]))
+    app.dependency_overrides[get_database] = lambda: database
+
+    def scrape(token=None, **headers):
+        monkeypatch.setattr(get_settings(), "metrics_token", token)
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return await client.get("/metrics", headers=headers)
+
+        return asyncio.run(run()).status_code
+
+    yield scrape
+    app.dependency_overrides.pop(get_database, None)
+
+
+def test_metrics_require_an_admin_key_without_a_token(scrape):
+    assert scrape() == 401
+    assert scrape(**{"X-API-Key": "user.secret"}) == 403
+    assert scrape(**{"X-API-Key": "admin.wrong"}) == 403
+    assert scrape(**{"X-API-Key": "admin.secret"}) == 200
+
+
+def test_metrics_token_replaces_the_api_key(scrape):
+    assert scrape(token="t0ken") == 401
+    assert scrape(token="t0ken", **{"X-API-Key": "admin.secret"}) == 401
+    assert scrape(token="t0ken", Authorization="Bearer t0ken") == 200
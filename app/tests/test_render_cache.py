@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+from datetime import datetime
+
+import httpx
+import pytest
+
+from app.api.routes import meme_routes
+from app.dependencies import get_database, get_meme_service
+from app.main import app
+from app.services import api_key_service
+from app.services.api_key_cache import ApiKeyCache
+from app.services.render_cache import CachedRender, RenderCache
+
+
+def test_render_cache_evicts_least_recently_used_within_budget():
+    cache = RenderCache(max_bytes=8, persistent=False)
+
+    async def run():
+        cache.put("a", bytes(4), "image/jpeg")
+        cache.put("b", bytes(4), "image/jpeg")
+        assert await cache.get("a") is not None
+        cache.put("c", bytes(4), "image/jpeg")  # evicts b
+        return await cache.get("a"), await cache.get("b"), await cache.get("c")
+
+    a, b, c = asyncio.run(run())
+    assert a is not None and b is None and c is not None
+    stats = cache.stats()
+    assert stats["bytes"] == 8 and stats["entries"] == 2
+    assert stats["evictions"] == 1 and stats["hits"] == 3 and stats["misses"] == 1
+
+
+@pytest.mark.parametrize("sizes, expected_bytes", [
+    ([4, 6], 6),      # replacing a key replaces its bytes
+    ([4, 20], 4),     # an entry over budget is not cached and keeps the old one
+])
+def test_render_cache_byte_accounting(sizes, expected_bytes):
+    cache = RenderCache(max_bytes=10, persistent=False)
+    for size in sizes:
+        cache.put("key", bytes(size), "image/png")
+    assert cache.stats()["bytes"] == expected_bytes
+    assert cache.stats()["entries"] == 1
+
+
+RENDER_ID = "a" * 64
+TEMPLATE = {"id": "t1", "src": {"url": "http://t/t1.jpg"}, "annotations": [{"font": {"size_range": "20-40"}}]}
+RENDER_REQUEST = {"template_id": "t1", "annotations": [{"x": 0, "y": 0, "width": 100, "height": 40, "text": "hi"}]}
+
+
+class ApiKeys:
+    async def find_one(self, query):
+        return {"_id": "k", "key_id": "k", "name": "k", "hashed_key": hashlib.sha256(b"secret").hexdigest(),
+                "status": "active", "created_at": datetime(2026, 1, 1), "permissions": ["generate_meme"]}
+
+
+class Db:
+    api_keys = ApiKeys()
+
+
+class MemeService:
+    async def get_template(self, template_id):
+        return dict(TEMPLATE)
+
+
+class StoredRenders(RenderCache):
+    """Every render is already cached."""
+
+    async def get(self, key):
+        return CachedRender(b"jpeg", "image/jpeg")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api_key_service, "get_api_key_cache", lambda: ApiKeyCache())
+    app.dependency_overrides[get_database] = lambda: Db()
+    app.dependency_overrides[get_meme_service] = lambda: MemeService()
+
+    def request(method, path, renders, **kwargs):
+        monkeypatch.setattr(meme_routes, "get_render_cache", lambda: renders)
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return await client.request(method, path, headers={"X-API-Key": "k.secret", **kwargs.pop("headers", {})},
+                                            **kwargs)
+
+        return asyncio.run(run())
+
+    yield request
+    app.dependency_overrides.pop(get_database, None)
+    app.dependency_overrides.pop(get_meme_service, None)
+
+
+def test_post_render_revalidates_its_etag_and_ignores_the_wildcard(client):
+    renders = StoredRenders(max_bytes=1000, persistent=False)
+    response = client("POST", "/api/v1/render", renders, json=RENDER_REQUEST)
+    etag = response.headers["ETag"]
+    assert response.status_code == 200 and response.content == b"jpeg"
+
+    assert client("POST", "/api/v1/render", renders, json=RENDER_REQUEST, headers={"If-None-Match": etag}).status_code == 304
+    assert client("POST", "/api/v1/render", renders, json=RENDER_REQUEST, headers={"If-None-Match": "*"}).status_code == 200
+
+
+def test_get_render_wildcard_needs_the_render_to_exist(client):
+    path = f"/api/v1/render/{RENDER_ID}"
+    stored = StoredRenders(max_bytes=1000, persistent=False)
+    missing = RenderCache(max_bytes=1000, persistent=False)
+
+    assert client("GET", path, stored, headers={"If-None-Match": "*"}).status_code == 304
+    assert client("GET", path, missing, headers={"If-None-Match": "*"}).status_code == 404
+    assert client("GET", path, missing, headers={"If-None-Match": f'W/"{RENDER_ID}"'}).status_code == 304
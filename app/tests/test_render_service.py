@@ -0,0 +1,89 @@
+import io
+from multiprocessing.shared_memory import SharedMemory
+
+import pytest
+from PIL import Image
+
+from app.services import render_service
+from app.services.render_service import RenderService
+
+
+def template_bytes(width: int, height: int, color=(200, 30, 30)) -> io.BytesIO:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, "PNG")
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture
+def worker_state(monkeypatch):
+    monkeypatch.setattr(render_service, "_attached", render_service.OrderedDict())
+    monkeypatch.setattr(render_service, "_retired_seen", 0)
+    yield render_service._attached
+    for shm in render_service._attached.values():
+        shm.close()
+
+
+@pytest.fixture
+def segments():
+    created = []
+
+    def create():
+        shm = SharedMemory(create=True, size=64)
+        created.append(shm)
+        return shm
+
+    yield create
+    for shm in created:
+        shm.close()
+        shm.unlink()
+
+
+def test_worker_closes_retired_rasters(worker_state, segments):
+    a, b, c = segments(), segments(), segments()
+    for shm in (a, b, c):
+        render_service._attach(shm.name)
+
+    render_service._close_retired(1, ("old", a.name))
+
+    assert list(worker_state) == [b.name, c.name]
+    render_service._close_retired(1, ("old", a.name))  # already seen: nothing more to close
+    assert list(worker_state) == [b.name, c.name]
+
+
+def test_worker_that_missed_retirements_closes_everything(worker_state, segments):
+    a, b = segments(), segments()
+    render_service._attach(a.name)
+    render_service._attach(b.name)
+
+    render_service._close_retired(5, (b.name,))
+
+    assert not worker_state
+
+
+def test_evicted_rasters_are_reported_as_retired():
+    service = RenderService(raster_budget=100 * 100 * 3)
+    try:
+        first, output, _ = service._prepare(template_bytes(100, 100))
+        service._release_output(output)
+        service._release_raster(first)
+        second, output, retired = service._prepare(template_bytes(100, 100, (0, 0, 255)))
+        service._release_output(output)
+
+        assert retired == (1, (first.shm.name,))
+        assert service.stats()["shared_rasters"] == 1
+    finally:
+        service.shutdown()
+
+
+def test_rasters_in_use_are_not_retired():
+    service = RenderService(raster_budget=1)
+    try:
+        raster, output, _ = service._prepare(template_bytes(10, 10))
+        service._release_output(output)
+        _, output, retired = service._prepare(template_bytes(10, 10, (0, 0, 255)))
+        service._release_output(output)
+
+        assert raster.shm.name not in retired[1]
+    finally:
+        service.shutdown()
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from app.services.storage import LocalStorage, content_key
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorage(str(tmp_path / "root"))
+
+
+@pytest.mark.parametrize("key", [
+    "../outside",
+    "renders/../../outside",
+    "/etc/passwd",
+    "meme_a.jpg/../../outside",
+    "meme_a.jpg.meta",
+    ".tmp-partial",
+    "",
+])
+def test_path_rejects_keys_escaping_the_root(storage, key):
+    with pytest.raises(ValueError):
+        storage.path(key)
+
+
+def test_path_keeps_keys_inside_the_root(storage):
+    assert storage.path("meme_a.jpg") == storage.root / "meme_a.jpg"
+    assert storage.path("renders/abc") == storage.root / "renders" / "abc"
+    assert storage.path("renders/../meme_a.jpg") == storage.root / "meme_a.jpg"
+
+
+def test_put_get_and_delete(storage):
+    key = content_key(b"meme", "jpg")
+    storage.put(key, b"meme", "image/jpeg")
+
+    assert storage.get(key) == (b"meme", "image/jpeg")
+    assert storage.delete([key]) == [key]
+    assert storage.get(key) is None
+    assert storage.metadata(key) is None
+
+
+@pytest.mark.parametrize("key, public", [
+    ("meme_abc.jpg", True),
+    ("renders/abc", False),
+    ("meme_dir/abc", False),
+    ("meme_x/../renders/abc", False),
+    ("../meme_abc.jpg", False),
+])
+def test_only_top_level_memes_are_public(storage, key, public):
+    assert storage.is_public(key) is public
+
+
+def test_delete_skips_invalid_keys_and_keeps_going(storage):
+    storage.put("meme_a.jpg", b"a", "image/jpeg")
+    storage.put("meme_b.jpg", b"b", "image/jpeg")
+
+    deleted = storage.delete(["meme_a.jpg", "../outside", "meme_gone.jpg", "meme_b.jpg"])
+
+    assert deleted == ["meme_a.jpg", "meme_gone.jpg", "meme_b.jpg"]
+    assert storage.get("meme_b.jpg") is None
+
+
+def test_list_pages_in_key_order(storage):
+    keys = ["meme_b.jpg", "meme_a.jpg", "renders/x", "renders-old", "a/b/c", "a-b", "meme_c.jpg"]
+    for key in keys:
+        storage.put(key, b"x", "image/jpeg")
+
+    pages = list(storage.list_pages(page_size=3))
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [obj.key for page in pages for obj in page] == sorted(keys)
+
+
+def test_list_pages_filters_by_prefix(storage):
+    for key in ["meme_a.jpg", "renders/a", "renders/b", "rendered", "other/renders/c"]:
+        storage.put(key, b"x", "image/jpeg")
+
+    assert [obj.key for page in storage.list_pages("renders/") for obj in page] == ["renders/a", "renders/b"]
+    assert [obj.key for page in storage.list_pages("render") for obj in page] == ["rendered", "renders/a", "renders/b"]
+    assert list(storage.list_pages("missing")) == []
+
+
+def test_list_pages_is_lazy(storage, monkeypatch):
+    for key in ["a/1", "b/1"]:
+        storage.put(key, b"x", "image/jpeg")
+    scanned = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda path: scanned.append(os.path.basename(path)) or scandir(path))
+
+    pages = storage.list_pages(page_size=1)
+    assert next(pages)[0].key == "a/1"
+    assert "b" not in scanned
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import storage_service
+from app.services.storage import MEME_TTL, PRESIGNED_URL_TTL, LocalStorage, content_key
+from app.services.storage_service import StorageService, UploadIndex
+
+
+class CountingStorage(LocalStorage):
+    def __init__(self, root):
+        super().__init__(root)
+        self.puts = []
+        self.refreshes = []
+
+    def put(self, key, content, content_type, expiry_date=None, **kwargs):
+        self.puts.append(key)
+        super().put(key, content, content_type, expiry_date, **kwargs)
+
+    def refresh(self, key, content_type, expiry_date):
+        self.refreshes.append(key)
+        super().refresh(key, content_type, expiry_date)
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    storage = CountingStorage(str(tmp_path))
+    index = UploadIndex()
+    monkeypatch.setattr(storage_service, "get_storage", lambda: storage)
+    monkeypatch.setattr(storage_service, "get_upload_index", lambda: index)
+    return storage
+
+
+def test_content_key_is_derived_from_the_bytes():
+    key = content_key(b"meme", "jpg")
+
+    assert key == content_key(b"meme", "jpg")
+    assert key != content_key(b"meme!", "jpg")
+    assert key.startswith("meme_") and key.endswith(".jpg") and len(key) == len("meme_") + 64 + len(".jpg")
+
+
+def test_identical_memes_are_uploaded_once(storage):
+    first = StorageService.upload_image(b"meme")
+    second = StorageService.upload_image(b"meme")
+
+    assert storage.puts == [content_key(b"meme", "jpg")]
+    assert first == second
+
+
+def test_memes_that_would_expire_before_their_url_are_uploaded_again(storage):
+    key = content_key(b"meme", "jpg")
+    soon = datetime.now() + timedelta(seconds=PRESIGNED_URL_TTL // 2)
+    storage.put(key, b"meme", "image/jpeg", soon)
+    storage.puts.clear()
+
+    result = StorageService.upload_image(b"meme")
+
+    assert storage.puts == [key]
+    assert datetime.fromisoformat(result["expiry_date"]) > datetime.now() + MEME_TTL - timedelta(minutes=1)
+
+
+def test_memes_outliving_their_url_are_not_uploaded_again(storage):
+    key = content_key(b"meme", "jpg")
+    later = datetime.now() + timedelta(seconds=PRESIGNED_URL_TTL * 2)
+    storage.put(key, b"meme", "image/jpeg", later)
+    storage.puts.clear()
+
+    result = StorageService.upload_image(b"meme")
+
+    assert storage.puts == []
+    assert result["expiry_date"] == later.isoformat()
+
+
+def test_store_image_only_moves_an_expiry_that_is_too_early(storage):
+    key = content_key(b"meme", "jpg")
+    now = datetime.now()
+
+    assert StorageService.store_image(b"meme", key, "image/jpeg", now + timedelta(days=1))
+    assert not StorageService.store_image(b"meme", key, "image/jpeg", now + timedelta(hours=1))
+    assert StorageService.store_image(b"meme", key, "image/jpeg", now + timedelta(days=2))
+
+    assert storage.puts == [key]
+    assert storage.refreshes == [key]
+    assert storage.head(key) == now + timedelta(days=2)
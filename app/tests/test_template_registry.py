@@ -0,0 +1,120 @@
+import asyncio
+import random
+from collections import Counter
+
+import pytest
+
+from app.services.template_registry import TemplateRegistry
+
+
+class MemeTemplates:
+    """An async find() over template documents; `during` runs while it iterates."""
+
+    def __init__(self, docs, during=None):
+        self.docs = docs
+        self.during = during
+
+    async def find(self):
+        for doc in self.docs:
+            if self.during is not None:
+                self.during()
+            yield dict(doc)
+
+
+def template(template_id, weight=None, **fields):
+    doc = {"_id": template_id, "name": template_id, "text_boxes": [{"x": 0, "y": 0}], **fields}
+    if weight is not None:
+        doc["weight"] = weight
+    return doc
+
+
+def loaded(docs) -> TemplateRegistry:
+    registry = TemplateRegistry()
+    asyncio.run(registry.load(MemeTemplates(docs)))
+    return registry
+
+
+def sample(registry, n=20000):
+    random.seed(1234)
+    return Counter(registry.random()["id"] for _ in range(n))
+
+
+def test_alias_sampling_follows_the_weights():
+    registry = loaded([template("a", weight=1), template("b", weight=3), template("c", weight=6)])
+    counts = sample(registry)
+
+    assert registry.stats()["weighted"]
+    for template_id, share in {"a": 0.1, "b": 0.3, "c": 0.6}.items():
+        assert counts[template_id] / 20000 == pytest.approx(share, abs=0.02)
+
+
+def test_equal_weights_sample_uniformly():
+    registry = loaded([template("a"), template("b", weight=1)])
+
+    assert not registry.stats()["weighted"]
+    assert sample(registry, 2000)["a"] / 2000 == pytest.approx(0.5, abs=0.05)
+
+
+def test_weight_zero_templates_are_never_picked_but_still_served():
+    registry = loaded([template("a", weight=0), template("b", weight=2), template("c", weight=1), template("d", weight=-1)])
+
+    assert set(sample(registry, 5000)) == {"b", "c"}
+    assert registry.get("a")["name"] == "a"
+    assert registry.get("d")["name"] == "d"
+
+
+def test_all_weights_zero_disables_random():
+    registry = loaded([template("a", weight=0), template("b", weight=0)])
+
+    assert registry.random() is None
+    assert len(registry.all()) == 2
+
+
+def test_invalidate_during_a_load_leaves_the_registry_stale():
+    registry = TemplateRegistry()
+    # A template write lands while the load is reading the collection
+    writes = [registry.invalidate]
+
+    asyncio.run(registry.load(MemeTemplates([template("a"), template("b")], during=lambda: writes and writes.pop()())))
+    assert registry.is_stale
+    assert registry.get("a") is not None
+
+    asyncio.run(registry.ensure_loaded(MemeTemplates([template("a"), template("c")])))
+    assert not registry.is_stale
+    assert registry.get("c") is not None
+
+
+def test_an_older_load_never_overwrites_a_newer_one():
+    registry = TemplateRegistry()
+
+    async def run():
+        old_started = asyncio.Event()
+        release_old = asyncio.Event()
+
+        class Slow(MemeTemplates):
+            async def find(self):
+                old_started.set()
+                await release_old.wait()
+                async for doc in super().find():
+                    yield doc
+
+        old = asyncio.create_task(registry.load(Slow([template("old")])))
+        await old_started.wait()
+        registry.invalidate()
+        await registry.load(MemeTemplates([template("new")]))
+        release_old.set()
+        await old
+
+    asyncio.run(run())
+    assert registry.get("new") is not None and registry.get("old") is None
+    assert not registry.is_stale
+
+
+def test_returned_templates_are_copies():
+    registry = loaded([template("a")])
+
+    registry.get("a")["text_boxes"][0]["x"] = 99
+    registry.random()["text_boxes"].append({})
+    registry.all()[0]["name"] = "changed"
+
+    assert registry.get("a") == {"id": "a", "name": "a", "text_boxes": [{"x": 0, "y": 0}]}
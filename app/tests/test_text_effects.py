@@ -0,0 +1,79 @@
+import pytest
+from PIL import Image, ImageChops, ImageDraw, ImageStat
+
+from app.utils.font_utils import get_font
+from app.utils.text_effects import draw_text, effect_margin, parse_style
+
+FONT = get_font(font_size=40)
+LINES = [(20, 10, "WHEN THE"), (20, 60, "TESTS PASS")]
+BACKGROUND = (90, 140, 200)
+
+
+def background(mode="RGB"):
+    return Image.new(mode, (320, 120), BACKGROUND + ((255,) if mode == "RGBA" else ()))
+
+
+def drawn(style, mode="RGB", stroke_width=2):
+    return draw_text(background(mode), LINES, FONT, (255, 255, 255), stroke_width, (0, 0, 0), style)
+
+
+def glyph_mask(stroke_width=0):
+    mask = Image.new("L", (320, 120), 0)
+    draw = ImageDraw.Draw(mask)
+    for x, y, text in LINES:
+        draw.text((x, y), text, font=FONT, fill=255, stroke_width=stroke_width, stroke_fill=255)
+    return mask
+
+
+def changed(image, reference):
+    """Mask of the pixels where two images differ."""
+    difference = ImageChops.difference(image.convert("RGB"), reference.convert("RGB")).convert("L")
+    return difference.point(lambda v: 255 if v else 0)
+
+
+def outside(pixels, mask):
+    """Number of pixels set in `pixels` where `mask` is empty."""
+    return ImageChops.subtract(pixels, mask.point(lambda v: 255 if v else 0)).histogram()[255]
+
+
+@pytest.mark.parametrize("style", [None, "default", "bold", "comic", "unknown"])
+def test_styles_without_effects_draw_exactly_like_imagedraw(style):
+    expected = background()
+    draw = ImageDraw.Draw(expected)
+    for x, y, text in LINES:
+        draw.text((x, y), text, font=FONT, fill=(255, 255, 255), stroke_width=2, stroke_fill=(0, 0, 0))
+
+    assert drawn(style).tobytes() == expected.tobytes()
+
+
+@pytest.mark.parametrize("mode", ["RGB", "RGBA"])
+def test_gradient_only_colors_glyph_pixels(mode):
+    gradient = drawn("gradient", mode, stroke_width=0)
+
+    assert outside(changed(gradient, background(mode)), glyph_mask()) == 0
+    # It is a gradient: fully covered glyph pixels of the top line are another color than the bottom line's
+    solid = glyph_mask().point(lambda v: 255 if v == 255 else 0)
+    top, bottom = (ImageStat.Stat(gradient.convert("RGB").crop(box), solid.crop(box)).mean
+                   for box in [(0, 0, 320, 55), (0, 55, 320, 120)])
+    assert max(abs(a - b) for a, b in zip(top, bottom)) > 50
+
+
+def test_gradient_fill_differs_from_solid_only_inside_the_glyphs():
+    assert outside(changed(drawn("gradient"), drawn("default")), glyph_mask()) == 0
+    assert changed(drawn("gradient"), drawn("default")).getbbox() is not None
+
+
+@pytest.mark.parametrize("style", ["shadow", "glow", "box", "shadow+glow+box+gradient"])
+def test_effects_stay_within_their_margin(style):
+    margin = effect_margin(parse_style(style), FONT.size)
+    bbox = changed(drawn(style), background()).getbbox()
+    text = glyph_mask(stroke_width=2).getbbox()
+
+    assert bbox is not None
+    assert bbox[0] >= text[0] - margin - 1 and bbox[1] >= text[1] - margin - 1
+    assert bbox[2] <= text[2] + margin + 1 and bbox[3] <= text[3] + margin + 1
+
+
+def test_parse_style_keeps_drawing_order():
+    assert parse_style(" Gradient + SHADOW+bold") == ["shadow", "gradient"]
+    assert parse_style(None) == []
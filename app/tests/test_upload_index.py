@@ -0,0 +1,55 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from app.services.storage_service import UploadIndex
+
+EXPIRY = datetime(2026, 10, 19, 12, 0, 0)
+
+
+class MemeObjects:
+    """Collects bulk_write calls. `failed_indexes` fails those operations, `block` waits until cancelled."""
+
+    def __init__(self, failed_indexes=(), block: bool = False):
+        self.failed_indexes = failed_indexes
+        self.block = block
+        self.writes = []
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.block:
+            await asyncio.Event().wait()
+        if self.failed_indexes:
+            raise BulkWriteError({"writeErrors": [{"index": i, "code": 1, "errmsg": "failed"}
+                                                  for i in self.failed_indexes]})
+        self.writes.append([op._filter["_id"] for op in operations])
+
+
+def test_partial_failure_requeues_only_the_failed_expiries():
+    index = UploadIndex()
+    for key in ("meme_a", "meme_b", "meme_c"):
+        index.add(key, EXPIRY)
+
+    assert asyncio.run(index.flush(MemeObjects(failed_indexes=[2]))) == 2
+
+    collection = MemeObjects()
+    asyncio.run(index.flush(collection))
+    assert collection.writes == [["meme_c"]]
+
+
+def test_cancelled_flush_keeps_the_batch_and_the_latest_expiry():
+    index = UploadIndex()
+    index.add("meme_a", EXPIRY)
+
+    async def run():
+        flush = asyncio.create_task(index.flush(MemeObjects(block=True)))
+        await asyncio.sleep(0)
+        index.add("meme_a", EXPIRY - timedelta(days=1))  # an older expiry arrives meanwhile
+        flush.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flush
+
+    asyncio.run(run())
+    assert index.stats()["unflushed"] == 1
+    assert index._unflushed["meme_a"] == EXPIRY
@@ -0,0 +1,130 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.services.usage_service import UsageRecorder
+
+
+class ApiKeys:
+    """Collects bulk_write calls. `fail` makes them raise, `failed_indexes` fails those operations
+    only, `block` never returns (until cancelled) and `during` runs inside each call."""
+
+    def __init__(self, fail: bool = False, during=None, failed_indexes=(), block: bool = False):
+        self.fail = fail
+        self.during = during
+        self.failed_indexes = failed_indexes
+        self.block = block
+        self.writes = []
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.during is not None:
+            self.during()
+        if self.block:
+            await asyncio.Event().wait()
+        if self.fail:
+            raise ConnectionError("mongo unavailable")
+        if self.failed_indexes:
+            raise BulkWriteError({
+                "writeErrors": [{"index": i, "code": 11000, "errmsg": "failed"} for i in self.failed_indexes],
+                "nModified": len(operations) - len(self.failed_indexes),
+            })
+        self.writes.append(operations)
+
+
+def test_flush_writes_one_bulk_update_per_key():
+    recorder = UsageRecorder()
+    recorder.record("a", requests=1, llm_calls=1)
+    recorder.record("a", requests=1, bytes_served=100)
+    recorder.record("b", requests=1)
+    last_used = {key: recorder.pending(key).last_used for key in "ab"}
+    collection = ApiKeys()
+
+    assert asyncio.run(recorder.flush(collection)) == 2
+
+    assert collection.writes == [[
+        UpdateOne({"key_id": "a"}, {
+            "$max": {"last_used": last_used["a"]},
+            "$inc": {"usage.requests": 2, "usage.llm_calls": 1, "usage.bytes_served": 100},
+        }),
+        UpdateOne({"key_id": "b"}, {"$max": {"last_used": last_used["b"]}, "$inc": {"usage.requests": 1}}),
+    ]]
+    assert recorder.pending("a") is None
+    assert asyncio.run(recorder.flush(collection)) == 0
+
+
+def test_failed_flush_merges_counters_back():
+    recorder = UsageRecorder()
+    recorder.record("a", requests=2, llm_calls=1)
+    recorder.record("b", requests=1)
+
+    assert asyncio.run(recorder.flush(ApiKeys(fail=True))) == 0
+
+    assert recorder.pending("a").requests == 2 and recorder.pending("a").llm_calls == 1
+    assert recorder.pending("b").requests == 1
+    assert recorder.stats()["failed_flushes"] == 1
+
+
+def test_usage_recorded_during_a_failed_flush_is_added_not_lost():
+    recorder = UsageRecorder()
+    recorder.record("a", requests=2, bytes_served=10)
+    before = recorder.pending("a").last_used
+
+    def concurrent_request():
+        recorder.record("a", requests=1, bytes_served=5)
+        recorder.record("c", llm_calls=1)
+
+    asyncio.run(recorder.flush(ApiKeys(fail=True, during=concurrent_request)))
+
+    usage = recorder.pending("a")
+    assert (usage.requests, usage.bytes_served) == (3, 15)
+    assert usage.last_used >= before
+    assert recorder.pending("c").llm_calls == 1
+
+    collection = ApiKeys()
+    assert asyncio.run(recorder.flush(collection)) == 2
+    increments = {op._filter["key_id"]: op._doc["$inc"] for op in collection.writes[0]}
+    assert increments == {"a": {"usage.requests": 3, "usage.bytes_served": 15}, "c": {"usage.llm_calls": 1}}
+
+
+def test_merge_back_keeps_the_latest_last_used():
+    recorder = UsageRecorder()
+    recorder.record("a", requests=1)
+    recorder.pending("a").last_used = datetime(2030, 1, 1)
+
+    def older_request():
+        recorder.record("a", requests=1)
+        recorder.pending("a").last_used = datetime(2020, 1, 1)
+
+    asyncio.run(recorder.flush(ApiKeys(fail=True, during=older_request)))
+
+    assert recorder.pending("a").last_used == datetime(2030, 1, 1)
+
+
+def test_partial_bulk_write_failure_requeues_only_the_failed_keys():
+    recorder = UsageRecorder()
+    for key_id in "abc":
+        recorder.record(key_id, requests=1)
+
+    assert asyncio.run(recorder.flush(ApiKeys(failed_indexes=[1]))) == 2
+
+    # a and c were applied; requeueing them would count their requests twice
+    assert recorder.pending("a") is None and recorder.pending("c") is None
+    assert recorder.pending("b").requests == 1
+
+
+def test_cancelled_flush_keeps_the_batch():
+    recorder = UsageRecorder()
+    recorder.record("a", requests=3)
+
+    async def run():
+        flush = asyncio.create_task(recorder.flush(ApiKeys(block=True)))
+        await asyncio.sleep(0)
+        flush.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flush
+
+    asyncio.run(run())
+    assert recorder.pending("a").requests == 3
@@ -1,8 +1,12 @@
 # app/utils/font_utils.py
 
+import io
 import os
 import logging
-from typing import Optional
+import threading
+from functools import lru_cache
+from typing import Dict, Optional
+from PIL import ImageFont
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -14,10 +18,21 @@ AVAILABLE_FONTS = {
     "ComicSansMS.ttf",
     "Roboto-Regular.ttf",
     "Impact.ttf",
-    "Arial.ttf"
+    "Arial.ttf",
+    "Comic-Regular.ttf"
 }
 
-DEFAULT_FONT = "Arial.ttf"
+# Bundled with the app, so unavailable fonts fall back to a real font at the requested size
+DEFAULT_FONT = "Impact.ttf"
+
+# Upper bound on memoized (font, size) instances
+FONT_CACHE_SIZE = 128
+
+FONTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fonts')
+
+# Font name -> TTF bytes, filled once by preload_fonts()
+_font_data: Optional[Dict[str, bytes]] = None
+_font_data_lock = threading.Lock()
 
 def get_font_path(font_name: str = DEFAULT_FONT) -> str:
     """
@@ -60,3 +75,72 @@ def list_available_fonts() -> list:
     """
     return sorted(list(AVAILABLE_FONTS))
 
+
+def preload_fonts() -> list:
+    """
+    Read every available font file into memory once.
+    Fonts in AVAILABLE_FONTS without a file on disk are skipped and treated as unavailable.
+
+    Returns:
+        list: Names of the fonts that were loaded
+    """
+    global _font_data
+    with _font_data_lock:
+        if _font_data is None:
+            loaded = {}
+            for font_name in sorted(AVAILABLE_FONTS):
+                font_path = os.path.join(FONTS_DIR, font_name)
+                try:
+                    with open(font_path, 'rb') as f:
+                        loaded[font_name] = f.read()
+                except OSError:
+                    logger.warning(f"Font file not found at {font_path}. Font '{font_name}' will be unavailable")
+            _font_data = loaded
+            logger.info(f"Preloaded fonts: {', '.join(loaded)}")
+    return sorted(_font_data)
+
+
+def is_font_available(font_name: str) -> bool:
+    """
+    Check whether a font was loaded, without touching the filesystem.
+    """
+    if _font_data is None:
+        preload_fonts()
+    return font_name in _font_data
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def _load_font(font_name: str, font_size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(io.BytesIO(_font_data[font_name]), size=font_size)
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def _load_default_font(font_size: int) -> ImageFont.FreeTypeFont:
+    # Memoized like the others so layout memos keyed on the font stay effective
+    return ImageFont.load_default(size=font_size)
+
+
+def get_font(font_name: str = DEFAULT_FONT, font_size: int = 40) -> ImageFont.FreeTypeFont:
+    """
+    Get a font object from the process-wide registry.
+    Instances are memoized by (font, size); unavailable fonts fall back to the default
+    font, then to PIL's default font, with no filesystem I/O.
+
+    Args:
+        font_name (str): Name of the font file (e.g., "Anton-Regular.ttf")
+        font_size (int): Size of the font
+
+    Returns:
+        ImageFont: Font object
+    """
+    if not is_font_available(font_name):
+        logger.debug(f"Font '{font_name}' not available. Using default font: {DEFAULT_FONT}")
+        font_name = DEFAULT_FONT
+        if not is_font_available(font_name):
+            return _load_default_font(font_size)
+    return _load_font(font_name, font_size)
+
+
+def font_cache_stats() -> dict:
+    """Stats for the (font, size) memo."""
+    return {"loaded_fonts": sorted(_font_data or []), **_load_font.cache_info()._asdict()}
@@ -0,0 +1,276 @@
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image
+
+from ..config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Modes Pillow stores at 4 bytes per pixel whatever their band count (3-band modes are padded)
+FOUR_BYTE_MODES = frozenset({"RGB", "RGBA", "RGBX", "RGBa", "CMYK", "YCbCr", "LAB", "HSV", "LA", "La", "PA", "I", "F"})
+
+
+@dataclass
+class CachedImage:
+    data: bytes
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+
+
+class TemplateImageCache:
+    """
+    Two-tier cache of template source images keyed by URL.
+
+    Tier 1 is an in-memory LRU bounded by total bytes, tier 2 an on-disk
+    directory that survives restarts. Entries older than `ttl` seconds are
+    revalidated with If-None-Match / If-Modified-Since, so an unchanged
+    template costs a 304 instead of a full download.
+    """
+
+    def __init__(self, max_bytes: int, cache_dir: Optional[str] = None, ttl: int = 3600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._entries: "OrderedDict[str, CachedImage]" = OrderedDict()
+        self._size = 0
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    def _is_fresh(self, entry: CachedImage) -> bool:
+        return time.time() - entry.fetched_at < self.ttl
+
+    def _store(self, url: str, entry: CachedImage):
+        """Insert into the memory tier, evicting least recently used entries to stay within budget."""
+        old = self._entries.pop(url, None)
+        if old is not None:
+            self._size -= len(old.data)
+        if len(entry.data) > self.max_bytes:
+            return
+
+        self._entries[url] = entry
+        self._size += len(entry.data)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted.data)
+            self.evictions += 1
+
+    def _disk_paths(self, url: str):
+        name = hashlib.sha256(url.encode()).hexdigest()
+        return self.cache_dir / f"{name}.bin", self.cache_dir / f"{name}.json"
+
+    def _read_disk(self, url: str) -> Optional[CachedImage]:
+        data_path, meta_path = self._disk_paths(url)
+        try:
+            meta = json.loads(meta_path.read_text())
+            return CachedImage(data=data_path.read_bytes(), **meta)
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def _write_disk(self, url: str, entry: CachedImage):
+        data_path, meta_path = self._disk_paths(url)
+        meta = {"etag": entry.etag, "last_modified": entry.last_modified, "fetched_at": entry.fetched_at}
+        try:
+            for path, content in ((data_path, entry.data), (meta_path, json.dumps(meta).encode())):
+                # Write to a temp file and rename so readers never see a partial file
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write template cache entry for {url}: {e}")
+
+    async def get(self, url: str, client: httpx.AsyncClient) -> bytes:
+        """
+        Return the image bytes for `url`, downloading or revalidating only when needed.
+        """
+        entry = self._entries.get(url)
+        if entry is not None and self._is_fresh(entry):
+            self._entries.move_to_end(url)
+            self.hits += 1
+            return entry.data
+
+        # One download per URL at a time, concurrent requests wait for it
+        lock = self._locks.setdefault(url, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(url)
+            if entry is not None and self._is_fresh(entry):
+                self.hits += 1
+                return entry.data
+
+            if entry is None and self.cache_dir:
+                entry = await run_in_threadpool(self._read_disk, url)
+                if entry is not None and self._is_fresh(entry):
+                    self.disk_hits += 1
+                    self._store(url, entry)
+                    return entry.data
+
+            headers = {}
+            if entry is not None:
+                if entry.etag:
+                    headers["If-None-Match"] = entry.etag
+                if entry.last_modified:
+                    headers["If-Modified-Since"] = entry.last_modified
+
+            try:
+                response = await client.get(url, headers=headers)
+            except httpx.HTTPError as e:
+                if entry is not None:
+                    logger.warning(f"Revalidation of {url} failed, serving stale copy: {e}")
+                    return entry.data
+                raise Exception(f"Failed to download image from {url}")
+
+            if response.status_code == 304 and entry is not None:
+                self.revalidations += 1
+                entry.fetched_at = time.time()
+            elif response.status_code == 200:
+                self.misses += 1
+                entry = CachedImage(
+                    data=response.content,
+                    etag=response.headers.get("etag"),
+                    last_modified=response.headers.get("last-modified"),
+                    fetched_at=time.time(),
+                )
+            elif entry is not None:
+                logger.warning(f"Revalidation of {url} returned {response.status_code}, serving stale copy")
+                return entry.data
+            else:
+                raise Exception(f"Failed to download image from {url}")
+
+            self._store(url, entry)
+            if self.cache_dir:
+                await run_in_threadpool(self._write_disk, url, entry)
+            return entry.data
+
+    def clear(self):
+        """Drop the memory tier. The disk tier is kept and revalidated on use."""
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions,
+        }
+
+
+class DecodedImageCache:
+    """
+    Cache of decoded template rasters, bounded by a memory budget.
+
+    Entries are keyed by a digest of the encoded bytes and the target mode, so
+    a template that changes upstream can never be served from a stale raster.
+    Rasters are kept in the mode the renderer asks for and counted at the
+    size Pillow actually allocates for them. Every caller gets its own copy to
+    draw on; copying a raster is a memcpy, far cheaper than decoding the file
+    again.
+
+    Used from the render threadpool, so all bookkeeping is behind a lock.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, Image.Image]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _raster_size(image: Image.Image) -> int:
+        pixel_size = 4 if image.mode in FOUR_BYTE_MODES else len(image.getbands())
+        return image.width * image.height * pixel_size
+
+    def get(self, image_bytes: io.BytesIO, mode: str = "RGB") -> Image.Image:
+        """
+        Return a private, writable copy of the decoded image in `mode`.
+        """
+        key = (hashlib.blake2b(image_bytes.getvalue(), digest_size=16).digest(), mode)
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if cached is not None:
+            return cached.copy()
+
+        # Decode outside the lock so concurrent misses on different templates run in parallel
+        image_bytes.seek(0)
+        with Image.open(image_bytes) as opened:
+            decoded = opened.convert(mode)
+
+        size = self._raster_size(decoded)
+        with self._lock:
+            self.misses += 1
+            if size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = decoded
+                self._size += size
+                while self._size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= self._raster_size(evicted)
+                    self.evictions += 1
+        return decoded.copy()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Cache the cache creation: one per process
+@lru_cache()
+def get_template_cache() -> TemplateImageCache:
+    settings = get_settings()
+    return TemplateImageCache(
+        max_bytes=settings.template_cache_max_bytes,
+        cache_dir=settings.template_cache_dir,
+        ttl=settings.template_cache_ttl,
+    )
+
+
+@lru_cache()
+def get_decoded_cache() -> DecodedImageCache:
+    return DecodedImageCache(max_bytes=get_settings().decoded_cache_max_bytes)
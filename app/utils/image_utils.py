@@ -1,9 +1,24 @@
 import base64
-from PIL import Image, ImageDraw
 from typing import  Dict, List
+from functools import lru_cache
 import io
-import requests
+import httpx
 from .text_styler import TextStyler
+from .image_cache import get_template_cache, get_decoded_cache
+from .encoders import OutputFormat, get_output_format, encode_image
+
+
+# Cache the client creation so downloads share one connection pool
+@lru_cache()
+def get_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(timeout=10.0, follow_redirects=True)
+
+
+async def close_http_client():
+    """Close the shared HTTP client, if one was created."""
+    if get_http_client.cache_info().currsize:
+        await get_http_client().aclose()
+        get_http_client.cache_clear()
 
 
 class ImageProcessor:
@@ -16,28 +31,38 @@ class ImageProcessor:
         return base64.b64encode(image_bytes.getvalue()).decode('utf-8')
 
     @staticmethod
-    def download_image(url: str) -> io.BytesIO:
+    async def download_image(url: str) -> io.BytesIO:
         """
-        Download image from the provided URL.
+        Download image from the provided URL without blocking the event loop.
         """
-        response = requests.get(url)
+        response = await get_http_client().get(url)
         if response.status_code == 200:
             return io.BytesIO(response.content)
         raise Exception(f"Failed to download image from {url}")
+
+    @staticmethod
+    async def get_template_image(url: str) -> io.BytesIO:
+        """
+        Get a template source image, served from the template cache when possible.
+        """
+        data = await get_template_cache().get(url, get_http_client())
+        return io.BytesIO(data)
     
 
-    def generate_meme_from_text_boxes(self, image_bytes: io.BytesIO, text_boxes: List[Dict]) -> io.BytesIO:
+    def generate_meme_from_text_boxes(
+        self,
+        image_bytes: io.BytesIO,
+        text_boxes: List[Dict],
+        output_format: OutputFormat | None = None,
+    ) -> io.BytesIO:
         """
         Generate meme by placing text within specified bounding boxes.
         """
-        # Open the original image
-        img = Image.open(image_bytes).convert('RGBA')
+        # Start from a copy of the cached raster instead of decoding again; layers
+        # carry their own alpha, so the compact RGB copy is enough
+        img = get_decoded_cache().get(image_bytes, 'RGB')
         original_width, original_height = img.size
 
-        # Create a transparent overlay for text
-        text_overlay = Image.new('RGBA', img.size, (0, 0, 0, 0))
-        draw = ImageDraw.Draw(text_overlay)
-
         for box in text_boxes:
             # Adjust bounding box coordinates based on original image size
             scale_x = original_width / 512
@@ -52,25 +77,20 @@ class ImageProcessor:
                 "color": box['color'],
                 "style": box['style']
             }
+            for key in ('outline_width', 'outline_color'):
+                if box.get(key) is not None:
+                    adjusted_box[key] = box[key]
 
-            # Create text layer for each box
-            text_layer = self.styler.create_text_layer(
+            # Render each box onto a layer covering only its text
+            text_layer, offset = self.styler.render_text_box(
                 image_size=img.size,
                 text_box=adjusted_box
             )
 
-            # Composite the text layer onto the overlay
-            text_overlay = Image.alpha_composite(text_overlay, text_layer)
-
-        # Composite the text overlay onto the original image
-        final_img = Image.alpha_composite(img, text_overlay)
-
-        # Convert to RGB for JPEG
-        final_img = final_img.convert('RGB')
+            # Composite the text layer onto the image in place, through its alpha
+            if text_layer is not None:
+                img.paste(text_layer, offset, text_layer)
 
-        # Save to buffer
-        output = io.BytesIO()
-        final_img.save(output, format='JPEG', quality=95)
-        output.seek(0)
-        return output
+        # Save to buffer, JPEG output drops the alpha channel
+        return encode_image(img, output_format or get_output_format())
 
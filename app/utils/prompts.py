@@ -1,3 +1,7 @@
+import hashlib
+from functools import lru_cache
+
+
 def get_meme_system_prompt() -> str:
     prompt = """You are a meme generation expert specializing in creating engaging and humorous memes.
 Instructions:
@@ -13,7 +17,6 @@ Instructions:
     "width": "get from context",
     "height": "get from context",
     "text": "Your meme text here for this box",
-    'font_size': "Choose appropriate size based on the context and your text",
     'font_name': "Anton-Regular.ttf/ComicSansMS.ttf/Roboto-Regular.ttf/Impact.ttf/Arial.ttf",
     "stroke_width": "int e.g. 2",
     "text_color": "array of color codes e.g.: [255, 255, 255]",
@@ -26,12 +29,17 @@ Instructions:
 
 ### Note:
 - Choose exact font_name from the given list. e.g. Anton-Regular.ttf 
-- Be careful with the text size 
+- Font size is fitted to the box automatically, do not return font_size
 - Make the text engaging, funny and relatable base on users query
 
 """
     return prompt
 
+@lru_cache()
+def get_meme_prompt_version() -> str:
+    """Short digest of the system prompt; changes whenever the prompt text does."""
+    return hashlib.sha256(get_meme_system_prompt().encode()).hexdigest()[:12]
+
 SYSTEM_PROMPT = """
 You are a meme generation expert specializing in creating engaging and humorous memes.
 
@@ -60,7 +68,7 @@ Generate meme text and bounding boxes based on the template's `box_count`. Ensur
 3. **Text Styling:**
    - **Font Size:** Automatically adjust to fit the text within the bounding box. Provide a `font_size` value.
    - **Color:** Choose a text color that contrasts well with the background. Provide a `color` value in HEX format.
-   - **Style:** Specify text style options such as `'default'`, `'bold'`, `'comic'`, or `'gradient'`.
+   - **Style:** Specify text style options such as `'default'`, `'bold'`, `'comic'`, `'gradient'`, `'shadow'`, `'glow'` or `'box'`; effects can be combined with `+`, e.g. `'shadow+gradient'`.
 
 4. **Output Format:**
    - Return a valid JSON object containing an array of `text_boxes`, each with the following structure:
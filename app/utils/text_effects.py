@@ -0,0 +1,180 @@
+import math
+from typing import Iterable, List, Sequence, Tuple
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+# Styles drawn from glyph masks; combine them with "+", e.g. "shadow+gradient"
+EFFECTS = ("box", "shadow", "glow", "gradient")
+# Vertical gradient fill, top to bottom
+GRADIENT_TOP = (0, 255, 150)
+GRADIENT_BOTTOM = (255, 0, 150)
+# Drop shadow and backing box color and opacity (0-255)
+SHADOW_COLOR = (0, 0, 0)
+SHADOW_OPACITY = 160
+BOX_COLOR = (0, 0, 0)
+BOX_OPACITY = 140
+# Glow opacity is boosted by this factor after blurring so it stays visible
+GLOW_GAIN = 3
+
+Line = Tuple[float, float, str]  # x, y, text
+
+
+def parse_style(style: str | None) -> List[str]:
+    """
+    The effects named in a style, in drawing order.
+    Names without an effect ('default', 'bold', 'comic' or unknown ones) are ignored.
+    """
+    names = set((style or "").lower().replace(" ", "").split("+"))
+    return [effect for effect in EFFECTS if effect in names]
+
+
+def effect_margin(effects: Sequence[str], font_size: int) -> int:
+    """Pixels the effects reach beyond the outlined text."""
+    margin = 0
+    if "box" in effects:
+        margin = max(margin, _box_padding(font_size))
+    if "shadow" in effects:
+        offset, blur = _shadow_geometry(font_size)
+        margin = max(margin, offset + 2 * blur)
+    if "glow" in effects:
+        margin = max(margin, 2 * _glow_radius(font_size))
+    return margin
+
+
+def _box_padding(font_size: int) -> int:
+    return max(4, font_size // 5)
+
+
+def _shadow_geometry(font_size: int) -> Tuple[int, int]:
+    return max(2, font_size // 15), max(1, font_size // 25)
+
+
+def _glow_radius(font_size: int) -> int:
+    return max(2, font_size // 8)
+
+
+def _scale(mask: Image.Image, factor: float) -> Image.Image:
+    """Multiply a mask's coverage by `factor`, clamped to 255 (one lookup table pass)."""
+    return mask.point([min(255, int(v * factor)) for v in range(256)])
+
+
+def _composite(image: Image.Image, source, mask: Image.Image, origin: Tuple[int, int]):
+    """Blend a color or an image of the mask's size over `image` at `origin`, through the mask."""
+    left, top = origin
+    if image.mode == "RGBA":
+        if isinstance(source, Image.Image):
+            source = source.convert("RGBA")
+        else:
+            source = Image.new("RGBA", mask.size, tuple(source)[:3] + (255,))
+        source.putalpha(mask)
+        image.alpha_composite(source, dest=(left, top))
+    else:
+        image.paste(tuple(source) if isinstance(source, (list, tuple)) else source,
+                    (left, top, left + mask.width, top + mask.height), mask)
+
+
+def _gradient(size: Tuple[int, int], top: int, bottom: int, colors=(GRADIENT_TOP, GRADIENT_BOTTOM)) -> Image.Image:
+    """An RGB vertical gradient running between rows `top` and `bottom`, flat outside them."""
+    width, height = size
+    column = Image.new("L", (1, height), 0)
+    span = max(1, bottom - top)
+    column.paste(Image.linear_gradient("L").resize((1, span)), (0, top))
+    if top + span < height:
+        column.paste(255, (0, top + span, 1, height))
+    column = column.resize((width, height), Image.NEAREST)
+    start, end = colors
+    return Image.merge("RGB", [
+        column.point([a + (b - a) * v // 255 for v in range(256)]) for a, b in zip(start, end)
+    ])
+
+
+def draw_text(
+    image: Image.Image,
+    lines: Iterable[Line],
+    font: ImageFont.FreeTypeFont,
+    fill: Tuple[int, int, int],
+    stroke_width: int = 2,
+    stroke_fill: Tuple[int, int, int] = (0, 0, 0),
+    style: str | None = None,
+) -> Image.Image:
+    """
+    Draw outlined lines of text onto an RGB or RGBA image in place, with the
+    effects named in `style`.
+
+    The glyphs are rasterized once into a fill mask and once into an outline
+    mask covering the text's area; every effect is then a few whole-mask
+    Pillow operations (offset, blur, lookup table, paste) composited in order:
+    backing box, drop shadow, glow, outline, then the fill (solid, or a
+    gradient clipped to the glyphs).
+
+    Args:
+        image (PIL.Image): Image to draw on
+        lines (iterable): (x, y, text) per line, in image coordinates
+        font (ImageFont): Font to draw with
+        fill (tuple): RGB text color, also the glow color
+        stroke_width (int): Outline width in pixels
+        stroke_fill (tuple): RGB outline color
+        style (str): Effects to apply, e.g. "gradient" or "shadow+glow"
+
+    Returns:
+        PIL.Image: The same image
+    """
+    lines = list(lines)
+    fill, stroke_fill = tuple(fill), tuple(stroke_fill)
+    effects = parse_style(style)
+    if not effects:
+        draw = ImageDraw.Draw(image)
+        for x, y, text in lines:
+            draw.text((x, y), text, font=font, fill=fill, stroke_width=stroke_width, stroke_fill=stroke_fill)
+        return image
+
+    # The region covers the outlined text and whatever the effects add around it
+    measure = ImageDraw.Draw(image)
+    boxes = [measure.textbbox((x, y), text, font=font, stroke_width=stroke_width) for x, y, text in lines if text]
+    if not boxes:
+        return image
+    text_box = (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+    font_size = int(getattr(font, "size", 12))
+    margin = effect_margin(effects, font_size)
+    left = max(0, math.floor(text_box[0]) - margin)
+    top = max(0, math.floor(text_box[1]) - margin)
+    right = min(image.width, math.ceil(text_box[2]) + margin)
+    bottom = min(image.height, math.ceil(text_box[3]) + margin)
+    if right <= left or bottom <= top:
+        return image
+    size = (right - left, bottom - top)
+
+    # Rasterize the glyphs once: the fill alone, and the fill with its outline
+    fill_mask = Image.new("L", size, 0)
+    outline_mask = Image.new("L", size, 0)
+    fill_draw, outline_draw = ImageDraw.Draw(fill_mask), ImageDraw.Draw(outline_mask)
+    for x, y, text in lines:
+        fill_draw.text((x - left, y - top), text, font=font, fill=255)
+        outline_draw.text((x - left, y - top), text, font=font, fill=255, stroke_width=stroke_width, stroke_fill=255)
+
+    origin = (left, top)
+    if "box" in effects:
+        padding = _box_padding(font_size)
+        box_mask = Image.new("L", size, 0)
+        ImageDraw.Draw(box_mask).rounded_rectangle(
+            (text_box[0] - left - padding, text_box[1] - top - padding,
+             text_box[2] - left + padding, text_box[3] - top + padding),
+            radius=padding, fill=BOX_OPACITY,
+        )
+        _composite(image, BOX_COLOR, box_mask, origin)
+    if "shadow" in effects:
+        offset, blur = _shadow_geometry(font_size)
+        shadow = Image.new("L", size, 0)
+        shadow.paste(outline_mask, (offset, offset))
+        shadow = _scale(shadow.filter(ImageFilter.GaussianBlur(blur)), SHADOW_OPACITY / 255)
+        _composite(image, SHADOW_COLOR, shadow, origin)
+    if "glow" in effects:
+        glow = _scale(outline_mask.filter(ImageFilter.GaussianBlur(_glow_radius(font_size))), GLOW_GAIN)
+        _composite(image, fill, glow, origin)
+    if stroke_width > 0:
+        _composite(image, stroke_fill, outline_mask, origin)
+    if "gradient" in effects:
+        gradient = _gradient(size, math.floor(text_box[1]) - top, math.ceil(text_box[3]) - top)
+        _composite(image, gradient, fill_mask, origin)
+    else:
+        _composite(image, fill, fill_mask, origin)
+    return image
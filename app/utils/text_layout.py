@@ -0,0 +1,225 @@
+import re
+import weakref
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from PIL import ImageFont
+from .font_utils import get_font
+
+# Upper bound on cached word widths per font before that font's cache is reset
+MAX_WORDS_PER_FONT = 4096
+# Upper bound on memoized wrapped layouts
+LAYOUT_CACHE_SIZE = 2048
+# Used for auto-fit when a template does not define a usable size range
+DEFAULT_SIZE_RANGE = (16, 120)
+# Font size whose measurements are scaled to evaluate auto-fit candidates
+REFERENCE_SIZE = 100
+
+
+class LinePosition(NamedTuple):
+    text: str
+    x: int
+    y: int
+    width: float
+
+
+class TextLayout(NamedTuple):
+    lines: List[LinePosition]
+    line_height: int
+    height: int
+
+
+class FontMetrics:
+    """
+    Per-font measurement cache.
+
+    Each word and each kerning pair is measured once; a line's width is then
+    the sum of its word widths plus the space advance and the kerning
+    corrections at the word boundaries, so wrapping never re-measures a line.
+    """
+
+    def __init__(self, font: ImageFont.FreeTypeFont):
+        self.font = font
+        self.space = font.getlength(" ")
+        self._words: Dict[str, float] = {}
+        self._kerning: Dict[Tuple[str, str], float] = {}
+        self._chars: Dict[str, float] = {" ": self.space}
+
+    def _char(self, char: str) -> float:
+        width = self._chars.get(char)
+        if width is None:
+            width = self._chars[char] = self.font.getlength(char)
+        return width
+
+    def kerning(self, left: str, right: str) -> float:
+        """Difference between the pair's advance and the sum of its glyph advances."""
+        pair = (left, right)
+        correction = self._kerning.get(pair)
+        if correction is None:
+            correction = self.font.getlength(left + right) - self._char(left) - self._char(right)
+            self._kerning[pair] = correction
+        return correction
+
+    def word(self, word: str) -> float:
+        width = self._words.get(word)
+        if width is None:
+            if len(self._words) >= MAX_WORDS_PER_FONT:
+                self._words.clear()
+            width = self._words[word] = self.font.getlength(word)
+        return width
+
+    def join(self, previous: str, word: str) -> float:
+        """Width added by a space between two words, kerning included."""
+        return self.space + self.kerning(previous[-1], " ") + self.kerning(" ", word[0])
+
+
+_metrics: "weakref.WeakKeyDictionary[ImageFont.FreeTypeFont, FontMetrics]" = weakref.WeakKeyDictionary()
+
+
+def get_font_metrics(font: ImageFont.FreeTypeFont) -> FontMetrics:
+    metrics = _metrics.get(font)
+    if metrics is None:
+        metrics = _metrics[font] = FontMetrics(font)
+    return metrics
+
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def wrap_lines(text: str, font: ImageFont.FreeTypeFont, max_width: int) -> Tuple[Tuple[str, float], ...]:
+    """
+    Greedily wrap text to a pixel width in a single pass.
+
+    Fonts come from the font registry, which memoizes one instance per
+    (font, size), so the font object identifies both in the memo key.
+
+    Args:
+        text (str): The text to wrap
+        font (ImageFont): The font object to use for text measurements
+        max_width (int): The maximum width in pixels
+
+    Returns:
+        tuple: (line, width) pairs
+    """
+    words = text.split()
+    if not words:
+        return ()
+
+    metrics = get_font_metrics(font)
+    lines = []
+    line_words = [words[0]]
+    line_width = metrics.word(words[0])
+    for previous, word in zip(words, words[1:]):
+        word_width = metrics.word(word)
+        joined_width = line_width + metrics.join(previous, word) + word_width
+        if joined_width <= max_width:
+            line_words.append(word)
+            line_width = joined_width
+        else:
+            lines.append((" ".join(line_words), line_width))
+            line_words = [word]
+            line_width = word_width
+    lines.append((" ".join(line_words), line_width))
+    return tuple(lines)
+
+
+def layout_text(
+    text: str,
+    font: ImageFont.FreeTypeFont,
+    box: Tuple[int, int, int, int],
+    padding: int = 0,
+    line_spacing: int | None = None,
+) -> TextLayout:
+    """
+    Wrap text inside a box and center it, returning positions ready for drawing.
+
+    Args:
+        text (str): The text to lay out
+        font (ImageFont): The font object to use
+        box (tuple): (x, y, width, height) of the text box
+        padding (int): Horizontal padding removed from the wrap width
+        line_spacing (int): Extra space between lines, defaults to a fifth of the font size
+
+    Returns:
+        TextLayout: Absolute line positions, line height and block height
+    """
+    x, y, width, height = box
+    lines = wrap_lines(text, font, width - 2 * padding)
+
+    ascent, descent = font.getmetrics()
+    if line_spacing is None:
+        line_spacing = int(font.size) // 5
+    line_height = ascent + descent + line_spacing
+    block_height = len(lines) * line_height
+
+    current_y = y + (height - block_height) // 2
+    positions = []
+    for line, line_width in lines:
+        positions.append(LinePosition(line, int(x + (width - line_width) // 2), current_y, line_width))
+        current_y += line_height
+    return TextLayout(positions, line_height, block_height)
+
+
+def parse_size_range(size_range: str | None) -> Optional[Tuple[int, int]]:
+    """
+    Parse a template size range such as "40-80" into (min, max).
+    Returns None if the value holds no sizes.
+    """
+    sizes = [int(n) for n in re.findall(r"\d+", str(size_range or ""))]
+    if not sizes:
+        return None
+    return min(sizes), max(sizes)
+
+
+def _fits(text: str, font: ImageFont.FreeTypeFont, scale: float, width: int, height: int) -> bool:
+    """Check a fit using `font`'s metrics scaled by `scale`."""
+    lines = wrap_lines(text, font, width / scale)
+    if any(line_width * scale > width for _, line_width in lines):
+        return False
+    ascent, descent = font.getmetrics()
+    spacing = int(font.size * scale) // 5
+    return len(lines) * ((ascent + descent) * scale + spacing) - spacing <= height
+
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def fit_font_size(
+    text: str,
+    font_name: str,
+    width: int,
+    height: int,
+    padding: int = 0,
+    size_range: Tuple[int, int] = DEFAULT_SIZE_RANGE,
+) -> int:
+    """
+    Find the largest font size in size_range at which the wrapped text fits the box.
+
+    Candidates are checked against word widths measured once at a reference
+    size and scaled, so the binary search does no glyph measurement of its
+    own; the winner is then confirmed with the real metrics at that size.
+
+    Args:
+        text (str): The text to fit
+        font_name (str): Name of the font file
+        width (int): Box width in pixels
+        height (int): Box height in pixels
+        padding (int): Padding inside the box on every side
+        size_range (tuple): (min, max) font sizes to consider
+
+    Returns:
+        int: The chosen font size, the minimum of the range if nothing fits
+    """
+    available_width = width - 2 * padding
+    available_height = height - 2 * padding
+    reference = get_font(font_name, REFERENCE_SIZE)
+
+    low, high = size_range
+    best = low
+    while low <= high:
+        size = (low + high) // 2
+        if _fits(text, reference, size / REFERENCE_SIZE, available_width, available_height):
+            best = size
+            low = size + 1
+        else:
+            high = size - 1
+
+    # Hinting makes metrics scale slightly non-linearly, step down if the real size overflows
+    while best > size_range[0] and not _fits(text, get_font(font_name, best), 1.0, available_width, available_height):
+        best -= 1
+    return best
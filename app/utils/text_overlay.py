@@ -1,5 +1,10 @@
-from PIL import Image, ImageDraw, ImageFont
-from .font_utils import get_font_path
+from PIL import Image, ImageFont
+from .font_utils import get_font
+from .image_cache import get_decoded_cache
+from .encoders import OutputFormat, get_output_format, encode_image
+from .text_effects import draw_text
+from ..core.metrics import stage
+from .text_layout import wrap_lines, layout_text, fit_font_size, parse_size_range, DEFAULT_SIZE_RANGE
 import io
 import logging
 
@@ -25,13 +30,11 @@ class TextOverlay:
             ImageFont: Font object
         """
         try:
-            # First try to get the specified font
-            font_path = get_font_path(font_name)
-            return ImageFont.truetype(font_path, size=font_size)
+            return get_font(font_name, font_size)
 
         except Exception as e:
             logging.error(f"Failed to load the font. Error: {e}")
-            return ImageFont.load_default()
+            return ImageFont.load_default(size=font_size)
             
 
     def _wrap_text(self, text: str, max_width: int, font: ImageFont.FreeTypeFont) -> list:
@@ -46,24 +49,7 @@ class TextOverlay:
         Returns:
             list: A list of wrapped lines
         """
-        lines = []
-        words = text.split()
-        if not words:
-            return lines
-
-        line = words[0]
-        for word in words[1:]:
-            test_line = f"{line} {word}"
-            bbox = font.getbbox(test_line)
-            width = bbox[2] - bbox[0]
-            
-            if width <= max_width:
-                line = test_line
-            else:
-                lines.append(line)
-                line = word
-        lines.append(line)
-        return lines
+        return [line for line, _ in wrap_lines(text, font, max_width)]
 
     def add_text(self, image: Image.Image, annotation: dict) -> Image.Image:
         """
@@ -78,68 +64,56 @@ class TextOverlay:
                     "width": int,          # Maximum width of text box
                     "height": int,         # Maximum height of text box
                     "text": str,           # Text to display
-                    "font_size": int,      # Font size
+                    "font_size": int,      # Font size, omit or "auto" to fit the box
+                    "size_range": str,     # Range for auto-fit, e.g. "40-80"
                     "font_name": str,      # Font file name
                     "text_color": list,    # RGB color tuple for text
                     "outline_color": list, # RGB color tuple for outline
                     "stroke_width": int,   # Width of outline
-                    "padding": int         # Padding around text
+                    "padding": int,        # Padding around text
+                    "style": str           # Effects, e.g. "gradient", "shadow", "glow", "box" or "shadow+glow"
                 }
 
         Returns:
             PIL.Image: Modified image with text overlay
         """
         try: 
-            draw = ImageDraw.Draw(image)
-
             # Extract parameters from annotation
             text = annotation["text"]
             max_width = annotation["width"]
             max_height = annotation["height"]
             x, y = annotation["x"], annotation["y"]
-            font_size = annotation.get("font_size", 40)
+            font_size = annotation.get("font_size", "auto")
             font_name = annotation.get("font_name", "Arial.ttf")
             text_color = tuple(annotation.get("text_color", [255, 255, 255]))
             outline_color = tuple(annotation.get("outline_color", [0, 0, 0]))
             stroke_width = annotation.get("stroke_width", 2)
             padding = annotation.get("padding", 20)
+            style = annotation.get("style")
+
+            # Auto-fit: largest size in the template's range that fits the box
+            if font_size == "auto":
+                size_range = parse_size_range(annotation.get("size_range")) or DEFAULT_SIZE_RANGE
+                font_size = fit_font_size(text, font_name, max_width, max_height, padding, size_range)
 
             # Get font
             font = self._get_font(font_name, font_size)
         
-            # Calculate effective dimensions
-            effective_width = max_width - (2 * padding)
-
-            # Wrap text
-            wrapped_lines = self._wrap_text(text, effective_width, font)
-
-            # Calculate text block dimensions
-            ascent, descent = font.getmetrics()
-            line_height = ascent + descent + font_size // 5
-            total_text_height = len(wrapped_lines) * line_height
-
-            # Calculate vertical starting position
-            y_start = y + (max_height - total_text_height) // 2
-
-            # Draw text
-            current_y = y_start
-            for line in wrapped_lines:
-                # Center each line horizontally
-                bbox = font.getbbox(line)
-                line_width = bbox[2] - bbox[0]
-                line_x = x + (max_width - line_width) // 2
-                
-                # Draw text with stroke
-                draw.text(
-                    (line_x, current_y), 
-                    line, 
-                    font=font, 
-                    fill=text_color,
-                    stroke_width=stroke_width,
-                    stroke_fill=outline_color
-                )
-                
-                current_y += line_height
+            # Wrap and center text, word widths are measured once per font
+            layout = layout_text(
+                text, font, (x, y, max_width, max_height), padding=padding, line_spacing=font_size // 5
+            )
+
+            # Draw text with stroke and the style's effects
+            draw_text(
+                image,
+                [(line.x, line.y, line.text) for line in layout.lines],
+                font,
+                text_color,
+                stroke_width=stroke_width,
+                stroke_fill=outline_color,
+                style=style,
+            )
             # print("Done drawing", image)
 
             return image
@@ -147,13 +121,37 @@ class TextOverlay:
             logging.error(f"An error occurred while adding text overlay: {e}")
             raise
 
-    def add_multiple_texts(self, image_path: str | Image.Image | io.BytesIO, annotations: list) -> io.BytesIO:
+    @staticmethod
+    def apply_size_ranges(annotations: list, template_annotations: list) -> list:
+        """
+        Copy each template box's font size range onto the matching annotation so it can be auto-fit.
+
+        Args:
+            annotations (list): Annotation dictionaries, in template box order
+            template_annotations (list): The template's annotation guides
+
+        Returns:
+            list: The same annotations, with "size_range" set where the template defines one
+        """
+        for annotation, guide in zip(annotations, template_annotations):
+            size_range = (guide.get("font") or {}).get("size_range")
+            if size_range:
+                annotation.setdefault("size_range", size_range)
+        return annotations
+
+    def add_multiple_texts(
+        self,
+        image_path: str | Image.Image | io.BytesIO,
+        annotations: list,
+        output_format: OutputFormat | None = None,
+    ) -> io.BytesIO:
         """
         Add multiple text overlays to an image.
 
         Args:
             image_path (str | Image.Image | io.BytesIO): Path to the input image or PIL Image object
             annotations (list): List of annotation dictionaries
+            output_format (OutputFormat): Encoder settings, defaults to high quality JPEG
 
         Returns:
             PIL.Image: Modified image with all text overlays
@@ -163,28 +161,25 @@ class TextOverlay:
         # print image instance
 
         try:
-            if isinstance(image_path, str):
-                image = Image.open(image_path).convert('RGBA')
-            elif isinstance(image_path, io.BytesIO):
-                image_path.seek(0)
-                image = Image.open(image_path).convert('RGBA')
-                image.format = 'JPEG'
-            else:
-                image = image_path
+            with stage("decode"):
+                if isinstance(image_path, str):
+                    image = Image.open(image_path).convert('RGBA')
+                elif isinstance(image_path, io.BytesIO):
+                    # Text is drawn opaque, so an RGB copy of the cached raster is enough
+                    image = get_decoded_cache().get(image_path, 'RGB')
+                else:
+                    image = image_path
 
             # print(f"Image format: {image.format}, Size: {image.size}")
             print(image)
 
-            for annotation in annotations:
-                image = self.add_text(image, annotation)
-
-            image = image.convert('RGB')
+            with stage("render"):
+                for annotation in annotations:
+                    image = self.add_text(image, annotation)
 
             # Save to buffer
-            output = io.BytesIO()
-            image.save(output, format='JPEG', quality=95)
-            output.seek(0)
-            return output
+            with stage("encode"):
+                return encode_image(image, output_format or get_output_format())
 
         except Exception as e:
             logging.error(f"An error occurred while adding text overlays: {e}")
@@ -1,18 +1,48 @@
+import math
 from PIL import Image, ImageDraw, ImageFont
-from typing import Tuple, Dict
+from typing import Optional, Tuple, Dict
+from .font_utils import get_font, is_font_available
+from .text_effects import draw_text, effect_margin, parse_style
+from .text_layout import wrap_lines
+
+LINE_SPACING = 4  # pixels between lines, Pillow's multiline default
+DEFAULT_OUTLINE_WIDTH = 2
+DEFAULT_OUTLINE_COLOR = '#000000'
 
 
 class TextStyler:
     def __init__(self):
-        # Ensure the font is downloaded and get its path
-        self.font_path = "Anton-Regular.ttf"  # Using Anton as a free alternative
+        # Bundled font, served from the font registry
+        self.font_name = "Anton-Regular.ttf"  # Using Anton as a free alternative
     
     def create_text_layer(self, image_size: Tuple[int, int], text_box: Dict) -> Image.Image:
         """
-        Create a text layer with the specified styling.
+        Create a full-size text layer with the specified styling.
+        Prefer render_text_box, which only allocates the area the text covers.
         """
         layer = Image.new('RGBA', image_size, (0, 0, 0, 0))
-        draw = ImageDraw.Draw(layer)
+        text_layer, offset = self.render_text_box(image_size, text_box)
+        if text_layer is not None:
+            layer.paste(text_layer, offset)
+        return layer
+
+    def render_text_box(self, image_size: Tuple[int, int], text_box: Dict) -> Tuple[Optional[Image.Image], Tuple[int, int]]:
+        """
+        Render a styled text box onto a layer covering only the text, its outline
+        and its effects.
+
+        Args:
+            image_size (tuple): Size of the image the layer goes on
+            text_box (dict): x, y, width, height, text, and optionally font_size, color,
+                style, outline_width and outline_color (hex or RGB). The style is 'default',
+                'bold' or 'comic', and/or effects such as 'gradient', 'shadow', 'glow' or
+                'box', combined with '+'
+
+        Returns:
+            tuple: (layer, (left, top)) to composite at that position, or (None, (0, 0))
+                when the text falls outside the image
+        """
+        measure = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
 
         # Extract text box details
         text = text_box['text']
@@ -20,19 +50,17 @@ class TextStyler:
         font_size = text_box.get('font_size', 36)
         color = text_box.get('color', '#FFFFFF')
         style = text_box.get('style', 'default')
+        outline_width = text_box.get('outline_width', DEFAULT_OUTLINE_WIDTH)
+        outline_color = self.hex_to_rgb(text_box.get('outline_color', DEFAULT_OUTLINE_COLOR))
 
         # Load font
-        try:
-            font = ImageFont.truetype(self.font_path, font_size)
-        except IOError:
-            font = ImageFont.load_default()
-            print(f"Failed to load font at {self.font_path}. Using default font.")
+        font = get_font(self.font_name, font_size)
 
         # Fit text within the bounding box
-        wrapped_text = self.wrap_text(text, font, width - 20, draw)  # 10px padding on each side
+        wrapped_text = self.wrap_text(text, font, width - 20, measure)  # 10px padding on each side
 
         # Calculate text size using textbbox for accurate measurement
-        bbox = draw.multiline_textbbox((0, 0), wrapped_text, font=font, spacing=4)
+        bbox = measure.multiline_textbbox((0, 0), wrapped_text, font=font, spacing=LINE_SPACING)
         text_width = bbox[2] - bbox[0]
         text_height = bbox[3] - bbox[1]
 
@@ -40,83 +68,50 @@ class TextStyler:
         text_x = x + (width - text_width) / 2
         text_y = y + (height - text_height) / 2
 
-        # Apply text styles
+        # Apply text styles, effects are drawn from the glyph masks
         text_color = self.hex_to_rgb(color)
-        if style == 'bold':
+        font_styles = (style or 'default').lower().split('+')
+        if 'bold' in font_styles:
             font = self.make_bold(font)
-        elif style == 'comic':
+        elif 'comic' in font_styles:
             font = self.get_comic_font(font_size)
-        elif style == 'gradient':
-            # Gradient will be applied after text is drawn
-            pass
-
-        # Draw text with outline for better readability
-        self.draw_text_with_outline(draw, (text_x, text_y), wrapped_text, font, text_color)
 
-        # Apply gradient if needed
-        if style == 'gradient':
-            layer = self.apply_gradient(layer, (text_x, text_y, text_width, text_height))
-
-        return layer
+        # The layer covers the outlined text and its effects, clipped to the image
+        stroked = measure.multiline_textbbox(
+            (text_x, text_y), wrapped_text, font=font, spacing=LINE_SPACING, stroke_width=outline_width
+        )
+        margin = effect_margin(parse_style(style), font_size)
+        left = max(0, math.floor(stroked[0]) - margin)
+        top = max(0, math.floor(stroked[1]) - margin)
+        right = min(image_size[0], math.ceil(stroked[2]) + margin)
+        bottom = min(image_size[1], math.ceil(stroked[3]) + margin)
+        if right <= left or bottom <= top:
+            return None, (0, 0)
+
+        # Lines are placed as multiline_text places unstroked text, so the
+        # outline does not change the line spacing
+        line_spacing = measure.textbbox((0, 0), "A", font=font)[3] + LINE_SPACING
+        lines = [
+            (text_x - left, text_y - top + i * line_spacing, line)
+            for i, line in enumerate(wrapped_text.split("\n"))
+        ]
+
+        layer = Image.new('RGBA', (right - left, bottom - top), (0, 0, 0, 0))
+        draw_text(layer, lines, font, text_color, outline_width, outline_color, style)
+        return layer, (left, top)
 
     def wrap_text(self, text: str, font: ImageFont.FreeTypeFont, max_width: int, draw: ImageDraw.Draw) -> str:
         """
         Wrap text to fit within the max_width.
         """
-        lines = []
-        words = text.split()
-        current_line = ""
-        for word in words:
-            test_line = f"{current_line} {word}".strip()
-            bbox = draw.textbbox((0, 0), test_line, font=font, spacing=4)
-            width = bbox[2] - bbox[0]
-            if width <= max_width:
-                current_line = test_line
-            else:
-                if current_line:  # Avoid empty lines
-                    lines.append(current_line)
-                current_line = word
-        if current_line:
-            lines.append(current_line)
-        return "\n".join(lines)
-
-    def draw_text_with_outline(self, draw: ImageDraw.Draw, position: Tuple[float, float], text: str, font: ImageFont.FreeTypeFont, fill: Tuple[int, int, int]):
-        """
-        Draw text with a black outline to enhance readability.
-        """
-        x, y = position
-        outline_range = 2
-        # Draw outline
-        for dx in range(-outline_range, outline_range + 1):
-            for dy in range(-outline_range, outline_range + 1):
-                if dx != 0 or dy != 0:
-                    draw.multiline_text((x + dx, y + dy), text, font=font, fill=(0, 0, 0))
-        # Draw main text
-        draw.multiline_text(position, text, font=font, fill=fill)
-
-    def apply_gradient(self, layer: Image.Image, text_area: Tuple[float, float, float, float]) -> Image.Image:
-        """
-        Apply a vertical gradient to the specified text area.
-        """
-        x, y, width, height = text_area
-        gradient = Image.new('RGBA', (int(width), int(height)), color=0)
-        grad_draw = ImageDraw.Draw(gradient)
-
-        for i in range(int(height)):
-            ratio = i / height
-            r = int(255 * ratio)
-            g = int(255 * (1 - ratio))
-            b = 150  # Fixed blueish component
-            grad_draw.line([(0, i), (width, i)], fill=(r, g, b, 255))
-
-        # Paste the gradient onto the layer
-        layer.paste(gradient, (int(x), int(y)), gradient)
-        return layer
+        return "\n".join(line for line, _ in wrap_lines(text, font, max_width))
 
-    def hex_to_rgb(self, hex_color: str) -> Tuple[int, int, int]:
+    def hex_to_rgb(self, hex_color) -> Tuple[int, int, int]:
         """
-        Convert HEX color to RGB tuple.
+        Convert HEX color to RGB tuple. RGB lists and tuples are passed through.
         """
+        if isinstance(hex_color, (list, tuple)):
+            return tuple(hex_color[:3])
         hex_color = hex_color.lstrip('#')
         return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
@@ -124,21 +119,18 @@ class TextStyler:
         """
         Simulate bold by using a slightly larger font or a different weight if available.
         """
-        try:
-            bold_font_path = self.font_path.replace('.ttf', 'bd.ttf')
-            return ImageFont.truetype(bold_font_path, font.size)
-        except IOError:
-            # If bold font not available, return the original font
-            return font
+        bold_font_name = self.font_name.replace('.ttf', 'bd.ttf')
+        if is_font_available(bold_font_name):
+            return get_font(bold_font_name, font.size)
+        # If bold font not available, return the original font
+        return font
 
     def get_comic_font(self, font_size: int) -> ImageFont.FreeTypeFont:
         """
         Load a comic-style font.
         """
-        try:
-            # Ensure a comic font is downloaded and available
-            comic_font_path = "Comic-Regular.ttf"
-            return ImageFont.truetype(comic_font_path, font_size)
-        except IOError:
-            # Fallback to default font
-            return ImageFont.load_default()
\ No newline at end of file
+        comic_font_name = "Comic-Regular.ttf"
+        if is_font_available(comic_font_name):
+            return get_font(comic_font_name, font_size)
+        # Fallback to the default font at the same size
+        return get_font(font_size=font_size)
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Benchmark: decode-per-request vs the decoded template cache.
+
+For each synthetic template size, compares opening the JPEG and converting it
+(what every render did before) with fetching a private copy from
+DecodedImageCache.
+
+    python scripts/bench_decoded_cache.py --sizes 500 1000 2000 4000 --iterations 20
+"""
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from dotenv import load_dotenv
+from PIL import Image, ImageDraw
+
+load_dotenv()
+
+from app.utils.image_cache import DecodedImageCache
+
+
+def synthetic_template(size: int) -> io.BytesIO:
+    """A noisy-ish JPEG so the decoder does realistic work."""
+    image = Image.effect_noise((size, size), 64).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for i in range(0, size // 2, max(size // 16, 1)):
+        draw.rectangle([i, i, size - i, size - i], outline=(i % 255, 80, 200), width=3)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    buffer.seek(0)
+    return buffer
+
+
+def time_per_call(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 4000])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--mode", default="RGB", choices=["RGB", "RGBA"])
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'jpeg KB':>8} {'decode ms':>10} {'cached ms':>10} {'speedup':>8}")
+    for size in args.sizes:
+        template = synthetic_template(size)
+        cache = DecodedImageCache(max_bytes=1024 ** 3)
+
+        def decode():
+            template.seek(0)
+            Image.open(template).convert(args.mode)
+
+        decode_ms = time_per_call(decode, args.iterations) * 1000
+        cache.get(template, args.mode)  # warm
+        cached_ms = time_per_call(lambda: cache.get(template, args.mode), args.iterations) * 1000
+        print(f"{size:>6} {len(template.getvalue()) // 1024:>8} {decode_ms:>10.2f} {cached_ms:>10.2f} "
+              f"{decode_ms / cached_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark: encode time and output size per output format and preset.
+
+Renders a two-box meme on each template (synthetic ones of the given sizes,
+plus every image in --templates if given) and encodes it with every
+supported format/preset combination.
+
+    python scripts/bench_encoders.py --sizes 500 1000 2000 --iterations 5
+    python scripts/bench_encoders.py --templates path/to/templates
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from dotenv import load_dotenv
+from PIL import Image, ImageDraw
+
+load_dotenv()
+
+from app.utils.encoders import PRESETS, encode_image, get_output_format, is_format_supported
+from app.utils.text_overlay import TextOverlay
+
+
+def synthetic_template(size: int) -> Image.Image:
+    """A photo-like template: noise with some flat shapes."""
+    image = Image.effect_noise((size, size), 48).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for i in range(0, size // 2, max(size // 12, 1)):
+        draw.ellipse([i, i, size - i, size - i], fill=(i % 255, 120, 180))
+    return image
+
+
+def render(template: Image.Image) -> Image.Image:
+    """Draw top and bottom captions the way a real meme looks."""
+    width, height = template.size
+    overlay = TextOverlay()
+    image = template.copy()
+    for y, text in ((0, "WHEN THE BENCHMARK"), (height * 3 // 4, "ACTUALLY FINISHES")):
+        image = overlay.add_text(image, {
+            "x": 0, "y": y, "width": width, "height": height // 4, "text": text,
+            "font_name": "Impact.ttf", "text_color": [255, 255, 255],
+            "outline_color": [0, 0, 0], "stroke_width": 2, "padding": 10,
+        })
+    return image
+
+
+def load_templates(sizes, directory):
+    templates = [(f"synthetic {size}px", synthetic_template(size)) for size in sizes]
+    if directory:
+        for path in sorted(Path(directory).iterdir()):
+            try:
+                templates.append((path.name, Image.open(path).convert("RGB")))
+            except OSError:
+                continue
+    return templates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[500, 1000, 2000])
+    parser.add_argument("--templates", help="Directory of template images to include")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--formats", nargs="+", default=list(PRESETS))
+    args = parser.parse_args()
+
+    formats = [name for name in args.formats if is_format_supported(name)]
+    skipped = sorted(set(args.formats) - set(formats))
+    if skipped:
+        print(f"Skipping formats this Pillow build cannot write: {', '.join(skipped)}")
+
+    totals = {}
+    for label, template in load_templates(args.sizes, args.templates):
+        image = render(template)
+        print(f"\n{label} ({image.width}x{image.height})")
+        print(f"{'format':>6} {'preset':>9} {'encode ms':>10} {'KB':>8}")
+        for name in formats:
+            for preset in PRESETS[name]:
+                output = get_output_format(name, preset)
+                start = time.perf_counter()
+                for _ in range(args.iterations):
+                    encoded = encode_image(image, output)
+                elapsed = (time.perf_counter() - start) / args.iterations
+                size = encoded.getbuffer().nbytes
+                print(f"{name:>6} {preset:>9} {elapsed * 1000:>10.1f} {size / 1024:>8.1f}")
+                total = totals.setdefault((name, preset), [0.0, 0])
+                total[0] += elapsed
+                total[1] += size
+
+    print("\nTotals over all templates")
+    print(f"{'format':>6} {'preset':>9} {'encode ms':>10} {'KB':>8}")
+    for (name, preset), (elapsed, size) in totals.items():
+        print(f"{name:>6} {preset:>9} {elapsed * 1000:>10.1f} {size / 1024:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
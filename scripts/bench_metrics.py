@@ -0,0 +1,127 @@
+"""
+Benchmark: cost of the per-stage instrumentation.
+
+Times the pieces a request pays for: a `stage` block with and without a
+timed request, recording a request's timings into the histograms, and
+formatting the Server-Timing header. Then sends the same cheap request
+(GET /) through the app with metrics on and off and reports the difference
+per request, next to a typical /generate-meme latency for scale.
+
+    python scripts/bench_metrics.py --requests 3000
+    python scripts/bench_metrics.py --max-overhead-us 200   # exit non-zero above this per request
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.config.settings import get_settings
+from app.core.metrics import Metrics, RequestTimings, _current, stage, start_timings
+
+STAGES = ["auth", "template_select", "download", "annotation_cache", "prompt", "llm", "parse",
+          "decode", "render", "encode", "upload"]
+
+
+def per_call(fn, number: int) -> float:
+    """Best of 5 runs, in nanoseconds per call."""
+    runs = []
+    for _ in range(5):
+        start = time.perf_counter()
+        fn(number)
+        runs.append((time.perf_counter() - start) / number * 1e9)
+    return min(runs)
+
+
+def stage_blocks(number: int):
+    for _ in range(number):
+        with stage("render"):
+            pass
+
+
+def sample_timings() -> RequestTimings:
+    timings = RequestTimings()
+    for i, name in enumerate(STAGES):
+        timings.add(name, 0.0003 * (i + 1))
+    timings.labels.update(template="6571d1f0e4b0a1b2c3d4e5f6", format="jpeg")
+    return timings
+
+
+def micro(number: int):
+    token = _current.set(None)
+    print(f"stage block, no request:   {per_call(stage_blocks, number):8.0f} ns")
+    start_timings()
+    print(f"stage block, in a request: {per_call(stage_blocks, number):8.0f} ns")
+    _current.reset(token)
+
+    metrics = Metrics()
+    timings = sample_timings()
+
+    def observe(n):
+        for _ in range(n):
+            metrics.observe(timings, "/api/v1/generate-meme", "POST", 200, 0.9)
+
+    def header(n):
+        for _ in range(n):
+            timings.server_timing(0.9)
+
+    print(f"observe {len(STAGES)} stages:         {per_call(observe, number // 10) / 1000:8.2f} us")
+    print(f"Server-Timing header:      {per_call(header, number // 10) / 1000:8.2f} us")
+
+
+async def through_app(requests: int) -> dict:
+    from app.main import app
+
+    settings = get_settings()
+    results = {True: [], False: []}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(200):
+            await client.get("/")
+        # Alternate in rounds so drift in the machine affects both sides alike
+        for _ in range(10):
+            for enabled in (True, False):
+                settings.metrics_enabled = enabled
+                start = time.perf_counter()
+                for _ in range(requests // 10):
+                    await client.get("/")
+                results[enabled].append((time.perf_counter() - start) / (requests // 10))
+    settings.metrics_enabled = True
+    return {enabled: statistics.median(samples) for enabled, samples in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=200000, help="Iterations for the micro-benchmarks")
+    parser.add_argument("--requests", type=int, default=3000, help="Requests per side through the app")
+    parser.add_argument("--typical-latency", type=float, default=1.0,
+                        help="Seconds of a typical /generate-meme, to express the overhead as a fraction")
+    parser.add_argument("--max-overhead-us", type=float, default=None,
+                        help="Exit non-zero if the per-request overhead is above this")
+    args = parser.parse_args()
+
+    micro(args.number)
+
+    medians = asyncio.run(through_app(args.requests))
+    overhead = medians[True] - medians[False]
+    print(f"\nGET / with metrics:        {medians[True] * 1e6:8.1f} us")
+    print(f"GET / without metrics:     {medians[False] * 1e6:8.1f} us")
+    print(f"overhead per request:      {overhead * 1e6:8.1f} us "
+          f"({overhead / args.typical_latency:.4%} of a {args.typical_latency:g} s meme)")
+
+    if args.max_overhead_us is not None and overhead * 1e6 > args.max_overhead_us:
+        print(f"FAIL: overhead above {args.max_overhead_us} us")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark: outlined text, the 25-draw outline against FreeType stroking.
+
+The old TextStyler outline drew the whole multiline text 24 times at
+offsets of up to 2px in black, then once in the fill color. The current one
+draws each line once with `stroke_width`, on a layer covering only the text.
+For each template size this times both, composites them onto the same
+template and reports how far the results differ (mean and 99th percentile
+absolute difference per channel, 0-255).
+
+    python scripts/bench_outline.py --sizes 500 1000 2000
+    python scripts/bench_outline.py --outline-width 4 --save-dir /tmp/outline   # also write both images
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from dotenv import load_dotenv
+from PIL import Image, ImageChops, ImageDraw
+
+load_dotenv()
+
+from app.utils.font_utils import get_font
+from app.utils.text_styler import LINE_SPACING, TextStyler
+
+from bench_render_suite import CAPTIONS, font_size_for, synthetic_template
+
+
+def legacy_layer(styler: TextStyler, image_size, text_box: dict, outline_width: int) -> Image.Image:
+    """The previous create_text_layer: a full-size layer and one draw per outline offset."""
+    layer = Image.new('RGBA', image_size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    x, y, width, height = text_box['x'], text_box['y'], text_box['width'], text_box['height']
+    font = get_font(styler.font_name, text_box['font_size'])
+    wrapped_text = styler.wrap_text(text_box['text'], font, width - 20, draw)
+    bbox = draw.multiline_textbbox((0, 0), wrapped_text, font=font, spacing=LINE_SPACING)
+    text_x = x + (width - (bbox[2] - bbox[0])) / 2
+    text_y = y + (height - (bbox[3] - bbox[1])) / 2
+    for dx in range(-outline_width, outline_width + 1):
+        for dy in range(-outline_width, outline_width + 1):
+            if dx != 0 or dy != 0:
+                draw.multiline_text((text_x + dx, text_y + dy), wrapped_text, font=font, fill=(0, 0, 0))
+    draw.multiline_text((text_x, text_y), wrapped_text, font=font, fill=styler.hex_to_rgb(text_box['color']))
+    return layer
+
+
+def boxes_for(size: int, count: int, outline_width: int) -> list:
+    height = size // count
+    return [{
+        "x": size // 20, "y": i * height, "width": size * 9 // 10, "height": height,
+        "text": CAPTIONS[i % len(CAPTIONS)], "font_size": font_size_for(size, count),
+        "color": "#FFFFFF", "style": "default", "outline_width": outline_width,
+    } for i in range(count)]
+
+
+def render_legacy(styler, base, boxes, outline_width):
+    image = base.copy()
+    for box in boxes:
+        image = Image.alpha_composite(image, legacy_layer(styler, image.size, box, outline_width))
+    return image
+
+
+def render_stroked(styler, base, boxes):
+    image = base.copy()
+    for box in boxes:
+        layer, offset = styler.render_text_box(image.size, box)
+        if layer is not None:
+            image.alpha_composite(layer, dest=offset)
+    return image
+
+
+def best_ms(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def difference(a: Image.Image, b: Image.Image) -> tuple:
+    """Mean and 99th percentile absolute difference per channel, over all pixels."""
+    histogram = ImageChops.difference(a.convert('RGB'), b.convert('RGB')).histogram()
+    counts = [sum(histogram[channel * 256 + value] for channel in range(3)) for value in range(256)]
+    total = sum(counts)
+    mean = sum(value * count for value, count in enumerate(counts)) / total
+    seen = 0
+    for value, count in enumerate(counts):
+        seen += count
+        if seen >= total * 0.99:
+            return mean, value
+    return mean, 255
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000])
+    parser.add_argument("--boxes", type=int, default=2, help="Caption boxes per template")
+    parser.add_argument("--outline-width", type=int, default=2)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--save-dir", default=None, help="Write the legacy and stroked renders here")
+    args = parser.parse_args()
+
+    styler = TextStyler()
+    print(f"{'size':>6} {'legacy ms':>10} {'stroked ms':>11} {'speedup':>8} {'mean diff':>10} {'p99 diff':>9}")
+    for size in args.sizes:
+        base = synthetic_template(size).convert('RGBA')
+        boxes = boxes_for(size, args.boxes, args.outline_width)
+        legacy = render_legacy(styler, base, boxes, args.outline_width)
+        stroked = render_stroked(styler, base, boxes)
+        legacy_ms = best_ms(lambda: render_legacy(styler, base, boxes, args.outline_width), args.repeats)
+        stroked_ms = best_ms(lambda: render_stroked(styler, base, boxes), args.repeats)
+        mean, p99 = difference(legacy, stroked)
+        print(f"{size:>6} {legacy_ms:>10.1f} {stroked_ms:>11.1f} {legacy_ms / stroked_ms:>7.1f}x "
+              f"{mean:>10.2f} {p99:>9}")
+        if args.save_dir:
+            out = Path(args.save_dir)
+            out.mkdir(parents=True, exist_ok=True)
+            legacy.convert('RGB').save(out / f"legacy-{size}.png")
+            stroked.convert('RGB').save(out / f"stroked-{size}.png")
+
+
+if __name__ == "__main__":
+    main()
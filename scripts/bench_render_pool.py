@@ -0,0 +1,86 @@
+"""
+Benchmark: render throughput of RenderService by worker count.
+
+Renders a batch of memes concurrently for each worker count and reports
+memes/second and scaling efficiency relative to the threadpool (workers=0)
+and to a single worker process.
+
+    python scripts/bench_render_pool.py --workers 0 1 2 4 8 --renders 64 --size 2000
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from dotenv import load_dotenv
+from PIL import Image
+
+load_dotenv()
+
+from app.services.render_service import RenderService
+
+
+def synthetic_template(size: int) -> io.BytesIO:
+    buffer = io.BytesIO()
+    Image.effect_noise((size, size), 48).convert("RGB").save(buffer, format="JPEG", quality=90)
+    buffer.seek(0)
+    return buffer
+
+
+def annotations_for(size: int, boxes: int) -> list:
+    height = size // boxes
+    return [
+        {"x": 0, "y": i * height, "width": size, "height": height, "font_name": "Impact.ttf",
+         "text": f"caption {i} when the render pool finally scales with the cores", "size_range": "20-200"}
+        for i in range(boxes)
+    ]
+
+
+async def run(workers: int, template: io.BytesIO, annotations: list, renders: int) -> float:
+    service = RenderService(workers=workers)
+    service.start()
+    try:
+        await service.render(template, annotations)  # warm up workers, fonts and the shared raster
+        start = time.perf_counter()
+        await asyncio.gather(*(service.render(template, annotations) for _ in range(renders)))
+        return renders / (time.perf_counter() - start)
+    finally:
+        service.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    cpus = os.cpu_count() or 1
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({0, 1, 2, 4, cpus}))
+    parser.add_argument("--renders", type=int, default=32)
+    parser.add_argument("--size", type=int, default=2000, help="Template width and height in pixels")
+    parser.add_argument("--boxes", type=int, default=2)
+    args = parser.parse_args()
+
+    template = synthetic_template(args.size)
+    annotations = annotations_for(args.size, args.boxes)
+
+    print(f"cpus: {cpus}, template: {args.size}px, boxes: {args.boxes}, renders: {args.renders}")
+    print(f"{'workers':>8} {'memes/s':>9} {'vs 1 proc':>10} {'efficiency':>11}")
+    single = None
+    for workers in args.workers:
+        throughput = asyncio.run(run(workers, template, annotations, args.renders))
+        if workers == 1:
+            single = throughput
+        if single and workers > 0:
+            speedup = throughput / single
+            print(f"{workers:>8} {throughput:>9.1f} {speedup:>9.2f}x {speedup / workers:>10.0%}")
+        else:
+            print(f"{workers:>8} {throughput:>9.1f} {'-':>10} {'-':>11}")
+
+
+if __name__ == "__main__":
+    main()
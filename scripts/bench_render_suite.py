@@ -0,0 +1,278 @@
+"""
+Micro-benchmark suite for the rendering hot path.
+
+Times each stage of a render on deterministic synthetic templates across
+template sizes and box counts:
+
+  font.load          get_font with an empty (font, size) memo
+  wrap               wrap_lines with an empty layout memo (word widths warm)
+  draw.overlay       TextOverlay.add_text for every box
+  draw.styled        TextStyler.create_text_layer for every box
+  composite          alpha-compositing one full-size layer per box
+  encode.jpeg        JPEG encode at the default ("high") preset
+  pipeline.overlay   TextOverlay.add_multiple_texts, decode cache to bytes
+  pipeline.styled    ImageProcessor.generate_meme_from_text_boxes
+
+Results are JSON (median/min ms per case). With a baseline, every case is
+compared to it and the run fails when one is slower by more than the
+threshold (and by more than a small absolute noise floor).
+
+    python scripts/bench_render_suite.py --output results.json
+    python scripts/bench_render_suite.py --save-baseline              # record scripts/bench_baseline.json
+    python scripts/bench_render_suite.py --baseline scripts/bench_baseline.json --threshold 0.2
+    python scripts/bench_render_suite.py --quick --filter 'draw|encode'
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import re
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from dotenv import load_dotenv
+import PIL
+from PIL import Image, ImageDraw
+
+load_dotenv()
+
+from app.utils.encoders import encode_image, get_output_format
+from app.utils.font_utils import _load_font, get_font, preload_fonts
+from app.utils.image_cache import get_decoded_cache
+from app.utils.image_utils import ImageProcessor
+from app.utils.text_layout import wrap_lines
+from app.utils.text_overlay import TextOverlay
+from app.utils.text_styler import TextStyler
+
+DEFAULT_BASELINE = Path(__file__).parent / "bench_baseline.json"
+SIZES = [500, 1000, 2000, 4000]
+BOX_COUNTS = [1, 2, 3, 4, 5, 6]
+QUICK_SIZES = [500, 2000]
+QUICK_BOX_COUNTS = [1, 6]
+FONT = "Impact.ttf"
+
+CAPTIONS = [
+    "When the benchmark",
+    "actually finishes before lunch",
+    "Me explaining to the team why the render got slower after one tiny change",
+    "NOBODY:",
+    "Absolutely nobody: the JPEG encoder at 4000 pixels",
+    "It works on my machine",
+]
+
+
+def synthetic_template(size: int, seed: int = 0) -> Image.Image:
+    """A photo-like RGB template, identical on every run: gradient, shapes and grain."""
+    rng = random.Random(seed * 7919 + size)
+    gradient = Image.linear_gradient("L").resize((size, size))
+    image = Image.merge("RGB", (gradient, gradient.rotate(90), Image.new("L", (size, size), 96)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(24):
+        x0, y0 = rng.randrange(size), rng.randrange(size)
+        x1, y1 = x0 + rng.randrange(size // 8, size // 2), y0 + rng.randrange(size // 8, size // 2)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        (draw.ellipse if rng.random() < 0.5 else draw.rectangle)([x0, y0, x1, y1], fill=color)
+    grain = Image.frombytes("L", (256, 256), rng.randbytes(256 * 256)).resize((size, size))
+    return Image.blend(image, Image.merge("RGB", (grain, grain, grain)), 0.15)
+
+
+def template_bytes(image: Image.Image) -> io.BytesIO:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    buffer.seek(0)
+    return buffer
+
+
+def font_size_for(size: int, boxes: int) -> int:
+    return max(12, size // (6 * boxes) if boxes > 1 else size // 8)
+
+
+def overlay_boxes(size: int, count: int) -> list:
+    """`count` stacked caption boxes in image coordinates, as the LLM returns them."""
+    height = size // count
+    return [{
+        "x": size // 20, "y": i * height, "width": size * 9 // 10, "height": height,
+        "text": CAPTIONS[i % len(CAPTIONS)], "font_size": font_size_for(size, count), "font_name": FONT,
+        "text_color": [255, 255, 255], "outline_color": [0, 0, 0], "stroke_width": 2, "padding": 10,
+    } for i in range(count)]
+
+
+def styled_boxes(count: int) -> list:
+    """The same layout in the 512px reference space used by ImageProcessor."""
+    height = 512 // count
+    return [{
+        "x": 25, "y": i * height, "width": 460, "height": height, "text": CAPTIONS[i % len(CAPTIONS)],
+        "font_size": font_size_for(512, count), "color": "#FFFFFF", "style": "default",
+    } for i in range(count)]
+
+
+def measure(fn, setup=None, min_time: float = 0.2, min_repeats: int = 3, max_repeats: int = 50) -> dict:
+    """Time `fn(setup())` repeatedly; setup is not timed."""
+    samples = []
+    total = 0.0
+    while len(samples) < min_repeats or (total < min_time and len(samples) < max_repeats):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed)
+        total += elapsed
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 4),
+        "min_ms": round(min(samples) * 1000, 4),
+        "repeats": len(samples),
+    }
+
+
+def clear_fonts() -> tuple:
+    _load_font.cache_clear()
+    return ()
+
+
+def clear_layouts() -> tuple:
+    wrap_lines.cache_clear()
+    return ()
+
+
+def cases(sizes, box_counts):
+    """Yield (name, fn, setup) for every benchmark case."""
+    overlay = TextOverlay()
+    styler = TextStyler()
+    processor = ImageProcessor()
+    jpeg = get_output_format("jpeg")
+
+    for size in sizes:
+        template = synthetic_template(size)
+        encoded = template_bytes(template)
+        rgba = template.convert("RGBA")
+        get_decoded_cache().get(encoded, "RGB")  # warm, like a hot template
+
+        font_size = font_size_for(size, 1)
+        yield f"font.load/{size}", lambda s=font_size: get_font(FONT, s), clear_fonts
+        font = get_font(FONT, font_size)
+        yield f"wrap/{size}", lambda f=font, w=size * 9 // 10: wrap_lines(CAPTIONS[2], f, w), clear_layouts
+        yield f"encode.jpeg/{size}", lambda img=template: encode_image(img, jpeg), None
+
+        for count in box_counts:
+            boxes = overlay_boxes(size, count)
+            scaled_styled = [{**box, "color": "#FFFFFF", "style": "default"} for box in boxes]
+            suffix = f"{size}/{count}"
+
+            def draw_overlay(image, boxes=boxes):
+                for box in boxes:
+                    overlay.add_text(image, box)
+
+            def draw_styled(boxes=scaled_styled, image_size=(size, size)):
+                for box in boxes:
+                    styler.create_text_layer(image_size, box)
+
+            def composite(layers, base=rgba):
+                result = Image.new("RGBA", base.size, (0, 0, 0, 0))
+                for layer in layers:
+                    result = Image.alpha_composite(result, layer)
+                Image.alpha_composite(base, result)
+
+            layers = [styler.create_text_layer((size, size), box) for box in scaled_styled]
+            yield f"draw.overlay/{suffix}", draw_overlay, lambda img=template: (img.copy(),)
+            yield f"draw.styled/{suffix}", draw_styled, None
+            yield f"composite/{suffix}", composite, lambda layers=layers: (layers,)
+            yield (f"pipeline.overlay/{suffix}",
+                   lambda enc=encoded, boxes=boxes: overlay.add_multiple_texts(enc, boxes), None)
+            yield (f"pipeline.styled/{suffix}",
+                   lambda enc=encoded, count=count: processor.generate_meme_from_text_boxes(enc, styled_boxes(count)),
+                   None)
+
+
+def run(args) -> dict:
+    preload_fonts()
+    pattern = re.compile(args.filter) if args.filter else None
+    results = {}
+    for name, fn, setup in cases(args.sizes, args.boxes):
+        if pattern and not pattern.search(name):
+            continue
+        # Keep stray prints in the render path out of the JSON on stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            results[name] = measure(fn, setup, min_time=args.min_time)
+        print(f"{name:<28} {results[name]['median_ms']:>10.2f} ms", file=sys.stderr)
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "machine": f"{platform.system()} {platform.machine()} {platform.processor()}".strip(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float, noise_floor: float) -> list:
+    """
+    Print a comparison table and return the regressed case names: slower by more
+    than `threshold` (relative) and by more than `noise_floor` milliseconds.
+    """
+    regressions = []
+    if baseline.get("meta", {}).get("machine") != current["meta"]["machine"]:
+        print("warning: baseline was recorded on a different machine", file=sys.stderr)
+    print(f"\n{'case':<28} {'baseline':>10} {'current':>10} {'change':>8}", file=sys.stderr)
+    for name, result in current["results"].items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        change = result["median_ms"] / reference["median_ms"] - 1 if reference["median_ms"] else 0.0
+        flag = ""
+        if change > threshold and result["median_ms"] - reference["median_ms"] > noise_floor:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<28} {reference['median_ms']:>10.3f} {result['median_ms']:>10.3f} {change:>+8.1%}{flag}",
+              file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=None, help=f"Template sizes, default {SIZES}")
+    parser.add_argument("--boxes", type=int, nargs="+", default=None, help=f"Box counts, default {BOX_COUNTS}")
+    parser.add_argument("--quick", action="store_true", help=f"Sizes {QUICK_SIZES}, boxes {QUICK_BOX_COUNTS}")
+    parser.add_argument("--filter", help="Only cases whose name matches this regex")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds to spend per case, at least 3 runs")
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="Compare against this results file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown vs baseline, 0.2 = 20%%")
+    parser.add_argument("--noise-floor", type=float, default=0.05,
+                        help="Ignore slowdowns smaller than this many milliseconds")
+    parser.add_argument("--save-baseline", nargs="?", const=str(DEFAULT_BASELINE), metavar="PATH",
+                        help=f"Also write the results as the baseline (default {DEFAULT_BASELINE.name})")
+    args = parser.parse_args()
+    args.sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    args.boxes = args.boxes or (QUICK_BOX_COUNTS if args.quick else BOX_COUNTS)
+
+    current = run(args)
+    output = json.dumps(current, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(output + "\n")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(current, baseline, args.threshold, args.noise_floor)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}: "
+                  f"{', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+        print(f"\nNo regressions above {args.threshold:.0%}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Micro-benchmark: text wrapping, per-line re-measurement vs the layout engine.
+
+The legacy wrapper measured a candidate line that grew by one word at a time
+(quadratic in caption length). The layout engine measures each word once per
+font and memoizes whole layouts. Reported per caption length:
+
+  legacy  - the old getbbox-per-candidate-line wrapper
+  cold    - layout engine with empty word and layout caches
+  warm    - word widths cached, layout memo cleared (new caption, known words)
+  memo    - repeated identical layout
+
+    python scripts/bench_text_layout.py --words 10 50 200 800
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.utils import text_layout
+from app.utils.font_utils import get_font
+
+VOCABULARY = ("when you finally fix the bug but then production goes down again on a friday "
+              "afternoon and everyone is looking at you like it was your fault all along").split()
+
+
+def legacy_wrap(text, max_width, font):
+    lines = []
+    words = text.split()
+    if not words:
+        return lines
+    line = words[0]
+    for word in words[1:]:
+        test_line = f"{line} {word}"
+        bbox = font.getbbox(test_line)
+        if bbox[2] - bbox[0] <= max_width:
+            line = test_line
+        else:
+            lines.append(line)
+            line = word
+    lines.append(line)
+    return lines
+
+
+def best_of(fn, repeat: int, setup=None) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def reset_all():
+    text_layout._metrics.clear()
+    text_layout.wrap_lines.cache_clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, nargs="+", default=[10, 50, 200, 800])
+    parser.add_argument("--width", type=int, default=900, help="Box width in pixels")
+    parser.add_argument("--font", default="Impact.ttf")
+    parser.add_argument("--size", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    font = get_font(args.font, args.size)
+    rng = random.Random(0)
+
+    print(f"{'words':>6} {'lines':>6} {'legacy ms':>10} {'cold ms':>9} {'warm ms':>9} {'memo us':>9} {'speedup':>8}")
+    for count in args.words:
+        text = " ".join(rng.choice(VOCABULARY) for _ in range(count))
+        lines = text_layout.wrap_lines(text, font, args.width)
+
+        legacy = best_of(lambda: legacy_wrap(text, args.width, font), args.repeat)
+        cold = best_of(lambda: text_layout.wrap_lines(text, font, args.width), args.repeat, setup=reset_all)
+        warm = best_of(lambda: text_layout.wrap_lines(text, font, args.width), args.repeat,
+                       setup=text_layout.wrap_lines.cache_clear)
+        memo = best_of(lambda: text_layout.wrap_lines(text, font, args.width), args.repeat)
+        print(f"{count:>6} {len(lines):>6} {legacy * 1e3:>10.2f} {cold * 1e3:>9.2f} {warm * 1e3:>9.3f} "
+              f"{memo * 1e6:>9.1f} {legacy / cold:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: inline vs queued S3 uploads, against the local S3 stand-in.
+
+Starts scripts/fake_s3.py with the given per-request latency and uploads N
+distinct memes with C concurrent submitters, first inline (the request waits
+for boto3) and then through the upload queue (the request gets its URLs once
+the job is queued). Finishes with one large output to exercise multipart.
+
+    python scripts/bench_uploads.py --uploads 200 --concurrency 32 --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from fake_s3 import latency_distribution, running_fake_s3
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def submit_all(upload, payloads, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(payload):
+        async with limit:
+            start = time.perf_counter()
+            await upload(payload)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(p) for p in payloads))
+    return time.perf_counter() - start, latencies
+
+
+async def run(args, fake):
+    from app.services.s3_service import get_s3_client
+    from app.services.storage_service import StorageService
+    from app.services.upload_queue import UploadQueue
+
+    get_s3_client().create_bucket(Bucket=os.environ["S3_BUCKET_NAME"])
+
+    inline_payloads = [os.urandom(args.size) for _ in range(args.uploads)]
+    queued_payloads = [os.urandom(args.size) for _ in range(args.uploads)]
+
+    elapsed, latencies = await submit_all(
+        lambda p: asyncio.to_thread(StorageService.upload_image, p), inline_payloads, args.concurrency
+    )
+    print(f"inline:  {elapsed * 1000:7.0f} ms total, request p50 {percentile(latencies, 0.5) * 1000:6.1f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:6.1f} ms")
+
+    queue = UploadQueue(workers=args.workers, max_size=args.queue_size)
+    elapsed, latencies = await submit_all(queue.submit, queued_payloads, args.concurrency)
+    start = time.perf_counter()
+    await queue.drain()
+    drain = time.perf_counter() - start
+    stats = queue.stats()
+    print(f"queued:  {elapsed * 1000:7.0f} ms to submit, request p50 {percentile(latencies, 0.5) * 1000:6.1f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:6.1f} ms; drained in {drain * 1000:.0f} ms")
+    print(f"         upload latency {stats['latency']}, {stats['completed']} completed, {stats['failed']} failed")
+
+    large = os.urandom(args.large_size)
+    before = fake.requests.get("UploadPart", 0)
+    start = time.perf_counter()
+    await asyncio.to_thread(StorageService.upload_image, large, "image/png", "png")
+    parts = fake.requests.get("UploadPart", 0) - before
+    print(f"large:   {args.large_size / 1024 / 1024:.0f} MB in {(time.perf_counter() - start) * 1000:.0f} ms, "
+          f"{parts} multipart parts")
+    print(f"S3 requests: {dict(sorted(fake.requests.items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent submitters (requests)")
+    parser.add_argument("--workers", type=int, default=16, help="Upload queue workers")
+    parser.add_argument("--queue-size", type=int, default=256)
+    parser.add_argument("--size", type=int, default=200 * 1024, help="Bytes per meme")
+    parser.add_argument("--large-size", type=int, default=20 * 1024 * 1024)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake S3 seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    args = parser.parse_args()
+
+    with running_fake_s3(latency=latency_distribution(args.latency, args.jitter)) as (fake, endpoint):
+        # Settings are read on first import, so configure them before touching the app
+        os.environ["S3_ENDPOINT_URL"] = endpoint
+        asyncio.run(run(args, fake))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+A stand-in for the Azure OpenAI chat completions API, for offline load tests.
+
+Answers POST /openai/deployments/{deployment}/chat/completions after a delay
+drawn from a latency distribution, with canned `annotations` JSON for the
+template named in the prompt and the query as caption text. Point the app at
+it with AZURE_OPENAI_API_ENDPOINT.
+
+    python scripts/fake_llm.py --port 9100 --latency lognormal:0.8,0.5
+
+From Python, `running_fake_llm()` serves it in a background thread.
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from fake_s3 import parse_latency, serve_in_background
+
+TEMPLATE_NAME = re.compile(r"<Meme Template>\s*\n(.*?):\s*\n")
+BOX_COUNT = re.compile(r"box_count:\s*(\d+)")
+QUERY = re.compile(r"following context:\s*(.*)\Z", re.S)
+
+
+def default_annotations(box_count: int, size: int = 1000) -> List[dict]:
+    """Stacked boxes over a `size`-pixel template, for templates without canned annotations."""
+    height = size // box_count
+    return [{"x": size // 20, "y": i * height, "width": size * 9 // 10, "height": height, "text": "",
+             "font_size": 60, "font_name": "Impact.ttf"} for i in range(box_count)]
+
+
+class FakeLLM:
+    """
+    Canned annotations per template name, plus request counters and the peak number
+    of concurrent requests. `latency` is a callable returning seconds per response.
+    """
+
+    def __init__(self, annotations: Optional[Dict[str, List[dict]]] = None, latency=0.0):
+        self.annotations = annotations or {}
+        self.latency = latency if callable(latency) else (lambda: latency)
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.app = Starlette(routes=[
+            Route("/openai/deployments/{deployment}/chat/completions", self.chat_completion, methods=["POST"]),
+            Route("/v1/chat/completions", self.chat_completion, methods=["POST"]),
+        ])
+
+    @staticmethod
+    def _prompt(body: dict) -> str:
+        parts = []
+        for message in body.get("messages", []):
+            content = message.get("content")
+            if isinstance(content, str):
+                parts.append(content)
+            else:
+                parts.extend(part.get("text", "") for part in content or [] if part.get("type") == "text")
+        return "\n".join(parts)
+
+    def answer(self, prompt: str) -> dict:
+        name = TEMPLATE_NAME.search(prompt)
+        box_count = BOX_COUNT.search(prompt)
+        query = QUERY.search(prompt)
+        annotations = self.annotations.get(name.group(1).strip() if name else "")
+        if annotations is None:
+            annotations = default_annotations(int(box_count.group(1)) if box_count else 2)
+        # Spread the query over the boxes, so distinct queries render distinct memes
+        words = (query.group(1).strip() if query else "").split()
+        per_box = max(1, -(-len(words) // max(len(annotations), 1)))
+        results = []
+        for i, box in enumerate(annotations):
+            text = " ".join(words[i * per_box:(i + 1) * per_box])
+            results.append({**box, "text": text or box.get("text") or "..."})
+        return {"annotations": results}
+
+    async def chat_completion(self, request: Request) -> JSONResponse:
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            body = await request.json()
+            prompt = self._prompt(body)
+            delay = self.latency()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            content = json.dumps(self.answer(prompt))
+        finally:
+            self.in_flight -= 1
+        return JSONResponse({
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        })
+
+
+@contextmanager
+def running_fake_llm(port: int = 0, annotations: Optional[Dict[str, List[dict]]] = None, latency=0.0):
+    """
+    Serve a FakeLLM on localhost in a background thread.
+    Yields (fake, endpoint_url).
+    """
+    fake = FakeLLM(annotations, latency)
+    with serve_in_background(fake.app, port) as endpoint:
+        yield fake, endpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", default="0", help="Seconds per completion, e.g. 0.8 or lognormal:0.8,0.5")
+    args = parser.parse_args()
+    fake = FakeLLM(latency=parse_latency(args.latency))
+    uvicorn.run(fake.app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
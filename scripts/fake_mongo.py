@@ -0,0 +1,366 @@
+"""
+A minimal in-process stand-in for Motor, for offline load tests.
+
+Covers the collection calls the app makes: find/find_one (equality and
+comparison operators, projections, skip/limit/sort), insert, update and
+replace (with $set/$inc/$max/$min/$unset and upserts), delete, count,
+bulk_write and create_index. Change streams are not supported, so the app
+falls back to polling as it does on a standalone mongod.
+
+    fake = FakeMongo(latency=parse_latency("uniform:0.002,0.001"))
+    mongodb.AsyncIOMotorClient = fake.client
+"""
+import asyncio
+import copy
+import re
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertOneResult, UpdateResult
+
+MISSING = object()
+
+
+def _get(doc: dict, path: str):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+
+def _set(doc: dict, path: str, value):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def _unset(doc: dict, path: str):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(last, None)
+
+
+def _compare(op):
+    def check(value, arg):
+        try:
+            return value is not MISSING and value is not None and op(value, arg)
+        except TypeError:
+            return False
+    return check
+
+
+OPERATORS = {
+    "$eq": lambda value, arg: (None if value is MISSING else value) == arg,
+    "$ne": lambda value, arg: (None if value is MISSING else value) != arg,
+    "$in": lambda value, arg: (None if value is MISSING else value) in arg,
+    "$nin": lambda value, arg: (None if value is MISSING else value) not in arg,
+    "$gt": _compare(lambda value, arg: value > arg),
+    "$gte": _compare(lambda value, arg: value >= arg),
+    "$lt": _compare(lambda value, arg: value < arg),
+    "$lte": _compare(lambda value, arg: value <= arg),
+    "$exists": lambda value, arg: (value is not MISSING) == bool(arg),
+    "$regex": lambda value, arg: isinstance(value, str) and re.search(arg, value) is not None,
+}
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matches(doc, q) for q in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches(doc, q) for q in condition):
+                return False
+            continue
+        value = _get(doc, key)
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            for op, arg in condition.items():
+                if op not in OPERATORS:
+                    raise OperationFailure(f"Unsupported query operator {op}")
+                if not OPERATORS[op](value, arg):
+                    return False
+        elif (None if value is MISSING else value) != condition:
+            return False
+    return True
+
+
+def _project(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return doc
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        result = {k: doc[k] for k in include if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    return {k: v for k, v in doc.items() if projection.get(k, 1)}
+
+
+def apply_update(doc: dict, update: dict):
+    for op, fields in update.items():
+        for path, arg in fields.items():
+            current = _get(doc, path)
+            if op == "$set" or op == "$setOnInsert":
+                _set(doc, path, copy.deepcopy(arg))
+            elif op == "$unset":
+                _unset(doc, path)
+            elif op == "$inc":
+                _set(doc, path, (0 if current is MISSING else current) + arg)
+            elif op == "$max":
+                if current is MISSING or current is None or arg > current:
+                    _set(doc, path, arg)
+            elif op == "$min":
+                if current is MISSING or current is None or arg < current:
+                    _set(doc, path, arg)
+            else:
+                raise OperationFailure(f"Unsupported update operator {op}")
+
+
+class FakeCursor:
+    def __init__(self, collection: "FakeCollection", query: dict, projection: Optional[dict]):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._skip = 0
+        self._limit = 0
+        self._sort: List[tuple] = []
+        self._results: Optional[List[dict]] = None
+
+    def skip(self, count: int) -> "FakeCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "FakeCursor":
+        self._limit = count
+        return self
+
+    def sort(self, key, direction: int = 1) -> "FakeCursor":
+        self._sort = list(key) if isinstance(key, list) else [(key, direction)]
+        return self
+
+    async def _fetch(self) -> List[dict]:
+        await self._collection.server.delay("find")
+        docs = [doc for doc in self._collection.docs.values() if matches(doc, self._query)]
+        for key, direction in reversed(self._sort):
+            docs.sort(key=lambda d: (_get(d, key) is MISSING, _get(d, key)), reverse=direction < 0)
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [_project(copy.deepcopy(doc), self._projection) for doc in docs]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        if self._results is None:
+            self._results = await self._fetch()
+        if not self._results:
+            raise StopAsyncIteration
+        return self._results.pop(0)
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        if self._results is None:
+            self._results = await self._fetch()
+        results, self._results = self._results[:length], self._results[length:] if length else []
+        return results
+
+
+class FakeCollection:
+    def __init__(self, server: "FakeMongo", name: str):
+        self.server = server
+        self.name = name
+        self.docs: Dict[object, dict] = {}
+        self.indexes: List[tuple] = []
+
+    def _insert(self, doc: dict):
+        doc = copy.deepcopy(doc)
+        doc.setdefault("_id", ObjectId())
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError(f"Duplicate _id {doc['_id']!r} in {self.name}")
+        self.docs[doc["_id"]] = doc
+        return doc["_id"]
+
+    def _upsert_doc(self, query: dict) -> dict:
+        doc = {k: copy.deepcopy(v) for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        doc.setdefault("_id", ObjectId())
+        return doc
+
+    def _update(self, query: dict, update: dict, upsert: bool, many: bool) -> dict:
+        matched = [doc for doc in self.docs.values() if matches(doc, query)]
+        if not many:
+            matched = matched[:1]
+        modified = 0
+        for doc in matched:
+            before = copy.deepcopy(doc)
+            apply_update(doc, {op: fields for op, fields in update.items() if op != "$setOnInsert"})
+            modified += doc != before
+        result = {"n": len(matched), "nModified": modified}
+        if not matched and upsert:
+            doc = self._upsert_doc(query)
+            apply_update(doc, update)
+            result["upserted"] = self._insert(doc)
+            result["n"] = 1
+        return result
+
+    def _replace(self, query: dict, replacement: dict, upsert: bool) -> dict:
+        for doc in self.docs.values():
+            if matches(doc, query):
+                new_doc = copy.deepcopy(replacement)
+                new_doc["_id"] = doc["_id"]
+                modified = int(new_doc != doc)
+                self.docs[doc["_id"]] = new_doc
+                return {"n": 1, "nModified": modified}
+        if upsert:
+            doc = {**self._upsert_doc(query), **copy.deepcopy(replacement)}
+            return {"n": 1, "nModified": 0, "upserted": self._insert(doc)}
+        return {"n": 0, "nModified": 0}
+
+    def _delete(self, query: dict, many: bool) -> int:
+        matched = [key for key, doc in self.docs.items() if matches(doc, query)]
+        if not many:
+            matched = matched[:1]
+        for key in matched:
+            del self.docs[key]
+        return len(matched)
+
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None) -> FakeCursor:
+        return FakeCursor(self, filter or {}, projection)
+
+    async def find_one(self, filter: Optional[dict] = None, projection: Optional[dict] = None) -> Optional[dict]:
+        results = await self.find(filter, projection).limit(1).to_list(1)
+        return results[0] if results else None
+
+    async def insert_one(self, document: dict) -> InsertOneResult:
+        await self.server.delay("insert")
+        inserted_id = self._insert(document)
+        document.setdefault("_id", inserted_id)
+        return InsertOneResult(inserted_id, True)
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False) -> UpdateResult:
+        await self.server.delay("update")
+        return UpdateResult(self._update(filter, update, upsert, many=False), True)
+
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False) -> UpdateResult:
+        await self.server.delay("update")
+        return UpdateResult(self._update(filter, update, upsert, many=True), True)
+
+    async def replace_one(self, filter: dict, replacement: dict, upsert: bool = False) -> UpdateResult:
+        await self.server.delay("update")
+        return UpdateResult(self._replace(filter, replacement, upsert), True)
+
+    async def delete_one(self, filter: dict) -> DeleteResult:
+        await self.server.delay("delete")
+        return DeleteResult({"n": self._delete(filter, many=False)}, True)
+
+    async def delete_many(self, filter: dict) -> DeleteResult:
+        await self.server.delay("delete")
+        return DeleteResult({"n": self._delete(filter, many=True)}, True)
+
+    async def count_documents(self, filter: dict) -> int:
+        await self.server.delay("count")
+        return sum(1 for doc in self.docs.values() if matches(doc, filter))
+
+    async def bulk_write(self, requests: list, ordered: bool = True) -> BulkWriteResult:
+        await self.server.delay("bulk_write")
+        totals = {"nInserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "nUpserted": 0, "upserted": []}
+        for index, request in enumerate(requests):
+            if isinstance(request, InsertOne):
+                self._insert(request._doc)
+                totals["nInserted"] += 1
+            elif isinstance(request, (UpdateOne, UpdateMany)):
+                result = self._update(request._filter, request._doc, bool(request._upsert),
+                                      many=isinstance(request, UpdateMany))
+                self._tally(totals, index, result)
+            elif isinstance(request, ReplaceOne):
+                self._tally(totals, index, self._replace(request._filter, request._doc, bool(request._upsert)))
+            elif isinstance(request, (DeleteOne, DeleteMany)):
+                totals["nRemoved"] += self._delete(request._filter, many=isinstance(request, DeleteMany))
+            else:
+                raise OperationFailure(f"Unsupported bulk operation {type(request).__name__}")
+        return BulkWriteResult(totals, True)
+
+    @staticmethod
+    def _tally(totals: dict, index: int, result: dict):
+        if "upserted" in result:
+            totals["nUpserted"] += 1
+            totals["upserted"].append({"index": index, "_id": result["upserted"]})
+        else:
+            totals["nMatched"] += result["n"]
+            totals["nModified"] += result["nModified"]
+
+    async def create_index(self, keys, **kwargs) -> str:
+        await self.server.delay("create_index")
+        self.indexes.append((keys, kwargs))
+        return keys if isinstance(keys, str) else "_".join(f"{k}_{d}" for k, d in keys)
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets")
+
+
+class FakeDatabase:
+    def __init__(self, server: "FakeMongo", name: str):
+        self.server = server
+        self.name = name
+        self.collections: Dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(self.server, name)
+        return self.collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+
+class FakeClient:
+    def __init__(self, server: "FakeMongo"):
+        self._server = server
+
+    def __getitem__(self, name: str) -> FakeDatabase:
+        return self._server.database(name)
+
+    def __getattr__(self, name: str) -> FakeDatabase:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def close(self):
+        pass
+
+
+class FakeMongo:
+    """
+    The server: databases shared by every client it hands out, plus per-operation
+    counters. `latency` is a callable returning seconds to wait per operation.
+    """
+
+    def __init__(self, latency=0.0):
+        self.databases: Dict[str, FakeDatabase] = {}
+        self.latency = latency if callable(latency) else (lambda: latency)
+        self.requests: Dict[str, int] = {}
+
+    def database(self, name: str) -> FakeDatabase:
+        if name not in self.databases:
+            self.databases[name] = FakeDatabase(self, name)
+        return self.databases[name]
+
+    def client(self, *args, **kwargs) -> FakeClient:
+        """Drop-in for AsyncIOMotorClient(uri, **options); the arguments are ignored."""
+        return FakeClient(self)
+
+    async def delay(self, operation: str):
+        self.requests[operation] = self.requests.get(operation, 0) + 1
+        delay = self.latency()
+        if delay > 0:
+            await asyncio.sleep(delay)
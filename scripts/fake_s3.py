@@ -0,0 +1,284 @@
+"""
+A minimal in-memory S3 stand-in for local testing.
+
+Implements the calls the app makes with path-style addressing: Put/Get/Head/
+Delete/CopyObject, multipart uploads, DeleteObjects and ListObjectsV2.
+Signatures are not checked. Point the app at it with S3_ENDPOINT_URL.
+
+    python scripts/fake_s3.py --port 9000 --latency uniform:0.05,0.02
+
+From Python, `running_fake_s3()` serves it in a background thread.
+"""
+import argparse
+import asyncio
+import hashlib
+import math
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+S3_NS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+@dataclass
+class StoredObject:
+    content: bytes
+    content_type: str
+    metadata: Dict[str, str]
+    cache_control: Optional[str] = None
+    modified: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    @property
+    def etag(self) -> str:
+        return f'"{hashlib.md5(self.content).hexdigest()}"'
+
+
+class FakeS3:
+    """
+    Bucket contents plus request counters. `latency` is a callable returning
+    seconds to wait before answering each request (a constant by default).
+    """
+
+    def __init__(self, latency=0.0):
+        self.buckets: Dict[str, Dict[str, StoredObject]] = {}
+        self.uploads: Dict[str, Dict[int, bytes]] = {}
+        self.latency = latency if callable(latency) else (lambda: latency)
+        self.requests: Dict[str, int] = {}
+        self.app = Starlette(routes=[
+            Route("/{bucket}", self.bucket_request, methods=["GET", "POST", "PUT", "HEAD"]),
+            Route("/{bucket}/{key:path}", self.object_request, methods=["GET", "PUT", "POST", "HEAD", "DELETE"]),
+        ])
+
+    def bucket(self, name: str) -> Dict[str, StoredObject]:
+        return self.buckets.setdefault(name, {})
+
+    def _count(self, operation: str):
+        self.requests[operation] = self.requests.get(operation, 0) + 1
+
+    async def _delay(self):
+        delay = self.latency()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _xml(body: str, status: int = 200) -> Response:
+        return Response(f'<?xml version="1.0" encoding="UTF-8"?>\n{body}', status_code=status,
+                        media_type="application/xml")
+
+    def _error(self, code: str, status: int) -> Response:
+        return self._xml(f"<Error><Code>{code}</Code><Message>{code}</Message></Error>", status)
+
+    @staticmethod
+    def _headers(obj: StoredObject) -> dict:
+        headers = {
+            "ETag": obj.etag,
+            "Content-Type": obj.content_type,
+            "Content-Length": str(len(obj.content)),
+            "Last-Modified": obj.modified.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+        }
+        if obj.cache_control:
+            headers["Cache-Control"] = obj.cache_control
+        headers.update({f"x-amz-meta-{k}": v for k, v in obj.metadata.items()})
+        return headers
+
+    @staticmethod
+    def _metadata(request: Request) -> Dict[str, str]:
+        return {k[len("x-amz-meta-"):]: v for k, v in request.headers.items() if k.startswith("x-amz-meta-")}
+
+    async def bucket_request(self, request: Request) -> Response:
+        await self._delay()
+        bucket = self.bucket(request.path_params["bucket"])
+        if request.method == "POST" and "delete" in request.query_params:
+            self._count("DeleteObjects")
+            root = ElementTree.fromstring(await request.body())
+            deleted = []
+            for key in root.iter(f"{{{S3_NS}}}Key"):
+                bucket.pop(key.text, None)
+                deleted.append(f"<Deleted><Key>{escape(key.text)}</Key></Deleted>")
+            return self._xml(f'<DeleteResult xmlns="{S3_NS}">{"".join(deleted)}</DeleteResult>')
+
+        if request.method == "GET":
+            self._count("ListObjectsV2")
+            prefix = request.query_params.get("prefix", "")
+            max_keys = int(request.query_params.get("max-keys", 1000))
+            after = request.query_params.get("continuation-token") or request.query_params.get("start-after", "")
+            keys = sorted(k for k in bucket if k.startswith(prefix) and k > after)
+            page, truncated = keys[:max_keys], len(keys) > max_keys
+            contents = "".join(
+                f"<Contents><Key>{escape(k)}</Key><Size>{len(bucket[k].content)}</Size>"
+                f"<ETag>{escape(bucket[k].etag)}</ETag>"
+                f"<LastModified>{bucket[k].modified.strftime('%Y-%m-%dT%H:%M:%S.000Z')}</LastModified></Contents>"
+                for k in page
+            )
+            token = f"<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>" if truncated else ""
+            return self._xml(
+                f'<ListBucketResult xmlns="{S3_NS}"><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(page)}</KeyCount>'
+                f"<MaxKeys>{max_keys}</MaxKeys><IsTruncated>{str(truncated).lower()}</IsTruncated>"
+                f"{token}{contents}</ListBucketResult>"
+            )
+
+        # CreateBucket / HeadBucket
+        return Response(status_code=200)
+
+    async def object_request(self, request: Request) -> Response:
+        await self._delay()
+        bucket = self.bucket(request.path_params["bucket"])
+        key = request.path_params["key"]
+        params = request.query_params
+
+        if request.method == "POST" and "uploads" in params:
+            self._count("CreateMultipartUpload")
+            upload_id = uuid.uuid4().hex
+            self.uploads[upload_id] = {}
+            self.uploads[upload_id + ":meta"] = StoredObject(
+                b"", request.headers.get("content-type", "binary/octet-stream"),
+                self._metadata(request), request.headers.get("cache-control"),
+            )
+            return self._xml(f'<InitiateMultipartUploadResult xmlns="{S3_NS}"><Key>{escape(key)}</Key>'
+                             f"<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>")
+
+        if request.method == "PUT" and "uploadId" in params:
+            self._count("UploadPart")
+            part = await request.body()
+            self.uploads[params["uploadId"]][int(params["partNumber"])] = part
+            return Response(headers={"ETag": f'"{hashlib.md5(part).hexdigest()}"'})
+
+        if request.method == "POST" and "uploadId" in params:
+            self._count("CompleteMultipartUpload")
+            parts = self.uploads.pop(params["uploadId"])
+            template = self.uploads.pop(params["uploadId"] + ":meta")
+            template.content = b"".join(parts[n] for n in sorted(parts))
+            template.modified = datetime.now(timezone.utc)
+            bucket[key] = template
+            return self._xml(f'<CompleteMultipartUploadResult xmlns="{S3_NS}"><Key>{escape(key)}</Key>'
+                             f"<ETag>{escape(template.etag)}</ETag></CompleteMultipartUploadResult>")
+
+        if request.method == "DELETE" and "uploadId" in params:
+            self._count("AbortMultipartUpload")
+            self.uploads.pop(params["uploadId"], None)
+            self.uploads.pop(params["uploadId"] + ":meta", None)
+            return Response(status_code=204)
+
+        if request.method == "PUT" and "x-amz-copy-source" in request.headers:
+            self._count("CopyObject")
+            source_bucket, _, source_key = request.headers["x-amz-copy-source"].lstrip("/").partition("/")
+            source = self.bucket(source_bucket).get(source_key)
+            if source is None:
+                return self._error("NoSuchKey", 404)
+            replace = request.headers.get("x-amz-metadata-directive") == "REPLACE"
+            copy = StoredObject(
+                source.content,
+                request.headers.get("content-type", source.content_type) if replace else source.content_type,
+                self._metadata(request) if replace else dict(source.metadata),
+                request.headers.get("cache-control") if replace else source.cache_control,
+            )
+            bucket[key] = copy
+            return self._xml(f'<CopyObjectResult xmlns="{S3_NS}"><ETag>{escape(copy.etag)}</ETag>'
+                             f"<LastModified>{copy.modified.isoformat()}</LastModified></CopyObjectResult>")
+
+        if request.method == "PUT":
+            self._count("PutObject")
+            obj = StoredObject(await request.body(), request.headers.get("content-type", "binary/octet-stream"),
+                               self._metadata(request), request.headers.get("cache-control"))
+            bucket[key] = obj
+            return Response(headers={"ETag": obj.etag})
+
+        if request.method == "DELETE":
+            self._count("DeleteObject")
+            bucket.pop(key, None)
+            return Response(status_code=204)
+
+        obj = bucket.get(key)
+        if request.method == "HEAD":
+            self._count("HeadObject")
+            if obj is None:
+                return Response(status_code=404)
+            return Response(headers=self._headers(obj))
+
+        self._count("GetObject")
+        if obj is None:
+            return self._error("NoSuchKey", 404)
+        return Response(obj.content, headers=self._headers(obj))
+
+
+def latency_distribution(mean: float, jitter: float = 0.0):
+    """Latency sampler: `mean` seconds, +/- up to `jitter` seconds uniformly."""
+    return lambda: max(0.0, mean + random.uniform(-jitter, jitter))
+
+
+def parse_latency(spec: str):
+    """
+    Latency sampler from a command line spec, in seconds:
+
+        0.05                  constant
+        uniform:0.05,0.02     mean +/- jitter
+        lognormal:0.8,0.5     median, sigma (long tail, like LLM calls)
+        exp:0.1               exponential with the given mean
+    """
+    kind, _, params = spec.partition(":") if ":" in spec else ("constant", "", spec)
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "constant" and len(values) == 1:
+        return latency_distribution(values[0])
+    if kind == "uniform" and len(values) == 2:
+        return latency_distribution(*values)
+    if kind == "lognormal" and len(values) == 2:
+        median, sigma = values
+        return lambda: random.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+    if kind == "exp" and len(values) == 1:
+        return lambda: random.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    raise ValueError(f"Invalid latency spec: {spec!r}")
+
+
+@contextmanager
+def serve_in_background(app, port: int = 0):
+    """Serve an ASGI app on localhost in a background thread. Yields its base URL."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("Server failed to start")
+        time.sleep(0.01)
+    bound_port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{bound_port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+@contextmanager
+def running_fake_s3(port: int = 0, latency=0.0):
+    """
+    Serve a FakeS3 on localhost in a background thread.
+    Yields (fake, endpoint_url).
+    """
+    fake = FakeS3(latency)
+    with serve_in_background(fake.app, port) as endpoint:
+        yield fake, endpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", default="0", help="Seconds before each response, e.g. 0.05 or uniform:0.05,0.02")
+    args = parser.parse_args()
+    fake = FakeS3(parse_latency(args.latency))
+    uvicorn.run(fake.app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
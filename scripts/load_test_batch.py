@@ -0,0 +1,69 @@
+"""
+Load test: batch endpoint vs sequential single calls.
+
+Generates N memes twice on the in-process app with faked external services
+(see load_test_concurrency.py): once as N sequential POST /generate-meme
+calls, once as a single POST /generate-memes with N items.
+
+    python scripts/load_test_batch.py --items 50 --llm-latency 0.5
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+import httpx
+
+from load_test_concurrency import app, install_fakes, TEMPLATE
+from app.services import MemeService, get_render_service
+
+
+async def run(items: int):
+    headers = {"X-API-Key": "load-test.key"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=600) as client:
+        start = time.perf_counter()
+        for i in range(items):
+            response = await client.post("/api/v1/generate-meme", json={"query": f"single {i}"}, headers=headers)
+            response.raise_for_status()
+        sequential = time.perf_counter() - start
+
+        batch = {"items": [{"query": f"batch {i}", "template_id": "synthetic" if i % 2 else None}
+                           for i in range(items)]}
+        start = time.perf_counter()
+        response = await client.post("/api/v1/generate-memes", json=batch, headers=headers)
+        response.raise_for_status()
+        batched = time.perf_counter() - start
+        body = response.json()
+    get_render_service().shutdown()
+
+    print(f"items:        {items}")
+    print(f"sequential:   {sequential * 1000:.0f} ms ({items / sequential:.1f} memes/s)")
+    print(f"batch:        {batched * 1000:.0f} ms ({items / batched:.1f} memes/s), "
+          f"{body['succeeded']} ok / {body['failed']} failed")
+    print(f"speedup:      {sequential / batched:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Fake LLM latency in seconds")
+    parser.add_argument("--upload-latency", type=float, default=0.2, help="Fake (blocking) S3 latency in seconds")
+    args = parser.parse_args()
+
+    install_fakes(args.llm_latency, args.upload_latency)
+
+    async def get_template(self, template_id):
+        return {"id": template_id, **TEMPLATE}
+
+    MemeService.get_template = get_template
+    asyncio.run(run(args.items))
+
+
+if __name__ == "__main__":
+    main()
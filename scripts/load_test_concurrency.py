@@ -0,0 +1,150 @@
+"""
+Load test: concurrent /generate-meme requests on a single worker.
+
+Runs the real FastAPI app in-process with the external calls (Mongo, template
+download, LLM and S3) replaced by fakes that only sleep. If the pipeline is
+non-blocking, N concurrent requests finish in roughly the time of one request
+and /health stays responsive while they are in flight.
+
+    python scripts/load_test_concurrency.py --requests 20 --llm-latency 0.5
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+import httpx
+from dotenv import load_dotenv
+from PIL import Image
+
+load_dotenv()
+# No Mongo or S3 in this test: keep the annotation and render caches in memory only
+os.environ.setdefault("LLM_CACHE_PERSISTENT", "false")
+os.environ.setdefault("RENDER_CACHE_PERSISTENT", "false")
+# Upload inside the request, so the blocking fake upload below is on the request path
+os.environ.setdefault("UPLOAD_QUEUE_WORKERS", "0")
+
+from app.main import app
+from app.api.models.schemas import ApiKey, ApiKeyStatus
+from app.services import ApiKeyService, MemeService, OpenAIService, StorageService, get_render_service
+from app.utils import ImageProcessor
+
+TEMPLATE = {
+    "src": {"name": "Synthetic", "url": "http://templates.local/synthetic.jpg",
+            "width": 1200, "height": 1200, "box_count": 2},
+    "annotations": [],
+}
+ANNOTATIONS = [
+    {"x": 50, "y": 50, "width": 1100, "height": 400, "text": "When the load test",
+     "font_size": 80, "font_name": "Impact.ttf"},
+    {"x": 50, "y": 700, "width": 1100, "height": 400, "text": "actually runs concurrently",
+     "font_size": 80, "font_name": "Impact.ttf"},
+]
+
+
+def _template_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (1200, 1200), (90, 120, 200)).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def install_fakes(llm_latency: float, upload_latency: float):
+    """Replace the network-bound calls with fakes of the same shape."""
+    template_bytes = _template_bytes()
+
+    async def validate_api_key(self, api_key):
+        return ApiKey(name="load-test", permissions=["admin"], key_id="load-test",
+                      hashed_key="", status=ApiKeyStatus.ACTIVE, created_at=datetime.utcnow())
+
+    async def get_random_meme(self):
+        return TEMPLATE
+
+    async def download_image(url):
+        return io.BytesIO(template_bytes)
+
+    async def analyze_image(system_prompt, user_prompt, image_bytes):
+        await asyncio.sleep(llm_latency)
+        return {"annotations": ANNOTATIONS}
+
+    def upload_image(image_bytes, *args):
+        # Deliberately blocking, like boto3: it must not stall the event loop
+        time.sleep(upload_latency)
+        return {"url": "http://s3.local/meme.jpg", "presigned_url": "http://s3.local/meme.jpg",
+                "expiry_date": datetime.now().isoformat()}
+
+    ApiKeyService.validate_api_key = validate_api_key
+    MemeService.get_random_meme = get_random_meme
+    ImageProcessor.get_template_image = staticmethod(download_image)
+    OpenAIService.analyze_image = staticmethod(analyze_image)
+    StorageService.upload_image = staticmethod(upload_image)
+
+
+async def run(num_requests: int):
+    headers = {"X-API-Key": "load-test.key"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=120) as client:
+        # Warm up and measure the latency of a single request on its own
+        start = time.perf_counter()
+        response = await client.post("/api/v1/generate-meme", json={"query": "warmup"}, headers=headers)
+        response.raise_for_status()
+        single = time.perf_counter() - start
+
+        health_latencies = []
+        done = asyncio.Event()
+
+        async def probe_health():
+            while not done.is_set():
+                probe_start = time.perf_counter()
+                await client.get("/api/v1/health", headers=headers)
+                health_latencies.append(time.perf_counter() - probe_start)
+                await asyncio.sleep(0.05)
+
+        async def one(i):
+            response = await client.post("/api/v1/generate-meme", json={"query": f"load {i}"}, headers=headers)
+            response.raise_for_status()
+
+        prober = asyncio.create_task(probe_health())
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(num_requests)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await prober
+    get_render_service().shutdown()
+
+    sequential = single * num_requests
+    print(f"requests:            {num_requests}")
+    print(f"single request:      {single * 1000:.0f} ms")
+    print(f"concurrent wall:     {elapsed * 1000:.0f} ms")
+    print(f"sequential estimate: {sequential * 1000:.0f} ms")
+    print(f"overlap factor:      {sequential / elapsed:.1f}x")
+    if health_latencies:
+        print(f"/health max latency: {max(health_latencies) * 1000:.0f} ms over {len(health_latencies)} probes")
+    return sequential / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Fake LLM latency in seconds")
+    parser.add_argument("--upload-latency", type=float, default=0.2, help="Fake (blocking) S3 latency in seconds")
+    parser.add_argument("--min-overlap", type=float, default=0.0,
+                        help="Exit non-zero if the overlap factor is below this value")
+    args = parser.parse_args()
+
+    install_fakes(args.llm_latency, args.upload_latency)
+    overlap = asyncio.run(run(args.requests))
+    if overlap < args.min_overlap:
+        print(f"FAIL: overlap factor {overlap:.1f}x is below {args.min_overlap}x")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+End-to-end load test of /generate-meme, fully offline.
+
+Starts the real app (uvicorn, lifespan and all) in this process against local
+stand-ins: an in-process Motor fake (scripts/fake_mongo.py, or a throwaway
+mongod with --mongo-uri), the in-memory S3 (scripts/fake_s3.py), which also
+serves the template images, and a fake Azure OpenAI server
+(scripts/fake_llm.py). Templates and an API key are seeded, then traffic is
+driven over HTTP and the run reports:
+
+  - latency percentiles, throughput and errors
+  - a per-stage breakdown (auth, template selection and download, prompt,
+    LLM, parse, render, encode, upload...) from the Server-Timing headers
+  - request counts seen by each stand-in and the app's cache/upload stats
+
+Latency specs are seconds: 0.05, uniform:MEAN,JITTER, lognormal:MEDIAN,SIGMA
+or exp:MEAN.
+
+    python scripts/load_test_e2e.py --requests 200 --concurrency 16
+    python scripts/load_test_e2e.py --rate 20 --requests 400 --llm-latency lognormal:1.2,0.6
+    python scripts/load_test_e2e.py --repeat 0.5 --output e2e.json   # half the queries hit the annotation cache
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+import httpx
+
+from fake_llm import running_fake_llm
+from fake_mongo import FakeMongo
+from fake_s3 import parse_latency, running_fake_s3, serve_in_background
+
+TEMPLATE_SIZES = [(800, 800), (1200, 900), (1000, 1400)]
+QUERY_WORDS = ("monday deploy coffee standup bug cache latency weekend cat meeting "
+               "refactor pager lunch release rollback benchmark").split()
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def summarize(samples) -> dict:
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 1),
+        "p50_ms": round(percentile(samples, 0.5) * 1000, 1),
+        "p90_ms": round(percentile(samples, 0.9) * 1000, 1),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 1),
+        "max_ms": round(max(samples) * 1000, 1),
+    }
+
+
+def configure_environment(s3_endpoint: str, llm_endpoint: str, mongo_uri: str | None):
+    """Point the settings at the stand-ins. Settings are read on first import of the app."""
+    os.environ.update({
+        "AZURE_OPENAI_API_KEY": "load-test",
+        "AZURE_OPENAI_API_VERSION": "2024-02-01",
+        "AZURE_OPENAI_API_ENDPOINT": llm_endpoint,
+        "AZURE_OPENAI_API_DEPLOYMENT_NAME": "load-test",
+        "AWS_ACCESS_KEY": "load-test",
+        "AWS_SECRET_KEY": "load-test",
+        "AWS_REGION": "us-east-1",
+        "S3_BUCKET_NAME": "memegen-load-test",
+        "S3_ENDPOINT_URL": s3_endpoint,
+        "STORAGE_BACKEND": "s3",
+        "MONGO_URI": mongo_uri or "mongodb://fake",
+        "TEMPLATE_CACHE_DIR": "",
+    })
+
+
+def parse_server_timing(header: str) -> dict:
+    """Stage durations in seconds from a Server-Timing header ("llm;dur=812.3, render;dur=95.1")."""
+    stages = {}
+    for entry in header.split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "dur" and name:
+                stages[name] = float(value) / 1000
+    return stages
+
+
+def stage_report(per_request: list) -> dict:
+    """Per-stage summaries over the requests' Server-Timing headers."""
+    samples = {}
+    for stages in per_request:
+        for name, seconds in stages.items():
+            samples.setdefault(name, []).append(seconds)
+    return {
+        name: {**summarize(values), "ms_per_request": round(sum(values) / max(len(per_request), 1) * 1000, 1)}
+        for name, values in samples.items()
+    }
+
+
+def build_templates(count: int, s3_endpoint: str, bucket: str) -> list:
+    """Template documents and their images; boxes stacked over each image."""
+    from bench_render_suite import synthetic_template
+
+    templates = []
+    for i in range(count):
+        width, height = TEMPLATE_SIZES[i % len(TEMPLATE_SIZES)]
+        box_count = 2 + i % 3
+        box_height = height // box_count
+        guides = [{
+            "name": f"box {b + 1}", "x": width // 20, "y": b * box_height, "width": width * 9 // 10,
+            "height": box_height, "padding": 10, "font": {"size_range": f"{max(16, height // 40)}-{height // 8}"},
+        } for b in range(box_count)]
+        image = synthetic_template(max(width, height), seed=i).resize((width, height))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=90)
+        key = f"templates/load-test-{i}.jpg"
+        templates.append({
+            "doc": {
+                "src": {"name": f"Load test {i}", "url": f"{s3_endpoint}/{bucket}/{key}",
+                        "width": width, "height": height, "box_count": box_count},
+                "annotations": guides,
+                "load_test": True,
+            },
+            "key": key,
+            "image": buffer.getvalue(),
+        })
+    return templates
+
+
+def canned_annotations(templates: list) -> dict:
+    """What the fake LLM answers per template: one caption per template box."""
+    return {
+        t["doc"]["src"]["name"]: [
+            {k: guide[k] for k in ("x", "y", "width", "height", "padding")}
+            | {"font_size": 60, "font_name": "Impact.ttf", "text_color": [255, 255, 255],
+               "outline_color": [0, 0, 0], "stroke_width": 2}
+            for guide in t["doc"]["annotations"]
+        ]
+        for t in templates
+    }
+
+
+async def seed(database, templates: list) -> str:
+    """Insert the templates and an admin API key. Returns the raw key."""
+    from app.api.models.schemas import ApiKeyCreate
+    from app.services import ApiKeyService
+
+    await database.meme_templates.delete_many({"load_test": True})
+    await database.api_keys.delete_many({"name": "load-test"})
+    for template in templates:
+        await database.meme_templates.insert_one(dict(template["doc"]))
+    raw_key, _ = await ApiKeyService(SimpleNamespace(api_keys=database.api_keys)).create_api_key(
+        ApiKeyCreate(name="load-test", permissions=["admin"])
+    )
+    return raw_key
+
+
+async def cleanup(database):
+    await database.meme_templates.delete_many({"load_test": True})
+    await database.api_keys.delete_many({"name": "load-test"})
+
+
+def make_queries(count: int, repeat: float, seed: int = 0) -> list:
+    """`count` queries, a `repeat` fraction of them asked before (annotation cache hits)."""
+    rng = random.Random(seed)
+    queries = []
+    for i in range(count):
+        if queries and rng.random() < repeat:
+            queries.append(rng.choice(queries))
+        else:
+            queries.append(f"{' '.join(rng.sample(QUERY_WORDS, 5))} #{i}")
+    return queries
+
+
+async def drive(base_url: str, api_key: str, args) -> dict:
+    headers = {"X-API-Key": api_key}
+    params = {"response": "image"} if args.response == "image" else {}
+    limits = httpx.Limits(max_connections=args.concurrency if not args.rate else None)
+    latencies, statuses, timings = [], Counter(), []
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=args.timeout, limits=limits) as client:
+        async def one(query: str, record: bool = True):
+            start = time.perf_counter()
+            try:
+                response = await client.post("/api/v1/generate-meme", json={"query": query}, params=params)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            if record:
+                statuses[status] += 1
+                if status == 200:
+                    latencies.append(time.perf_counter() - start)
+                    timings.append(parse_server_timing(response.headers.get("Server-Timing", "")))
+
+        for i in range(args.warmup):
+            await one(f"warmup {i}", record=False)
+
+        queries = make_queries(args.requests, args.repeat)
+        start = time.perf_counter()
+        if args.rate:
+            # Open loop: Poisson arrivals at --rate, whether or not earlier requests finished
+            rng = random.Random(1)
+            tasks = []
+            for query in queries:
+                tasks.append(asyncio.create_task(one(query)))
+                await asyncio.sleep(rng.expovariate(args.rate))
+            await asyncio.gather(*tasks)
+        else:
+            # Closed loop: --concurrency clients, each sending its next request when the last returns
+            pending = iter(queries)
+
+            async def client_loop():
+                for query in pending:
+                    await one(query)
+
+            await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+        stats = {}
+        for name, path in (("caches", "/api/v1/admin/cache/stats"), ("uploads", "/api/v1/admin/uploads/stats")):
+            response = await client.get(path)
+            stats[name] = response.json() if response.status_code == 200 else {"status": response.status_code}
+
+    return {
+        "elapsed": elapsed,
+        "latency": summarize(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "statuses": {str(k): v for k, v in statuses.items()},
+        "stages": stage_report(timings),
+        "app_stats": stats,
+    }
+
+
+def print_report(result: dict, standins: dict):
+    latency = result["latency"]
+    print(f"\nrequests:    {sum(result['statuses'].values())} in {result['elapsed']:.1f} s, "
+          f"{result['throughput_rps']} req/s, statuses {result['statuses']}")
+    if latency["count"]:
+        print(f"latency:     p50 {latency['p50_ms']:.0f} ms, p90 {latency['p90_ms']:.0f} ms, "
+              f"p95 {latency['p95_ms']:.0f} ms, p99 {latency['p99_ms']:.0f} ms, max {latency['max_ms']:.0f} ms")
+
+    print(f"\n{'stage':<18} {'count':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'ms/req':>8}")
+    for stage, s in result["stages"].items():
+        print(f"{stage:<18} {s['count']:>6} {s['mean_ms']:>8.1f} {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} "
+              f"{s['p99_ms']:>8.1f} {s['ms_per_request']:>8.1f}")
+
+    print(f"\nLLM:   {standins['llm']['requests']} completions, peak {standins['llm']['max_in_flight']} concurrent")
+    print(f"S3:    {standins['s3']}")
+    print(f"Mongo: {standins['mongo']}")
+    uploads = result["app_stats"].get("uploads", {})
+    if "latency" in uploads:
+        print(f"upload queue: {uploads['completed']} completed, {uploads['failed']} failed, "
+              f"{uploads['deduplicated']} deduplicated, submit-to-stored {uploads['latency']}")
+    annotations = result["app_stats"].get("caches", {}).get("annotations")
+    if annotations:
+        print(f"annotation cache: {annotations}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16, help="Closed-loop clients")
+    parser.add_argument("--rate", type=float, default=0.0, help="Open-loop arrivals per second instead of clients")
+    parser.add_argument("--warmup", type=int, default=2, help="Requests sent first and left out of the results")
+    parser.add_argument("--repeat", type=float, default=0.0, help="Fraction of queries repeated from earlier ones")
+    parser.add_argument("--response", choices=["json", "image"], default="json",
+                        help="json uploads each meme, image returns it and skips the upload")
+    parser.add_argument("--templates", type=int, default=6)
+    parser.add_argument("--llm-latency", default="lognormal:0.8,0.4")
+    parser.add_argument("--s3-latency", default="uniform:0.03,0.02")
+    parser.add_argument("--mongo-latency", default="uniform:0.002,0.001")
+    parser.add_argument("--mongo-uri", help="Use this (throwaway) mongod instead of the in-process fake")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Also write the results as JSON here")
+    args = parser.parse_args()
+
+    with running_fake_s3(latency=parse_latency(args.s3_latency)) as (s3, s3_endpoint), \
+            running_fake_llm(latency=parse_latency(args.llm_latency)) as (llm, llm_endpoint):
+        configure_environment(s3_endpoint, llm_endpoint, args.mongo_uri)
+
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from app.db import mongodb
+        from app.services.s3_service import get_s3_client
+
+        mongo = None
+        if args.mongo_uri:
+            database = lambda: AsyncIOMotorClient(args.mongo_uri).memegen
+        else:
+            mongo = FakeMongo(parse_latency(args.mongo_latency))
+            mongodb.AsyncIOMotorClient = mongo.client
+            database = lambda: mongo.database("memegen")
+
+        bucket = os.environ["S3_BUCKET_NAME"]
+        templates = build_templates(args.templates, s3_endpoint, bucket)
+        get_s3_client().create_bucket(Bucket=bucket)
+        for template in templates:
+            get_s3_client().put_object(Bucket=bucket, Key=template["key"], Body=template["image"],
+                                       ContentType="image/jpeg")
+        llm.annotations.update(canned_annotations(templates))
+        api_key = asyncio.run(seed(database(), templates))
+
+        from app.main import app
+
+        try:
+            with serve_in_background(app) as base_url:
+                result = asyncio.run(drive(base_url, api_key, args))
+        finally:
+            if args.mongo_uri:
+                asyncio.run(cleanup(database()))
+
+        standins = {
+            "llm": {"requests": llm.requests, "max_in_flight": llm.max_in_flight},
+            "s3": dict(sorted(s3.requests.items())),
+            "mongo": dict(sorted(mongo.requests.items())) if mongo else None,
+        }
+
+    print_report(result, standins)
+    if args.output:
+        Path(args.output).write_text(json.dumps({
+            "args": vars(args), **result, "standins": standins,
+        }, indent=2, default=str) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Delete generated memes past their expiry date.
+
+One pass over meme storage (see ExpirySweeper): expiries come from the
+meme_objects index kept at upload time, deletes go out in delete_objects
+batches of up to 1000. Prints totals and throughput.
+
+    python scripts/sweep_expired.py
+    python scripts/sweep_expired.py --dry-run
+    python scripts/sweep_expired.py --fake-objects 100000   # against the local S3 stand-in
+
+The app can run the same sweep periodically with EXPIRY_SWEEP_INTERVAL.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+async def sweep(args, use_index: bool):
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from app.config.settings import get_settings
+    from app.services.expiry_sweeper import ExpirySweeper
+
+    settings = get_settings()
+    sweeper = ExpirySweeper(
+        prefix=args.prefix,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        grace=args.grace,
+    )
+    client = AsyncIOMotorClient(settings.mongo_uri) if use_index else None
+    try:
+        collection = client.memegen.meme_objects if client else None
+        return await sweeper.sweep(collection, dry_run=args.dry_run)
+    finally:
+        if client:
+            client.close()
+
+
+def seed_fake(fake, bucket: str, count: int):
+    """Fill the stand-in with `count` memes, half of them long expired."""
+    from fake_s3 import StoredObject
+
+    old = datetime.now(timezone.utc) - timedelta(days=30)
+    objects = fake.bucket(bucket)
+    for i in range(count):
+        stored = StoredObject(b"x", "image/jpeg", {})
+        if i % 2:
+            stored.modified = old
+        objects[f"meme_{i:064x}.jpg"] = stored
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prefix", default="meme_")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4, help="delete_objects batches in flight")
+    parser.add_argument("--grace", type=int, default=3600, help="Seconds past expiry before deleting")
+    parser.add_argument("--dry-run", action="store_true", help="Only count expired memes")
+    parser.add_argument("--no-index", action="store_true", help="Judge by LastModified only, without Mongo")
+    parser.add_argument("--fake-objects", type=int, help="Sweep a local S3 stand-in seeded with this many memes")
+    parser.add_argument("--latency", type=float, default=0.01, help="Stand-in seconds per S3 request")
+    args = parser.parse_args()
+
+    if args.fake_objects is None:
+        report = asyncio.run(sweep(args, use_index=not args.no_index))
+    else:
+        from fake_s3 import running_fake_s3
+
+        with running_fake_s3(latency=args.latency) as (fake, endpoint):
+            os.environ["S3_ENDPOINT_URL"] = endpoint
+            seed_fake(fake, os.environ.get("S3_BUCKET_NAME", "memes"), args.fake_objects)
+            report = asyncio.run(sweep(args, use_index=False))
+            report["s3_requests"] = fake.requests
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()